@@ -1,27 +1,53 @@
 import pandas as pd   # Import pandas library for data manipulation
 import numpy as np    # Import numpy library for numerical computations
 
+from store import TransactionStore, as_frame
 
-# Function to detect transaction-level anomalies using z-score
-def transaction_zscore_anomalies(transactions, z_thresh=3.0):
-    df = transactions.copy()  # Create a copy of the input DataFrame to avoid modifying original data
-    df["abs_amount"] = df["amount"].abs()  # Take absolute value of transaction amounts for anomaly calculation
 
-    out = []  # Initialize a list to store processed data per user
-    for uid, g in df.groupby("user_id"):  # Group transactions by each user
-        mu = g["abs_amount"].mean()       # Compute mean of absolute amounts for the user
-        sigma = g["abs_amount"].std(ddof=0)  # Compute standard deviation (population std) of absolute amounts
+# Helper to compute per-group z-scores for several columns in one pass (population std).
+# `codes` (group id per row) may be passed in when already known, e.g. TransactionStore.codes.
+# Like a pandas groupby, rows with a missing key get no z-score (NaN) and missing values are left out of
+# their group's mean and std (their own z-score is NaN).
+def grouped_zscores(df, columns, by="user_id", codes=None):
+    if codes is None:
+        codes, _ = pd.factorize(df[by])  # Integer segment id per row (-1 for a missing key)
+    n_groups = max(int(codes.max()) + 1, 1) if len(codes) else 0
+    keyed = codes >= 0
+    safe = codes if keyed.all() else np.where(keyed, codes, 0)  # In-range index for every row
 
-        # If standard deviation is zero or NaN, assign z-score zero to avoid division by zero
-        if sigma == 0 or np.isnan(sigma):
-            g["z"] = 0.0
-        else:
-            g["z"] = (g["abs_amount"] - mu) / sigma  # Compute z-score for each transaction
+    out = {}
+    for col in columns:
+        x = df[col].to_numpy(dtype="float64")
+        valid = keyed & ~np.isnan(x)
+        c, v = (codes, x) if valid.all() else (codes[valid], x[valid])  # Only valid rows enter the sums
+        with np.errstate(divide="ignore", invalid="ignore"):
+            counts = np.bincount(c, minlength=n_groups).astype("float64")  # Rows per group
+            mu = np.bincount(c, weights=v, minlength=n_groups) / counts  # Group mean
+            var = np.bincount(c, weights=(v - mu[c]) ** 2, minlength=n_groups) / counts
+            dev = x - mu[safe]
+            sigma = np.sqrt(var)[safe]  # Population std per row
 
-        g["is_anomaly"] = g["z"].abs() > z_thresh  # Flag transaction as anomaly if z-score exceeds threshold
-        out.append(g)  # Add this user's processed transactions to the output list
+            # If std is zero or NaN, assign z-score zero to avoid division by zero
+            z = np.where((sigma == 0) | np.isnan(sigma), 0.0, dev / sigma)
+        out[col] = z if keyed.all() else np.where(keyed, z, np.nan)
+    return pd.DataFrame(out, index=df.index)
 
-    res = pd.concat(out).sort_values(["user_id", "timestamp"])  # Combine all users' transactions and sort by user and time
+
+# Function to detect transaction-level anomalies using z-score (accepts a frame or a TransactionStore)
+def transaction_zscore_anomalies(transactions, z_thresh=3.0):
+    store = transactions if isinstance(transactions, TransactionStore) else None
+    df = as_frame(transactions)[[
+        "transaction_id", "user_id", "timestamp", "amount",
+        "category", "type", "merchant"
+    ]].copy()  # Copy only the output columns to avoid modifying original data
+    df["abs_amount"] = df["amount"].abs()  # Take absolute value of transaction amounts for anomaly calculation
+
+    codes = store.codes if store is not None else None  # A store already knows each row's user
+    df["z"] = grouped_zscores(df, ["abs_amount"], codes=codes)["abs_amount"]  # z-score within each user
+    df["is_anomaly"] = df["z"].abs() > z_thresh  # Flag transaction as anomaly if z-score exceeds threshold
+
+    # Sort by user and time (a store is sorted already)
+    res = df if store is not None else df.sort_values(["user_id", "timestamp"])
 
     # Return only relevant columns including z-score and anomaly flag
     return res[[
@@ -30,23 +56,17 @@ def transaction_zscore_anomalies(transactions, z_thresh=3.0):
     ]]
 
 
-# Function to detect anomalies in daily net amounts for each user
-def daily_net_anomalies(daily_agg, z_thresh=3.0):
+# Function to detect anomalies in daily net amounts (or other daily columns) for each user
+def daily_net_anomalies(daily_agg, z_thresh=3.0, columns=("net",)):
     df = daily_agg.copy()  # Copy the input daily aggregates DataFrame
-    out = []  # Initialize a list to store processed data per user
-
-    for uid, g in df.groupby("user_id"):  # Group daily aggregates by user
-        mu = g["net"].mean()       # Compute mean of daily net values for the user
-        sigma = g["net"].std(ddof=0)  # Compute standard deviation (population std) of daily net values
 
-        # If std is zero or NaN, assign z-score 0
-        if sigma == 0 or np.isnan(sigma):
-            g["z_net"] = 0.0
-        else:
-            g["z_net"] = (g["net"] - mu) / sigma  # Compute z-score of daily net
+    # Score every requested column in one pass; each gets a z_<column> column
+    z = grouped_zscores(df, columns)
+    for col in columns:
+        df[f"z_{col}"] = z[col]
 
-        g["is_anomaly"] = g["z_net"].abs() > z_thresh  # Flag day as anomaly if z-score exceeds threshold
-        out.append(g)  # Add this user's processed daily data to output
+    # Flag day as anomaly if any scored column's z-score exceeds the threshold
+    df["is_anomaly"] = (z.abs() > z_thresh).any(axis=1)
 
-    res = pd.concat(out).sort_values(["user_id", "date"])  # Combine all users' daily data and sort by user and date
+    res = df.sort_values(["user_id", "date"])  # Sort by user and date
     return res  # Return the resulting DataFrame with z-score and anomaly flags
@@ -0,0 +1,68 @@
+import os  # For path checks (the only import paid at module import time)
+
+
+# Options accepted by run_pipeline; anything not given falls back to these
+DEFAULT_CONFIG = {
+    "users": None,  # DataFrame or path (default: <data_dir>/users.csv)
+    "transactions": None,  # DataFrame or path (default: <data_dir>/transactions.csv)
+    "prices": None,  # DataFrame or path (default: <data_dir>/prices.csv)
+    "data_dir": None,  # Directory of the default input files (default: etl.DATA_DIR)
+    "stages": None,  # Stage names or groups to compute (default: every output stage)
+    "output_dir": None,  # Write outputs (and the stage cache) here; None keeps everything in memory
+    "format": "csv",  # File format for intermediate frames when writing
+    "use_cache": False,  # Reuse unchanged stages from output_dir and etl's columnar copies of the input CSVs
+    "streaming": False,  # Fold transactions chunk by chunk (file inputs and output_dir only)
+    "chunksize": None,  # Rows per chunk in streaming mode (default: etl.DEFAULT_CHUNKSIZE)
+    "workers": 1,  # Worker processes for the per-user stages
+    "backend": "memory",  # "memory" or "spill" (per-user stages out of core; file inputs and output_dir only)
+    "users_per_partition": None,  # Users per partition of the spill backend (default: outofcore.USERS_PER_PARTITION)
+    "recommendation_chunk_rows": None,  # Write recommendations in parts of this many rows (output_dir only)
+    "jobs": None,  # Stages that may run concurrently (default: number of CPUs)
+    "verbose": False,  # Print stage progress
+}
+
+
+# Function to run the pipeline in-process and return its result frames by stage name.
+# `config` is a dict of DEFAULT_CONFIG options (keyword overrides win). pandas and the stage modules are
+# imported on the first call, so a long-lived worker pays that cost once and every later run only does the work.
+def run_pipeline(config=None, **overrides):
+    cfg = {**DEFAULT_CONFIG, **(config or {}), **overrides}
+    unknown = sorted(set(cfg) - set(DEFAULT_CONFIG))
+    if unknown:
+        raise ValueError(f"Unknown run_pipeline option(s) {unknown}; known: {sorted(DEFAULT_CONFIG)}")
+
+    import etl  # Deferred heavy imports
+    import outofcore
+    from pipeline import PipelineRunner, build_stages, expand_targets
+    from incremental import clear_state
+
+    inputs = {name: cfg[name] for name in ("users", "transactions", "prices")}
+    in_memory = any(v is not None and not isinstance(v, (str, os.PathLike)) for v in inputs.values())
+    if cfg["use_cache"] and (in_memory or cfg["output_dir"] is None):
+        raise ValueError("use_cache needs output_dir and file inputs (in-memory frames have no fingerprint)")
+    if cfg["streaming"] and cfg["output_dir"] is None:
+        raise ValueError("streaming writes transaction anomalies as it goes; set output_dir")
+    if cfg["backend"] == "spill" and cfg["output_dir"] is None:
+        raise ValueError("the spill backend writes per-user outputs partition by partition; set output_dir")
+    if cfg["recommendation_chunk_rows"] is not None and cfg["output_dir"] is None:
+        raise ValueError("chunked recommendations are written part by part; set output_dir")
+
+    output_dir = cfg["output_dir"]
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        clear_state(output_dir)  # The outputs are rewritten; incremental state of an earlier run no longer applies
+    stages = build_stages(
+        streaming=cfg["streaming"], chunksize=cfg["chunksize"] or etl.DEFAULT_CHUNKSIZE, workers=cfg["workers"],
+        fmt=cfg["format"], output_dir=output_dir, data_dir=cfg["data_dir"], inputs=inputs,
+        backend=cfg["backend"], users_per_partition=cfg["users_per_partition"] or outofcore.USERS_PER_PARTITION,
+        recommendation_chunk_rows=cfg["recommendation_chunk_rows"],
+    )
+    runner = PipelineRunner(stages, output_dir or ".", use_cache=cfg["use_cache"], max_workers=cfg["jobs"],
+                            write_outputs=output_dir is not None, verbose=cfg["verbose"])
+    cache_enabled = etl.CACHE_ENABLED
+    etl.CACHE_ENABLED = cfg["use_cache"]  # Input files only get .csv.cache.* copies when caching was asked for
+    try:
+        runner.run(cfg["stages"], fmt=cfg["format"])
+    finally:
+        etl.CACHE_ENABLED = cache_enabled
+    return {name: runner.value(name) for name in dict.fromkeys(expand_targets(stages, cfg["stages"]))}
@@ -0,0 +1,156 @@
+import os  # For the default worker count
+import argparse  # For command line options
+import itertools  # For expanding parameter grids
+from concurrent.futures import ProcessPoolExecutor  # For evaluating grid points in parallel
+import numpy as np  # For matrix arithmetic
+import pandas as pd  # For data handling
+
+from investment import momentum_matrices
+
+
+# Threshold grid swept by default (the live rules use pct_7d < -0.03, pct_7d > 0.06, savings_rate > 0.15)
+DEFAULT_GRID = {
+    "window": [7],
+    "horizon": [7, 30],
+    "buy_drop": list(np.round(np.arange(-0.10, 0.0, 0.01), 2)),
+    "take_profit": list(np.round(np.arange(0.02, 0.13, 0.01), 2)),
+    "min_savings": [0.05, 0.10, 0.15, 0.20, 0.25],
+}
+
+
+# Function to count, for every price date, the users whose savings rate to date exceeds each threshold.
+# The savings rate of a user on a date is the mean of their daily savings_rate up to that date
+# (the same indicator main.py feeds into recommendations, without looking ahead).
+def savings_counts(daily_features, dates, thresholds):
+    d = daily_features[["user_id", "date", "savings_rate"]].copy()
+    d["date"] = pd.to_datetime(d["date"])
+    d = d.sort_values(["user_id", "date"])
+    rate = d.groupby("user_id")["savings_rate"].expanding().mean().to_numpy()  # Rate after each active day
+
+    # Date index of each row on the price calendar (rows after the last price date are dropped)
+    pos = np.searchsorted(dates.to_numpy(), d["date"].to_numpy(), side="left")
+    first = np.r_[True, d["user_id"].to_numpy()[1:] != d["user_id"].to_numpy()[:-1]]
+    keep = pos < len(dates)
+
+    # Users with any history, per date
+    with_history = np.cumsum(np.bincount(pos[first & keep], minlength=len(dates)))[:len(dates)]
+
+    # For each threshold, add +1/-1 whenever a user's rate crosses it, then accumulate over dates
+    counts = np.zeros((len(dates), len(thresholds)), dtype="int64")
+    for j, thr in enumerate(thresholds):
+        above = (rate > thr).astype("int64")
+        prev = np.where(first, 0, np.r_[0, above[:-1]])
+        change = above - prev
+        counts[:, j] = np.cumsum(np.bincount(pos[keep], weights=change[keep], minlength=len(dates)))[:len(dates)]
+    return with_history, counts
+
+
+# Function to precompute everything a grid point needs: momentum and forward return matrices and user counts
+def prepare_backtest(prices, daily_features, windows=(7,), horizons=(7, 30), savings_thresholds=(0.15,)):
+    wide, pct = momentum_matrices(prices, windows)
+    values = wide.to_numpy(dtype="float64")
+
+    # Forward return over h panel rows: price[t + h] / price[t] - 1
+    forward = {}
+    for h in horizons:
+        f = np.full_like(values, np.nan)
+        if h < len(values):
+            f[:-h] = values[h:] / values[:-h] - 1
+        forward[h] = f
+
+    thresholds = sorted(set(savings_thresholds))
+    with_history, counts = savings_counts(daily_features, wide.index, thresholds)
+    return {
+        "dates": wide.index,
+        "assets": wide.columns,
+        "pct": {w: r.to_numpy() for w, r in pct.items()},
+        "forward": forward,
+        "users_with_history": with_history,
+        "users_above": {thr: counts[:, j] for j, thr in enumerate(thresholds)},
+    }
+
+
+# Helper: count, mean forward return and hit rate of signals weighted by how many users receive them
+def _signal_stats(mask, users, fwd, hit):
+    weights = mask * users[:, None]
+    n = weights.sum()
+    if n == 0:
+        return 0, np.nan, np.nan
+    return int(n), float((weights * fwd).sum() / n), float((weights * hit).sum() / n)
+
+
+# Function to evaluate one grid point against the precomputed matrices
+def evaluate(data, window, horizon, buy_drop, take_profit, min_savings):
+    pct = data["pct"][window]
+    fwd = data["forward"][horizon]
+    valid = ~np.isnan(pct) & ~np.isnan(fwd)
+    fwd0 = np.where(valid, fwd, 0.0)
+
+    # BUY: asset fell below buy_drop and the user's savings rate is above min_savings
+    buy = valid & (pct < buy_drop)
+    buy_n, buy_ret, buy_hit = _signal_stats(buy, data["users_above"][min_savings], fwd0, fwd0 > 0)
+
+    # CONSIDER_TAKE_PROFIT: asset rose above take_profit (every user with history receives it)
+    tp = valid & (pct > take_profit)
+    tp_n, tp_ret, tp_hit = _signal_stats(tp, data["users_with_history"], fwd0, fwd0 < 0)
+
+    return {
+        "window": window, "horizon": horizon, "buy_drop": buy_drop,
+        "take_profit": take_profit, "min_savings": min_savings,
+        "buy_signals": buy_n, "buy_mean_fwd_return": buy_ret, "buy_hit_rate": buy_hit,
+        "tp_signals": tp_n, "tp_mean_fwd_return": tp_ret, "tp_hit_rate": tp_hit,  # Hit = price fell afterwards
+    }
+
+
+# Worker-process globals: the matrices are sent once per worker instead of once per grid point
+_WORKER_DATA = None
+
+
+def _init_worker(data):
+    global _WORKER_DATA
+    _WORKER_DATA = data
+
+
+def _evaluate_point(point):
+    return evaluate(_WORKER_DATA, **point)
+
+
+# Function to sweep a parameter grid (dict of lists) in parallel and return one row per combination
+def sweep(data, grid=None, workers=None):
+    grid = grid or DEFAULT_GRID
+    names = list(grid)
+    points = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        rows = [evaluate(data, **p) for p in points]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+            rows = list(pool.map(_evaluate_point, points, chunksize=max(1, len(points) // (workers * 4))))
+    return pd.DataFrame(rows)
+
+
+# Function to run a sweep from prices.csv and transactions.csv
+def run_backtest(grid=None, workers=None):
+    from etl import load_prices, load_transactions
+    from features import daily_user_aggregates, add_rolling_features
+
+    grid = grid or DEFAULT_GRID
+    daily_feat = add_rolling_features(daily_user_aggregates(load_transactions()))
+    data = prepare_backtest(load_prices(), daily_feat, windows=grid["window"], horizons=grid["horizon"],
+                            savings_thresholds=grid["min_savings"])
+    return sweep(data, grid, workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest recommendation thresholds over historical prices.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for the sweep")
+    parser.add_argument("--output", default=os.path.join("output", "backtest.csv"), help="Where to write results")
+    args = parser.parse_args()
+
+    results = run_backtest(workers=args.workers)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    results.to_csv(args.output, index=False)
+    print(f"Evaluated {len(results)} parameter combinations; saved {args.output}")
+    best = results.dropna(subset=["buy_mean_fwd_return"]).sort_values("buy_mean_fwd_return", ascending=False)
+    print(best.head(10).to_string(index=False))
@@ -0,0 +1,530 @@
+import os  # For paths of generated datasets
+import sys  # For the interpreter used by the end-to-end run
+import json  # For the benchmark history file
+import argparse  # For command line options
+import platform  # For recording the environment of a run
+import subprocess  # For the end-to-end main.py run and the git revision
+import tempfile  # For the end-to-end working directory
+import time  # For wall-clock timing
+import tracemalloc  # For peak memory of each function
+import numpy as np  # For vectorized synthetic data
+import pandas as pd  # For DataFrame operations
+
+from features import daily_user_aggregates, weekly_user_aggregates, add_rolling_features
+from budget import category_monthly_budget, smart_overall_budget, BudgetEngine
+from anomaly import transaction_zscore_anomalies, daily_net_anomalies
+from summaries import compose_daily_summary, compose_weekly_summary
+from online import OnlineAnomalyScorer
+from sharding import run_shard, run_sharded
+from investment import investment_recommendations, asset_momentum, momentum_panel
+from pipeline import user_surplus
+from store import TransactionStore
+from rollups import LEVELS, RollupCube
+from schema import TRANSACTIONS_SCHEMA, apply_schema, memory_mb
+import data_generator
+
+
+# Scales of the regression suite (transactions), the history file it appends to (in the git-ignored benchmarks
+# directory next to this file, wherever the suite is started from), and the slowdown (fraction) above which
+# `compare` flags a regression
+SUITE_SIZES = [10**3, 10**4, 10**5, 10**6, 10**7]
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+BENCH_HISTORY = os.path.join(BENCH_DIR, "benchmark_history.json")
+REGRESSION_THRESHOLD = 0.10
+MIN_SECONDS = 0.005  # Timings below this are too noisy to gate on
+
+
+# Type and category layout used for synthetic benchmark transactions
+BENCH_CATEGORIES = ["groceries", "rent", "entertainment", "utilities", "travel", "transfer", "deposit", "subscription"]
+BENCH_TYPES = ["spend", "spend", "spend", "spend", "spend", "transfer", "deposit", "spend"]
+
+
+# Function to build a seeded synthetic transactions frame of a given size
+def synthetic_transactions(n_transactions, n_users=None, days=180, seed=0):
+    rng = np.random.default_rng(seed)  # Independent, reproducible random stream
+    if n_users is None:
+        n_users = max(1, n_transactions // 200)  # Roughly 200 transactions per user by default
+
+    cat_idx = rng.integers(0, len(BENCH_CATEGORIES), n_transactions)  # Category per transaction
+    start = np.datetime64("2024-01-01T00:00:00")
+    offsets = rng.integers(0, days * 86400, n_transactions).astype("timedelta64[s]")  # Seconds into the period
+
+    df = pd.DataFrame({
+        "transaction_id": np.arange(1, n_transactions + 1),
+        "user_id": rng.integers(1, n_users + 1, n_transactions),
+        "timestamp": pd.to_datetime(start + offsets),
+        "amount": np.round(np.abs(rng.normal(50, 30, n_transactions)) + 1, 2),
+        "category": np.asarray(BENCH_CATEGORIES)[cat_idx],
+        "type": np.asarray(BENCH_TYPES)[cat_idx],
+        "merchant": np.char.add("merchant_", rng.integers(1, 31, n_transactions).astype(str)),
+    })
+    return df.sort_values(["user_id", "timestamp"]).reset_index(drop=True)
+
+
+# Function to build a seeded synthetic daily aggregates frame with n user-days
+def synthetic_daily(n_user_days, days=365, seed=0):
+    rng = np.random.default_rng(seed)
+    n_users = -(-n_user_days // days)  # Ceiling division so every user-day gets a user
+    user = np.repeat(np.arange(1, n_users + 1), days)[:n_user_days]
+    date = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.tile(np.arange(days), n_users)[:n_user_days], unit="D")
+    spend = np.round(rng.gamma(1.5, 40, n_user_days) * (rng.random(n_user_days) < 0.7), 2)
+    deposit = np.round(rng.gamma(2.0, 300, n_user_days) * (rng.random(n_user_days) < 0.1), 2)
+    transfer = np.round(rng.gamma(2.0, 100, n_user_days) * (rng.random(n_user_days) < 0.05), 2)
+    return pd.DataFrame({
+        "user_id": user, "date": date, "deposit": deposit, "spend": spend,
+        "transfer": transfer, "net": deposit - spend - transfer,
+    })
+
+
+# Function to build seeded synthetic daily prices (random walks) for n_assets over `days` days
+def synthetic_prices(n_assets, days=365, seed=0):
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0.0003, 0.01, (days, n_assets))
+    prices = 100 * np.exp(np.cumsum(steps, axis=0))
+    dates = pd.date_range("2024-01-01", periods=days, freq="D")
+    return pd.DataFrame({
+        "date": np.repeat(dates, n_assets),
+        "asset": np.tile([f"asset_{i}" for i in range(n_assets)], days),
+        "price": np.round(prices.ravel(), 2),
+    }).sort_values(["asset", "date"]).reset_index(drop=True)
+
+
+# Function to time a callable and return (seconds, result)
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()  # Start the clock
+    result = fn(*args, **kwargs)  # Run the function under test
+    return time.perf_counter() - t0, result
+
+
+# Benchmark compose_daily_summary across transaction counts
+def bench_daily_summary(sizes, seed=0):
+    rows = []  # Collected timing rows
+    for n in sizes:
+        tx = synthetic_transactions(n, seed=seed)  # Inputs are built outside the timed region
+        daily_feat = add_rolling_features(daily_user_aggregates(tx))
+        anom_tx = transaction_zscore_anomalies(tx)
+
+        secs, _ = timed(compose_daily_summary, daily_feat, anom_tx)
+        rows.append({
+            "transactions": n,
+            "user_days": len(daily_feat),
+            "seconds": round(secs, 4),
+            "us_per_transaction": round(secs / n * 1e6, 3),  # Flat as n grows means linear scaling
+        })
+        print(rows[-1])
+    return pd.DataFrame(rows)
+
+
+# Previous per-user loop implementation, kept as the baseline for the anomaly benchmark
+def _loop_transaction_zscore_anomalies(transactions, z_thresh=3.0):
+    df = transactions.copy()
+    df["abs_amount"] = df["amount"].abs()
+    out = []
+    for uid, g in df.groupby("user_id"):
+        mu = g["abs_amount"].mean()
+        sigma = g["abs_amount"].std(ddof=0)
+        g["z"] = 0.0 if sigma == 0 or np.isnan(sigma) else (g["abs_amount"] - mu) / sigma
+        g["is_anomaly"] = g["z"].abs() > z_thresh
+        out.append(g)
+    return pd.concat(out).sort_values(["user_id", "timestamp"])
+
+
+# Benchmark vectorized z-score anomalies against the per-user loop
+def bench_anomalies(sizes, seed=0):
+    rows = []
+    for n in sizes:
+        tx = synthetic_transactions(n, seed=seed)
+        daily = daily_user_aggregates(tx)
+
+        loop_secs, expected = timed(_loop_transaction_zscore_anomalies, tx)
+        vec_secs, got = timed(transaction_zscore_anomalies, tx)
+        multi_secs, _ = timed(daily_net_anomalies, daily, columns=["spend", "deposit", "net"])
+        np.testing.assert_allclose(got["z"].to_numpy(), expected["z"].to_numpy(), rtol=1e-9, atol=1e-12)
+
+        rows.append({
+            "transactions": n,
+            "users": tx["user_id"].nunique(),
+            "loop_seconds": round(loop_secs, 4),
+            "vectorized_seconds": round(vec_secs, 4),
+            "speedup": round(loop_secs / vec_secs, 1),
+            "daily_3col_seconds": round(multi_secs, 4),  # spend, deposit and net scored in one pass
+        })
+        print(rows[-1])
+    return pd.DataFrame(rows)
+
+
+# Benchmark online scorer throughput (transactions per second on one core)
+def bench_online(sizes, seed=0):
+    rows = []
+    for n in sizes:
+        tx = synthetic_transactions(n, seed=seed).sort_values("timestamp")  # Arrival order
+        user_ids = tx["user_id"].to_numpy()
+        amounts = tx["amount"].to_numpy()
+        for decay in (1.0, 0.99):
+            scorer = OnlineAnomalyScorer(decay=decay)
+            scorer.score_batch(user_ids[:1000], amounts[:1000])  # Warm up: allocate most users
+            secs, _ = timed(scorer.score_batch, user_ids, amounts)
+            rows.append({"transactions": n, "decay": decay, "seconds": round(secs, 4),
+                         "tx_per_second": int(n / secs)})
+            print(rows[-1])
+    return pd.DataFrame(rows)
+
+
+# Previous row-wise implementations, kept as the baseline for the features benchmark
+def _apply_rolling_features(daily_agg):
+    d = daily_agg.copy()
+    d["date"] = pd.to_datetime(d["date"])
+    d = d.sort_values(["user_id", "date"])
+    for col in ("spend", "deposit"):
+        d[f"{col}_7d_avg"] = d.groupby("user_id")[col].transform(lambda x: x.rolling(7, min_periods=1).mean())
+    d["savings_rate"] = d.apply(
+        lambda r: r["deposit"] / (r["deposit"] + r["spend"]) if (r["deposit"] + r["spend"]) > 0 else 0, axis=1
+    )
+    return d
+
+
+def _apply_overall_budget(daily_features):
+    agg = daily_features.groupby("user_id").agg({"spend_7d_avg": "last", "savings_rate": "mean"}).reset_index()
+    agg["estimated_monthly_spend"] = (agg["spend_7d_avg"] * 30).round(2)
+    agg["recommended_monthly_budget"] = agg.apply(
+        lambda r: round(r["estimated_monthly_spend"] * (0.9 if r["savings_rate"] < 0.1 else 1.0), 2), axis=1
+    )
+    return agg[["user_id", "estimated_monthly_spend", "savings_rate", "recommended_monthly_budget"]]
+
+
+# Benchmark vectorized rolling features and overall budgets (sizes are user-days).
+# Parity with the row-wise versions is asserted up to `parity_limit` user-days.
+def bench_features(sizes, seed=0, parity_limit=1_000_000):
+    rows = []
+    for n in sizes:
+        daily = synthetic_daily(n, seed=seed)
+
+        secs, feat = timed(add_rolling_features, daily)
+        multi_secs, _ = timed(add_rolling_features, daily, windows=(7, 30, 90), columns=("spend", "deposit", "net"))
+        budget_secs, budget = timed(smart_overall_budget, feat)
+        row = {"user_days": n, "rolling_seconds": round(secs, 4), "rolling_3x3_seconds": round(multi_secs, 4),
+               "budget_seconds": round(budget_secs, 4)}
+
+        if n <= parity_limit:
+            legacy_secs, expected = timed(_apply_rolling_features, daily)
+            pd.testing.assert_frame_equal(feat, expected, check_dtype=False)
+            pd.testing.assert_frame_equal(budget, _apply_overall_budget(expected), check_dtype=False)
+            row["legacy_seconds"] = round(legacy_secs, 4)
+            row["speedup"] = round(legacy_secs / secs, 1)
+        rows.append(row)
+        print(row)
+    return pd.DataFrame(rows)
+
+
+# Previous Period-based weekly aggregation, kept as the baseline for the rollup benchmark
+def _period_weekly_aggregates(daily_agg):
+    d = daily_agg.copy()
+    d["date"] = pd.to_datetime(d["date"])
+    d["week"] = d["date"].dt.to_period("W").apply(lambda r: r.start_time.date())
+    return d.groupby(["user_id", "week"]).agg({"spend": "sum", "deposit": "sum", "transfer": "sum",
+                                                "net": "sum"}).reset_index()
+
+
+# Benchmark weekly rollups against the Period.apply baseline (sizes are user-days), plus building the
+# whole day / week / month cube and one user's weekly lookup from it
+def bench_rollups(sizes, seed=0, parity_limit=1_000_000):
+    rows = []
+    for n in sizes:
+        daily = synthetic_daily(n, seed=seed)
+        secs, weekly = timed(weekly_user_aggregates, daily)
+        cube_secs, cube = timed(RollupCube, daily, tuple(LEVELS))
+        lookup_secs, _ = timed(lambda: [cube.query("week", user_id=u) for u in range(1, 101)])
+        row = {"user_days": n, "weekly_seconds": round(secs, 4), "cube_seconds": round(cube_secs, 4),
+               "user_lookup_us": round(lookup_secs / 100 * 1e6, 1)}
+        if n <= parity_limit:
+            legacy_secs, expected = timed(_period_weekly_aggregates, daily)
+            pd.testing.assert_frame_equal(weekly, expected.assign(week=pd.to_datetime(expected["week"])),
+                                          check_dtype=False)
+            row["legacy_seconds"] = round(legacy_secs, 4)
+            row["speedup"] = round(legacy_secs / secs, 1)
+        rows.append(row)
+        print(row)
+    return pd.DataFrame(rows)
+
+
+# Benchmark sharded multi-process execution of the per-user stages against one process
+def bench_sharding(sizes, seed=0, workers=(2, 4, 8)):
+    rows = []
+    for n in sizes:
+        tx = synthetic_transactions(n, seed=seed)
+        base_secs, _ = timed(run_shard, tx)
+        row = {"transactions": n, "1_worker_seconds": round(base_secs, 3)}
+        for w in workers:
+            secs, _ = timed(run_sharded, tx, w)
+            row[f"{w}_workers_seconds"] = round(secs, 3)
+            row[f"{w}_workers_speedup"] = round(base_secs / secs, 2)
+        rows.append(row)
+        print(row)
+    return pd.DataFrame(rows)
+
+
+# Benchmark the recommendation rule engine on n users x a fixed asset universe
+def bench_recommendations(sizes, seed=0, n_assets=300):
+    rng = np.random.default_rng(seed)
+    assets = pd.DataFrame({
+        "asset": [f"asset_{i}" for i in range(n_assets)],
+        "date": pd.Timestamp("2024-06-30").date(),
+        "price": np.round(rng.uniform(1, 1000, n_assets), 2),
+        "pct_7d": rng.normal(0, 0.05, n_assets),
+        "pct_30d": rng.normal(0, 0.1, n_assets),
+    })
+    rows = []
+    for n in sizes:
+        users = pd.DataFrame({"user_id": np.arange(1, n + 1), "savings_rate": rng.uniform(0, 0.4, n)})
+        secs, recs = timed(investment_recommendations, users, assets)
+        rows.append({"users": n, "assets": n_assets, "recommendations": len(recs), "seconds": round(secs, 4)})
+        print(rows[-1])
+    return pd.DataFrame(rows)
+
+
+# Benchmark full-history momentum panel and latest snapshot across n assets (sizes are asset counts)
+def bench_momentum(sizes, seed=0, days=365):
+    rows = []
+    for n in sizes:
+        prices = synthetic_prices(n, days=days, seed=seed)
+        panel_secs, panel = timed(momentum_panel, prices, (7, 30, 90))
+        snap_secs, _ = timed(asset_momentum, prices)
+        rows.append({"assets": n, "days": days, "panel_rows": len(panel),
+                     "panel_seconds": round(panel_secs, 4), "snapshot_seconds": round(snap_secs, 4)})
+        print(rows[-1])
+    return pd.DataFrame(rows)
+
+
+# Benchmark the sorted TransactionStore: build cost, user lookups against boolean masks,
+# and per-user stages fed a store instead of an unsorted frame
+def bench_store(sizes, seed=0, lookups=1000):
+    rows = []
+    for n in sizes:
+        tx = synthetic_transactions(n, seed=seed).sample(frac=1, random_state=seed)  # Arrival (unsorted) order
+        build_secs, store = timed(TransactionStore, tx)
+        users = store.user_ids[np.random.default_rng(seed).integers(0, len(store.user_ids), lookups)]
+        mask_secs, _ = timed(lambda: [tx[tx["user_id"] == u] for u in users[:50]])
+        view_secs, _ = timed(lambda: [store.user_range(u, "2024-02-01", "2024-03-01") for u in users])
+        row = {"transactions": n, "build_seconds": round(build_secs, 4),
+               "mask_lookup_us": round(mask_secs / 50 * 1e6, 1), "store_range_us": round(view_secs / lookups * 1e6, 1)}
+        for name, fn in [("anomalies", transaction_zscore_anomalies), ("daily", daily_user_aggregates)]:
+            row[f"{name}_frame_seconds"] = round(timed(fn, tx)[0], 4)
+            row[f"{name}_store_seconds"] = round(timed(fn, store)[0], 4)
+        rows.append(row)
+        print(row)
+    return pd.DataFrame(rows)
+
+
+
+# Benchmark: category budgets rebuilt from all transactions vs the BudgetEngine folding in one new month
+# on top of running monthly totals (history spans `days`; the last calendar month is the "new" data)
+def bench_budgets(sizes, seed=0, days=730):
+    rows = []
+    for n in sizes:
+        tx = synthetic_transactions(n, seed=seed, days=days)
+        month = tx["timestamp"].dt.to_period("M")
+        history, latest = tx[month < month.max()], tx[month == month.max()]
+        engine = BudgetEngine.from_transactions(history)
+        full_secs, full = timed(category_monthly_budget, tx)
+        update_secs, _ = timed(engine.update, latest)
+        budgets_secs, incremental = timed(engine.budgets)
+        pd.testing.assert_frame_equal(full, incremental)  # Same budgets either way
+        row = {"transactions": n, "new_transactions": len(latest), "full_seconds": round(full_secs, 4),
+               "update_seconds": round(update_secs, 4), "budgets_seconds": round(budgets_secs, 4),
+               "speedup": round(full_secs / (update_secs + budgets_secs), 1)}
+        for method in ("ewma", "all"):
+            row[f"{method}_seconds"] = round(timed(engine.budgets, method=method)[0], 4)
+        rows.append(row)
+        print(row)
+    return pd.DataFrame(rows)
+
+# Benchmark: memory of the transactions / daily / weekly frames with default dtypes (object strings, int64
+# ids, Python dates) against the schema dtypes, and peak traced memory of the aggregate stages on each
+def bench_schema(sizes, seed=0):
+    rows = []
+    for n in sizes:
+        compact = apply_schema(synthetic_transactions(n, seed=seed), TRANSACTIONS_SCHEMA)
+        loose = compact.astype({"transaction_id": "int64", "user_id": "int64", "category": object,
+                                "type": object, "merchant": object})
+        row = {"transactions": n}
+        for name, tx in [("default", loose), ("schema", compact)]:
+            daily = daily_user_aggregates(tx)
+            weekly = weekly_user_aggregates(daily)
+            if name == "default":  # Python date objects as the pre-schema stages produced
+                daily = daily.assign(date=daily["date"].dt.date)
+                weekly = weekly.assign(week=weekly["week"].dt.date)
+            row[f"{name}_frames_mb"] = round(float(memory_mb(tx) + memory_mb(daily) + memory_mb(weekly)), 1)
+            row[f"{name}_peak_mb"] = round(peak_memory(lambda: weekly_user_aggregates(daily_user_aggregates(tx))), 1)
+        row["frames_factor"] = round(row["default_frames_mb"] / row["schema_frames_mb"], 1)
+        row["peak_factor"] = round(row["default_peak_mb"] / row["schema_peak_mb"], 1)
+        rows.append(row)
+        print(row)
+    return pd.DataFrame(rows)
+
+
+# Function to measure peak traced memory (MB) of one call; run separately from timing because tracing slows it down
+def peak_memory(fn, *args, **kwargs):
+    tracemalloc.start()
+    try:
+        fn(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+# Function to run main.py end to end on a generated dataset of about n transactions in a fresh directory.
+# Returns (seconds, peak RSS in MB) of the child process.
+def run_main_e2e(n, seed=0, days=180, args=()):
+    repo = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        users = max(1, round(n / (0.88 * days)))  # The generator averages ~0.88 transactions per user-day
+        data_generator.generate_dataset(os.path.join(tmp, "data"), users, days, seed=seed,
+                                        start_date=pd.Timestamp("2024-01-01").date())
+        t0 = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, os.path.join(repo, "main.py"), "--no-cache", *args], cwd=tmp,
+                                stdout=subprocess.DEVNULL)
+        _, status, usage = os.wait4(proc.pid, 0)  # Resource usage of this child only
+        secs = time.perf_counter() - t0
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if proc.returncode:
+            raise RuntimeError(f"main.py exited with status {proc.returncode}")
+    return secs, usage.ru_maxrss / 1024  # ru_maxrss is in KB on Linux
+
+
+# Function to build the inputs of every public stage for n transactions, so they are not timed
+def suite_inputs(n, seed=0):
+    tx = synthetic_transactions(n, seed=seed)
+    daily = daily_user_aggregates(tx)
+    daily_feat = add_rolling_features(daily)
+    prices = synthetic_prices(min(1000, max(3, n // 1000)), seed=seed)  # Asset universe grows with scale
+    asset_mom = asset_momentum(prices)
+    return {
+        "daily_user_aggregates": (daily_user_aggregates, tx),
+        "weekly_user_aggregates": (weekly_user_aggregates, daily),
+        "add_rolling_features": (add_rolling_features, daily),
+        "transaction_zscore_anomalies": (transaction_zscore_anomalies, tx),
+        "daily_net_anomalies": (daily_net_anomalies, daily),
+        "category_monthly_budget": (category_monthly_budget, tx),
+        "smart_overall_budget": (smart_overall_budget, daily_feat),
+        "asset_momentum": (asset_momentum, prices),
+        "investment_recommendations": (investment_recommendations, user_surplus(daily_feat), asset_mom),
+        "compose_daily_summary": (compose_daily_summary, daily_feat, transaction_zscore_anomalies(tx)),
+        "compose_weekly_summary": (compose_weekly_summary, weekly_user_aggregates(daily)),
+    }
+
+
+# Regression suite: time (best of `repeat`) and memory-profile every public stage and main.py at each scale,
+# then append the run to the JSON history
+def bench_suite(sizes, seed=0, repeat=3, e2e=True, history=BENCH_HISTORY):
+    rows = []
+    for n in sizes:
+        for name, (fn, *args) in suite_inputs(n, seed).items():
+            secs = min(timed(fn, *args)[0] for _ in range(repeat if n <= 10**5 else 1))
+            rows.append({"name": name, "size": n, "seconds": round(secs, 5),
+                         "peak_mb": round(peak_memory(fn, *args), 2)})
+            print(rows[-1])
+        if e2e:
+            secs, rss = run_main_e2e(n, seed)
+            rows.append({"name": "main", "size": n, "seconds": round(secs, 3), "peak_mb": round(rss, 1)})  # Peak RSS
+            print(rows[-1])
+    append_history(rows, seed, history)
+    return pd.DataFrame(rows)
+
+
+# Function to append one suite run, with its environment, to the JSON history
+def append_history(rows, seed=0, history=BENCH_HISTORY):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    runs = load_history(history)
+    runs.append({
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "results": rows,
+    })
+    os.makedirs(os.path.dirname(os.path.abspath(history)), exist_ok=True)
+    with open(history + ".tmp", "w") as f:
+        json.dump(runs, f, indent=1)
+    os.replace(history + ".tmp", history)  # Atomic, so an interrupted run never corrupts the history
+    print(f"Appended run {len(runs) - 1} to {history}")
+
+
+# Function to read the JSON history (a list of runs, oldest first)
+def load_history(history=BENCH_HISTORY):
+    if not os.path.exists(history):
+        return []
+    with open(history) as f:
+        return json.load(f)
+
+
+# Function to compare two runs of the history (default: latest against the one before it).
+# A (stage, size) regresses when its time or peak memory grew by more than `threshold`.
+def compare_runs(history=BENCH_HISTORY, base=-2, head=-1, threshold=REGRESSION_THRESHOLD):
+    runs = load_history(history)
+    if len(runs) < 2:
+        raise SystemExit(f"Need at least two runs in {history} to compare")
+    key = ["name", "size"]
+    old = pd.DataFrame(runs[base]["results"]).set_index(key)
+    new = pd.DataFrame(runs[head]["results"]).set_index(key)
+    cmp = old.join(new, lsuffix="_base", rsuffix="_head", how="inner").reset_index()
+    cmp["time_ratio"] = (cmp["seconds_head"] / cmp["seconds_base"]).round(3)
+    cmp["memory_ratio"] = (cmp["peak_mb_head"] / cmp["peak_mb_base"]).round(3)
+    slower = (cmp["time_ratio"] > 1 + threshold) & (cmp["seconds_head"] >= MIN_SECONDS)
+    bigger = (cmp["memory_ratio"] > 1 + threshold) & (cmp["peak_mb_head"] >= 1)
+    cmp["regression"] = np.select([slower & bigger, slower, bigger], ["time+memory", "time", "memory"], "")
+    return cmp
+
+
+BENCHMARKS = {
+    "summaries": bench_daily_summary,
+    "anomalies": bench_anomalies,
+    "online": bench_online,
+    "features": bench_features,
+    "sharding": bench_sharding,
+    "recommendations": bench_recommendations,
+    "momentum": bench_momentum,
+    "store": bench_store,
+    "budgets": bench_budgets,
+    "schema": bench_schema,
+    "rollups": bench_rollups,
+    "suite": bench_suite,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic data.")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS) + ["compare"],
+                        help="Which benchmark to run; 'suite' appends to the history, 'compare' checks it")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None,
+                        help="Transaction counts to benchmark (suite default: 10^3 .. 10^7)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for synthetic data")
+    parser.add_argument("--history", default=BENCH_HISTORY, help="JSON history written by suite, read by compare")
+    parser.add_argument("--no-e2e", action="store_true", help="suite: skip the end-to-end main.py run")
+    parser.add_argument("--base", type=int, default=-2, help="compare: history index of the baseline run")
+    parser.add_argument("--head", type=int, default=-1, help="compare: history index of the run to check")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="compare: flag slowdowns / memory growth above this fraction")
+    args = parser.parse_args()
+
+    if args.benchmark == "compare":
+        result = compare_runs(args.history, args.base, args.head, args.threshold)
+        print(result.to_string(index=False))
+        regressions = result[result["regression"] != ""]
+        if len(regressions):
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)  # Non-zero exit so CI can gate on it
+        print("\nNo regressions")
+    elif args.benchmark == "suite":
+        print(bench_suite(args.sizes or SUITE_SIZES, seed=args.seed, e2e=not args.no_e2e,
+                          history=args.history).to_string(index=False))
+    else:
+        sizes = args.sizes or [10_000, 100_000, 1_000_000]
+        print(BENCHMARKS[args.benchmark](sizes, seed=args.seed).to_string(index=False))
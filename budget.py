@@ -1,33 +1,174 @@
 import pandas as pd  # Import pandas library for data manipulation
+import numpy as np  # Import numpy for vectorized conditionals
 
+from store import as_frame
 
-# Function to calculate category-wise monthly budgets based on past spending
-def category_monthly_budget(transactions, recent_months=3):
-    df = transactions.copy()  # Make a copy to avoid modifying the original DataFrame
-    df["date"] = pd.to_datetime(df["timestamp"]).dt.date  # Extract date from timestamp
-    df["month"] = pd.to_datetime(df["timestamp"]).dt.to_period("M")  # Extract month (YYYY-MM) from timestamp
 
-    # Consider only spending transactions (exclude deposits, salary, transfers)
-    spend = df[df["type"] == "spend"]
+# Months of history a category budget averages over, and the slack added on top of the average
+RECENT_MONTHS = 3
+BUDGET_SLACK = 1.05
 
-    # Aggregate total spending per user, category, and month
-    agg = spend.groupby(["user_id", "category", "month"])["amount"].sum().reset_index()
+# Averaging rules understood by BudgetEngine.budgets
+BUDGET_METHODS = ("trailing", "ewma", "all")
 
-    # Copy the aggregated data (optional, for clarity)
-    agg_recent = agg.copy()
 
-    # Compute average monthly spend per user per category across months
-    budgets = (
-        agg_recent.groupby(["user_id", "category"])["amount"]  # Group by user and category
-        .mean()  # Take mean across months
-        .reset_index()  # Convert grouped result back to DataFrame
-        .rename(columns={"amount": "avg_monthly_spend"})  # Rename column to meaningful name
-    )
+# Function to turn timestamps into month numbers (months since 1970-01, i.e. Period("M").ordinal).
+# Timestamps are parsed at most once; datetime64 columns are used as they are.
+def month_ordinals(timestamps):
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps)
+    return np.asarray(timestamps).astype("datetime64[M]").astype("int64")
+
+
+# Function to give the last closed month (ordinal) of data ending at `last_timestamp`: that timestamp's
+# month if the data reaches the month's last day, otherwise the month before (the open month is partial
+# and would be averaged as if it were a full month)
+def last_closed_month(last_timestamp):
+    ts = pd.Timestamp(last_timestamp)
+    month = (ts.year - 1970) * 12 + ts.month - 1
+    return month if ts.is_month_end else month - 1
+
+
+# Function to sum spend per (user_id, category, month) in integer cents (frame or TransactionStore).
+# Months are month ordinals; only the spend rows' columns are gathered, the frame is never copied.
+def monthly_category_spend(transactions):
+    df = as_frame(transactions)
+    spend = (df["type"] == "spend").to_numpy()  # Only spending counts towards budgets
+    codes, categories = pd.factorize(df["category"], sort=True)  # Group on integer codes, not strings
+    cents = np.round(df["amount"].to_numpy(dtype="float64")[spend] * 100).astype("int64")
+    monthly = pd.Series(cents).groupby([
+        df["user_id"].to_numpy()[spend],
+        codes[spend],
+        month_ordinals(df["timestamp"].to_numpy()[spend]),
+    ]).sum()
+    monthly.index = monthly.index.set_levels(categories.take(monthly.index.levels[1]), level=1)
+    monthly.index.names = ["user_id", "category", "month"]
+    return monthly
+
+
+# Helper: a (user_id, category, month) cents Series with the month level as month ordinals
+# (TransactionAggregates and the incremental state key months by pandas Period)
+def _ordinal_months(monthly):
+    months = monthly.index.levels[2]
+    if isinstance(months, pd.PeriodIndex):
+        monthly = monthly.copy(deep=False)
+        monthly.index = monthly.index.set_levels(months.asi8, level=2)
+    return monthly
+
+
+# Incremental category budget engine.
+# Keeps running spend totals per (user_id, category, month) in integer cents; update() folds in new
+# transactions by touching only their keys, so re-budgeting after a month of new data scans that month
+# (plus one pass over the small per-key table), never the years of transactions behind it.
+# budgets() computes every user's budgets in one vectorized pass with one of three averaging rules:
+# The window ends at `as_of`, by default the last closed month of the data (see last_closed_month).
+#   trailing - exact mean of the `recent_months` calendar months ending at `as_of`
+#              (months without spend count as zero; users with a shorter history average over it;
+#              a category the user spent in before the window gets a zero budget row)
+#   ewma     - exponentially weighted monthly mean, newest month weight 1, each older month (1 - alpha)
+#              times the next (alpha defaults to 2 / (recent_months + 1)), normalized over the
+#              user's history so a short history is not biased towards zero
+#   all      - mean over the months with spend in that category (the original rule)
+class BudgetEngine:
+
+    def __init__(self, monthly=None, last_timestamp=None):
+        self.monthly = None  # Integer-cent spend indexed by (user_id, category, month ordinal)
+        self.first_month = None  # First month with spend per user (start of each user's history)
+        self.last_timestamp = None  # Latest transaction seen (any type): where the data ends
+        if monthly is not None:
+            self.add(monthly, last_timestamp)
+
+    # Build the running totals from transactions (frame or TransactionStore)
+    @classmethod
+    def from_transactions(cls, transactions):
+        return cls().update(transactions)
+
+    # Fold new transactions into the running totals
+    def update(self, transactions):
+        timestamps = as_frame(transactions)["timestamp"]
+        return self.add(monthly_category_spend(transactions), timestamps.max() if len(timestamps) else None)
+
+    # Fold precomputed (user_id, category, month) cents into the running totals; `last_timestamp` is the
+    # latest transaction behind them (None if unknown)
+    def add(self, monthly, last_timestamp=None):
+        if last_timestamp is not None and not pd.isna(last_timestamp):
+            last_timestamp = pd.Timestamp(last_timestamp)
+            self.last_timestamp = last_timestamp if self.last_timestamp is None else max(self.last_timestamp,
+                                                                                         last_timestamp)
+        monthly = _ordinal_months(monthly).astype("int64")
+        month = pd.Series(monthly.index.get_level_values("month").to_numpy(),
+                          index=monthly.index.get_level_values("user_id"))
+        first = month.groupby(level=0).min()
+        if self.monthly is None:
+            self.monthly, self.first_month = monthly, first
+        elif len(monthly):
+            if month.min() > self.latest_month():
+                self.monthly = pd.concat([self.monthly, monthly])  # Newly closed months: append, nothing to align
+            else:
+                self.monthly = self.monthly.add(monthly, fill_value=0).astype("int64")
+            self.first_month = pd.concat([self.first_month, first]).groupby(level=0).min()
+        return self
+
+    # Latest month with spend (month ordinal)
+    def latest_month(self):
+        return int(self.monthly.index.get_level_values("month").max())
+
+    # Default end of the budget window: the last closed month of the data, or the latest month with spend
+    # when the engine was only given monthly totals without the timestamp they end at
+    def closed_month(self):
+        if self.last_timestamp is None:
+            return self.latest_month()
+        return last_closed_month(self.last_timestamp)
+
+    # Budgets of every (user, category) as of month `as_of` (ordinal, Period or anything pd.Period accepts)
+    def budgets(self, recent_months=RECENT_MONTHS, method="trailing", alpha=None, as_of=None, slack=BUDGET_SLACK):
+        if method not in BUDGET_METHODS:
+            raise ValueError(f"method must be one of {BUDGET_METHODS}, got {method!r}")
+        if self.monthly is None or self.monthly.empty:
+            return pd.DataFrame({"user_id": pd.Series(dtype="int32"), "category": pd.Series(dtype="category"),
+                                 "avg_monthly_spend": pd.Series(dtype="float64"),
+                                 "proposed_budget": pd.Series(dtype="float64")})
+        if as_of is None:
+            as_of = self.closed_month()
+        elif not isinstance(as_of, (int, np.integer)):
+            as_of = pd.Period(as_of, freq="M").ordinal
+
+        # Months before as_of (0 = as_of itself); the trailing rule only reads the months in its window
+        age = as_of - self.monthly.index.get_level_values("month").to_numpy()
+        keep = (age >= 0) & (age < recent_months) if method == "trailing" else age >= 0
+        monthly = self.monthly[keep]
+        grouped = monthly.groupby(level=["user_id", "category"])
+
+        if method == "all":
+            avg = grouped.sum() / 100.0 / grouped.count()  # Exact cent totals, divided once
+        else:
+            total = grouped.sum()
+            # Months of history per (user, category) row: from the user's first spend month up to as_of
+            history = as_of - self.first_month.reindex(total.index.get_level_values("user_id")).to_numpy() + 1
+            if method == "trailing":
+                avg = total / 100.0 / np.minimum(history, recent_months)
+                # Categories spent in before the window (but not inside it) keep a zero row
+                past = self.monthly[age >= 0].groupby(level=["user_id", "category"]).size().index
+                avg = avg.reindex(past, fill_value=0.0)
+            else:
+                alpha = 2.0 / (recent_months + 1) if alpha is None else alpha
+                if not 0 < alpha <= 1:
+                    raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+                decay = 1.0 - alpha
+                weighted = pd.Series(monthly.to_numpy() / 100.0 * decay ** age[keep], index=monthly.index)
+                avg = weighted.groupby(level=["user_id", "category"]).sum() / ((1.0 - decay ** history) / alpha)
+
+        budgets = avg.rename("avg_monthly_spend").rename_axis(["user_id", "category"]).reset_index()
+        budgets["proposed_budget"] = (budgets["avg_monthly_spend"] * slack).round(2)  # Slack above the average
+        return budgets
 
-    # Add 5% slack to propose budget slightly above average spending
-    budgets["proposed_budget"] = (budgets["avg_monthly_spend"] * 1.05).round(2)
 
-    return budgets  # Return DataFrame with avg_monthly_spend and proposed_budget
+# Function to calculate category-wise monthly budgets based on recent spending (frame or TransactionStore).
+# By default each budget is the mean monthly spend over the last `recent_months` calendar months of the
+# data plus 5% slack; see BudgetEngine for the "ewma" and "all" methods.
+def category_monthly_budget(transactions, recent_months=RECENT_MONTHS, method="trailing", alpha=None, as_of=None):
+    engine = BudgetEngine.from_transactions(transactions)
+    return engine.budgets(recent_months, method=method, alpha=alpha, as_of=as_of)
 
 
 # Function to compute an overall smart monthly budget per user
@@ -47,11 +188,10 @@ def smart_overall_budget(daily_features):
 
     # Adjust budget based on savings behavior:
     # If savings_rate < 0.1 (i.e., low savings), reduce budget by 10%
-    agg["recommended_monthly_budget"] = agg.apply(
-        lambda r: round(r["estimated_monthly_spend"] * 0.9, 2)
-        if r["savings_rate"] < 0.1
-        else round(r["estimated_monthly_spend"] * 1.0, 2),  # Otherwise keep estimated spend
-        axis=1
+    agg["recommended_monthly_budget"] = np.where(
+        agg["savings_rate"] < 0.1,
+        (agg["estimated_monthly_spend"] * 0.9).round(2),
+        agg["estimated_monthly_spend"].round(2)  # Otherwise keep estimated spend
     )
 
     # Return relevant columns
@@ -1,119 +1,239 @@
 import os  # Import os to handle directories and file paths
-import csv  # Import csv (not strictly used here, but often for CSV writing)
-import random  # Import random for random number generation
-from datetime import datetime, timedelta  # Import datetime and timedelta for date calculations
-import numpy as np  # Import numpy for numeric operations, random distributions
+import shutil  # For clearing stale part directories
+import argparse  # For command line options
+from collections import deque  # For bounding the number of chunks in flight
+from concurrent.futures import ProcessPoolExecutor  # For generating chunks in parallel
+from datetime import date, timedelta  # Import date and timedelta for date calculations
+import numpy as np  # Import numpy for vectorized random draws
 import pandas as pd  # Import pandas for DataFrame operations
 
+from etl import write_frame, check_output_format, OUTPUT_FORMATS
 
-DATA_DIR = "data"  # Folder where generated CSV files will be saved
-NUM_USERS = 5  # Number of synthetic users to generate
-DAYS = 180  # Number of days of historical data
-START_DATE = datetime.now().date() - timedelta(days=DAYS-1)  # Start date of data (180 days ago)
 
-os.makedirs(DATA_DIR, exist_ok=True)  # Create data directory if it doesn't exist
+DATA_DIR = "data"  # Folder where generated files will be saved
+NUM_USERS = 5  # Default number of synthetic users to generate
+DAYS = 180  # Default number of days of historical data
+SEED = 0  # Default seed; the same seed always produces the same values
+USERS_CHUNK = 1_000_000  # Users generated (and written) per users.csv chunk
+DAYS_PER_CHUNK = 7  # Days of transactions generated per chunk
+USERS_PER_CHUNK = 100_000  # Users of transactions generated per chunk (a chunk is days x users)
+USERS_PER_STREAM = 10_000  # Users sharing one random stream per day; fixed, so chunking never changes values
 
+# Transaction categories and their sampling weights for daily spends
+CATEGORIES = ["groceries", "rent", "entertainment", "utilities", "travel", "transfer", "deposit", "salary", "subscription"]
+CATEGORY_WEIGHTS = np.array([30, 5, 10, 10, 5, 3, 3, 2, 5], dtype="float64")
+TYPES = ["deposit", "spend", "transfer"]
+MERCHANTS = ["employer", "bank_transfer"] + [f"merchant_{i}" for i in range(1, 31)]
 
-# 1) Generate users.csv
-users = []  # Initialize empty list to store user data
-for i in range(1, NUM_USERS+1):  # Loop over user IDs
-    users.append({
-        "user_id": i,  # Assign user ID
-        "name": f"user_{i}",  # Assign username
-        "starting_balance": round(random.uniform(200, 2000), 2)  # Random starting balance between 200-2000
+# Base prices of the named assets; further assets get a random base price
+BASE_PRICES = {"gold": 1800.0, "silver": 22.0, "bitcoin": 40000.0}
+
+# Independent random streams, so changing one dataset's size never changes another's values
+_USERS_STREAM, _TRANSACTIONS_STREAM, _PRICES_STREAM = 1, 2, 3
+
+
+# Function to generate users [start, stop) (user ids are 1-based)
+def generate_users(start, stop, seed=SEED):
+    ids = np.arange(start + 1, stop + 1)
+    balances = []
+    for block in range(start // USERS_CHUNK, (stop - 1) // USERS_CHUNK + 1 if stop > start else 0):
+        rng = np.random.default_rng([seed, _USERS_STREAM, block])  # One stream per block of users
+        lo, hi = max(start, block * USERS_CHUNK), min(stop, (block + 1) * USERS_CHUNK)
+        rng.bit_generator.advance(lo - block * USERS_CHUNK)  # Skip the users before the slice (one draw each)
+        balances.append(rng.uniform(200, 2000, hi - lo))
+    balance = np.concatenate(balances) if balances else np.zeros(0)
+    return pd.DataFrame({
+        "user_id": ids,
+        "name": "user_" + pd.Series(ids).astype(str),
+        "starting_balance": np.round(balance, 2),  # Random starting balance between 200-2000
+    })
+
+
+# Function to generate one day of transactions of the users in one stream block (without transaction ids).
+# Block b holds users b * USERS_PER_STREAM + 1 .. (b + 1) * USERS_PER_STREAM, cut at num_users.
+def generate_user_block(day_offset, block, num_users, start_date, seed=SEED):
+    rng = np.random.default_rng([seed, _TRANSACTIONS_STREAM, day_offset, block])  # One stream per day and block
+    users = np.arange(block * USERS_PER_STREAM + 1, min((block + 1) * USERS_PER_STREAM, num_users) + 1)
+    num_users = len(users)
+    day = np.datetime64(start_date + timedelta(days=day_offset), "s")
+
+    # Monthly salary deposit (every 30 days, 3rd day)
+    salary = (day_offset % 30) == 2
+    sal_users = users if salary else users[:0]
+    sal_amount = rng.uniform(800, 3000, len(sal_users))
+
+    # Random deposits
+    dep_users = users[rng.random(num_users) < 0.05]
+    dep_amount = rng.uniform(50, 1000, len(dep_users))
+
+    # Random daily spending transactions: Poisson count per user, weighted category per spend
+    n_spends = rng.poisson(0.9, num_users)
+    sp_users = np.repeat(users, n_spends)
+    n = len(sp_users)
+    cat = rng.choice(len(CATEGORIES), size=n, p=CATEGORY_WEIGHTS / CATEGORY_WEIGHTS.sum())
+    u = rng.random(n)
+    normal = np.round(np.abs(rng.normal(50, 30, n)), 2) + 1  # Normal distribution for other categories
+    sp_amount = np.select(
+        [cat == CATEGORIES.index("rent"), cat == CATEGORIES.index("deposit"), cat == CATEGORIES.index("transfer")],
+        [400 + u * 800, 20 + u * 380, 50 + u * 750],
+        normal,
+    )
+    sp_type = np.select([cat == CATEGORIES.index("deposit"), cat == CATEGORIES.index("transfer")], [0, 2], 1)
+    sp_seconds = rng.integers(8, 23, n) * 3600 + rng.integers(0, 60, n) * 60  # Random time during day
+    sp_merchant = rng.integers(1, 31, n) + 1
+    keep = cat != CATEGORIES.index("salary")  # Salary is handled separately
+
+    # Per user: salary, then deposit, then spends in draw order
+    user_id = np.concatenate([sal_users, dep_users, sp_users[keep]])
+    order = np.argsort(user_id, kind="stable")
+    seconds = np.concatenate([np.full(len(sal_users), 9 * 3600), np.full(len(dep_users), 11 * 3600), sp_seconds[keep]])
+    cat_codes = np.concatenate([np.full(len(sal_users), CATEGORIES.index("salary")),
+                                np.full(len(dep_users), CATEGORIES.index("deposit")), cat[keep]])
+    type_codes = np.concatenate([np.zeros(len(sal_users), "int64"), np.zeros(len(dep_users), "int64"), sp_type[keep]])
+    merchant_codes = np.concatenate([np.zeros(len(sal_users), "int64"), np.ones(len(dep_users), "int64"),
+                                     sp_merchant[keep]])
+    amount = np.concatenate([sal_amount, dep_amount, sp_amount[keep]])
+    return pd.DataFrame({
+        "user_id": user_id[order],
+        "timestamp": day + seconds[order].astype("timedelta64[s]"),
+        "amount": np.round(amount[order], 2),
+        "category": pd.Categorical.from_codes(cat_codes[order], CATEGORIES),
+        "type": pd.Categorical.from_codes(type_codes[order], TYPES),
+        "merchant": pd.Categorical.from_codes(merchant_codes[order], MERCHANTS),
+    })
+
+
+# Function to generate all transactions of one day (without transaction ids)
+def generate_day(day_offset, num_users, start_date, seed=SEED):
+    units = [(block, day_offset) for block in range(-(-num_users // USERS_PER_STREAM))]
+    return generate_days(units, num_users, start_date, seed)
+
+
+# Function to generate the transactions of a list of (stream block, day) units, in that order
+# (runs in a worker process)
+def generate_days(units, num_users, start_date, seed=SEED):
+    return pd.concat([generate_user_block(d, b, num_users, start_date, seed) for b, d in units], ignore_index=True)
+
+
+# Function to yield transactions with sequential transaction ids, about users_per_chunk users x days_per_chunk
+# days per chunk, so a chunk's size does not grow with the number of users.
+# Rows are always in (stream block, day, user) order: all days of users 1..USERS_PER_STREAM, then the next
+# block (so up to USERS_PER_STREAM users this is plain day order); chunks are consecutive runs of
+# (block, day) units of that order. Every unit has its own random stream, so the rows and their ids do not
+# depend on chunk sizes or worker count.
+def iter_transaction_chunks(num_users, days, start_date, seed=SEED, days_per_chunk=DAYS_PER_CHUNK, workers=1,
+                            users_per_chunk=USERS_PER_CHUNK):
+    units = [(b, d) for b in range(-(-num_users // USERS_PER_STREAM)) for d in range(days)]
+    step = max(1, users_per_chunk // USERS_PER_STREAM) * days_per_chunk  # Chunks hold whole units
+    blocks = [units[i:i + step] for i in range(0, len(units), step)]
+    next_id = 1
+
+    def numbered(chunk):
+        nonlocal next_id
+        chunk.insert(0, "transaction_id", np.arange(next_id, next_id + len(chunk)))
+        next_id += len(chunk)
+        return chunk
+
+    if workers == 1:
+        for block in blocks:
+            yield numbered(generate_days(block, num_users, start_date, seed))
+        return
+
+    # Keep at most 2 chunks per worker in flight so memory stays bounded when writing is the bottleneck
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for block in blocks:
+            pending.append(pool.submit(generate_days, block, num_users, start_date, seed))
+            if len(pending) >= 2 * workers:
+                yield numbered(pending.popleft().result())
+        while pending:
+            yield numbered(pending.popleft().result())
+
+
+# Function to generate all transactions in memory (small datasets and tests)
+def generate_transactions(num_users=NUM_USERS, days=DAYS, start_date=None, seed=SEED):
+    start_date = start_date or date.today() - timedelta(days=days - 1)
+    return pd.concat(iter_transaction_chunks(num_users, days, start_date, seed), ignore_index=True)
+
+
+# Function to generate daily prices for n_assets (gold, silver, bitcoin first)
+def generate_prices(days=DAYS, start_date=None, n_assets=3, seed=SEED):
+    start_date = start_date or date.today() - timedelta(days=days - 1)
+    rng = np.random.default_rng([seed, _PRICES_STREAM])
+    names = list(BASE_PRICES)[:n_assets] + [f"asset_{i}" for i in range(len(BASE_PRICES) + 1, n_assets + 1)]
+    base = np.array([BASE_PRICES.get(a, 0.0) for a in names])
+    extra = base == 0
+    base[extra] = np.round(np.exp(rng.uniform(0, 10, extra.sum())), 2)  # Random base price for extra assets
+
+    i = np.arange(days)[:, None]
+    noise = rng.normal(0, 1, (days, n_assets))  # Random noise for realism
+    price = base * (1 + 0.0006 * i) + noise * (base * 0.005)  # Simulate price trend + noise
+    price = np.maximum(0.01, np.round(price, 2))  # Avoid negative prices, round to 2 decimals
+    dates = np.datetime64(start_date, "D") + np.arange(days).astype("timedelta64[D]")
+    return pd.DataFrame({
+        "date": np.repeat(dates, n_assets),
+        "asset": np.tile(names, days),
+        "price": price.ravel(),
     })
-users_df = pd.DataFrame(users)  # Convert list of users to DataFrame
-users_df.to_csv(os.path.join(DATA_DIR, "users.csv"), index=False)  # Save as CSV
-print("Wrote:", os.path.join(DATA_DIR, "users.csv"))  # Print confirmation
-
-
-# 2) Generate transactions.csv
-CATEGORIES = ["groceries", "rent", "entertainment", "utilities", "travel", "transfer", "deposit", "salary", "subscription"]  # Transaction categories
-transactions = []  # Initialize list to store transactions
-trans_id = 1  # Initialize transaction ID counter
-
-# Loop through each day in history
-for day_offset in range(DAYS):
-    date = START_DATE + timedelta(days=day_offset)  # Current date
-    for user in users:  # Loop through each user
-        # Monthly salary deposit (every 30 days, 3rd day)
-        if (day_offset % 30) == 2:
-            amount = round(random.uniform(800, 3000), 2)
-            transactions.append({
-                "transaction_id": trans_id,
-                "user_id": user["user_id"],
-                "timestamp": f"{date} 09:00:00",
-                "amount": amount,
-                "category": "salary",
-                "type": "deposit",
-                "merchant": "employer"
-            })
-            trans_id += 1
-        # Random deposits
-        if random.random() < 0.05:
-            amount = round(random.uniform(50, 1000), 2)
-            transactions.append({
-                "transaction_id": trans_id,
-                "user_id": user["user_id"],
-                "timestamp": f"{date} 11:00:00",
-                "amount": amount,
-                "category": "deposit",
-                "type": "deposit",
-                "merchant": "bank_transfer"
-            })
-            trans_id += 1
-        # Random daily spending transactions
-        num_spends = np.random.poisson(0.9)  # Number of spends per day follows Poisson distribution
-        for _ in range(num_spends):
-            cat = random.choices(CATEGORIES, weights=[30,5,10,10,5,3,3,2,5])[0]  # Weighted category choice
-            if cat == "rent":
-                amt = round(random.uniform(400, 1200),2)
-                ttype = "spend"
-            elif cat == "salary":
-                continue  # Skip, salary handled separately
-            elif cat == "deposit":
-                amt = round(random.uniform(20, 400),2)
-                ttype = "deposit"
-            elif cat == "transfer":
-                amt = round(random.uniform(50, 800),2)
-                ttype = "transfer"
-            else:
-                amt = round(abs(np.random.normal(50, 30)),2) + 1  # Normal distribution for other categories
-                ttype = "spend"
-            transactions.append({
-                "transaction_id": trans_id,
-                "user_id": user["user_id"],
-                "timestamp": f"{date} {random.randint(8,22)}:{random.randint(0,59):02d}:00",  # Random time during day
-                "amount": amt,
-                "category": cat,
-                "type": ttype,
-                "merchant": f"merchant_{random.randint(1,30)}"
-            })
-            trans_id += 1
-
-# Convert transactions list to DataFrame and save CSV
-trans_df = pd.DataFrame(transactions)
-trans_df.to_csv(os.path.join(DATA_DIR, "transactions.csv"), index=False)
-print("Wrote:", os.path.join(DATA_DIR, "transactions.csv"))
-
-
-# 3) Generate prices.csv for assets
-assets = ["gold", "silver", "bitcoin"]  # Assets to generate prices for
-price_rows = []  # Initialize list to store price records
-np.random.seed(0)  # Seed for reproducibility
-
-for i in range(DAYS):
-    date = START_DATE + timedelta(days=i)  # Current date
-    for asset in assets:
-        base = {"gold":1800.0, "silver":22.0, "bitcoin":40000.0}[asset]  # Base price
-        noise = np.random.normal(0, 1)  # Random noise for realism
-        price = base * (1 + 0.0006*i) + noise * (base * 0.005)  # Simulate price trend + noise
-        price = max(0.01, float(round(price, 2)))  # Avoid negative prices, round to 2 decimals
-        price_rows.append({"date": str(date), "asset": asset, "price": price})  # Append to list
-
-prices_df = pd.DataFrame(price_rows)  # Convert price list to DataFrame
-prices_df.to_csv(os.path.join(DATA_DIR, "prices.csv"), index=False)  # Save CSV
-print("Wrote:", os.path.join(DATA_DIR, "prices.csv"))
-
-
-print("Data generation complete. Files in ./data")  # Final confirmation message
+
+
+# Helper to remove a previous output (file or directory of parts) before writing parts
+def _clear(directory, name, fmt):
+    path = os.path.join(directory, f"{name}.{fmt}")
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+# Function to generate and write users, transactions and prices, streaming chunk by chunk
+def generate_dataset(data_dir=DATA_DIR, num_users=NUM_USERS, days=DAYS, n_assets=3, seed=SEED, start_date=None,
+                     fmt="csv", workers=1, days_per_chunk=DAYS_PER_CHUNK, users_per_chunk=USERS_PER_CHUNK):
+    check_output_format(fmt)  # Before any existing file is cleared
+    start_date = start_date or date.today() - timedelta(days=days - 1)
+    os.makedirs(data_dir, exist_ok=True)  # Create data directory if it doesn't exist
+
+    # 1) users
+    _clear(data_dir, "users", fmt)
+    for part, lo in enumerate(range(0, num_users, USERS_CHUNK)):
+        write_frame(generate_users(lo, min(lo + USERS_CHUNK, num_users), seed), data_dir, "users", fmt, part=part)
+    print("Wrote:", os.path.join(data_dir, f"users.{fmt}"))
+
+    # 2) transactions
+    _clear(data_dir, "transactions", fmt)
+    rows = 0
+    chunks = iter_transaction_chunks(num_users, days, start_date, seed, days_per_chunk, workers, users_per_chunk)
+    for part, chunk in enumerate(chunks):
+        write_frame(chunk, data_dir, "transactions", fmt, part=part)
+        rows += len(chunk)
+    print("Wrote:", os.path.join(data_dir, f"transactions.{fmt}"), f"({rows} rows)")
+
+    # 3) prices
+    _clear(data_dir, "prices", fmt)
+    write_frame(generate_prices(days, start_date, n_assets, seed), data_dir, "prices", fmt)
+    print("Wrote:", os.path.join(data_dir, f"prices.{fmt}"))
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic users, transactions and prices.")
+    parser.add_argument("--users", type=int, default=NUM_USERS, help="Number of users")
+    parser.add_argument("--days", type=int, default=DAYS, help="Days of history")
+    parser.add_argument("--assets", type=int, default=3, help="Number of assets in prices")
+    parser.add_argument("--seed", type=int, default=SEED, help="Random seed")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=None,
+                        help="First day (YYYY-MM-DD); defaults to --days ago, pass it for byte-identical reruns")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv", help="Output file format")
+    parser.add_argument("--workers", type=int, default=1, help="Processes generating chunks in parallel")
+    parser.add_argument("--days-per-chunk", type=int, default=DAYS_PER_CHUNK, help="Days per written chunk")
+    parser.add_argument("--users-per-chunk", type=int, default=USERS_PER_CHUNK,
+                        help=f"Users per written chunk (rounded down to a multiple of {USERS_PER_STREAM})")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Output directory")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    generate_dataset(args.data_dir, args.users, args.days, args.assets, args.seed, args.start_date,
+                     args.format, args.workers, args.days_per_chunk, args.users_per_chunk)
+    print(f"Data generation complete. Files in ./{args.data_dir}")  # Final confirmation message
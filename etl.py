@@ -1,29 +1,185 @@
 import os  # Import os to handle file paths
+import json  # Import json to store cache metadata
+import hashlib  # Import hashlib for content-hash cache validation
 import pandas as pd  # Import pandas for data handling
 
+from schema import USERS_SCHEMA, TRANSACTIONS_SCHEMA, PRICES_SCHEMA, apply_schema
+
 
 # Directory where CSV data files are stored
 DATA_DIR = "data"
 
+# Dtypes read_csv applies while parsing transactions (categoricals, with whatever categories the file has);
+# the numeric downcasts and fixed categories of schema.TRANSACTIONS_SCHEMA are applied after parsing,
+# where they are checked
+TRANSACTION_DTYPES = {col: "category" for col, dtype in TRANSACTIONS_SCHEMA.items() if dtype == "category"}
+
+# Default number of rows per chunk in streaming mode
+DEFAULT_CHUNKSIZE = 500_000
+
+# Typed columnar cache kept next to each CSV ("<name>.csv.cache.<format>")
+CACHE_ENABLED = True
+# How a cache is matched to its CSV: "mtime" (modification time + size) or "hash" (SHA-256 of the content)
+CACHE_VALIDATION = "mtime"
+
+# Formats accepted by write_frame()
+OUTPUT_FORMATS = ("csv", "parquet", "feather")
+
+
+# Helper: whether pyarrow (the optional Parquet / Feather engine) is installed
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401  (optional dependency)
+        return True
+    except ImportError:
+        return False
+
+
+# Helper to pick the cache format: Parquet when pyarrow is installed, pickle otherwise
+def _cache_format():
+    return "parquet" if _has_pyarrow() else "pickle"
+
+
+# Function to check an output format before anything is computed: ValueError for an unknown format,
+# ImportError when Parquet / Feather is asked for without pyarrow installed
+def check_output_format(fmt):
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {fmt!r}, expected one of {OUTPUT_FORMATS}")
+    if fmt != "csv" and not _has_pyarrow():
+        raise ImportError(f"the {fmt} format needs pyarrow (pip install pyarrow); use csv without it")
+
+
+# Helper to fingerprint a source file for cache invalidation
+def _source_fingerprint(path):
+    st = os.stat(path)
+    fp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if CACHE_VALIDATION == "hash":
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):  # Hash in 1 MiB blocks
+                h.update(block)
+        fp = {"size": st.st_size, "sha256": h.hexdigest()}
+    return fp
+
+
+# Function to read a CSV through its columnar cache, rebuilding the cache when the CSV changed
+def _cached_read(path, read_csv):
+    if not CACHE_ENABLED:
+        return read_csv(path)
+
+    fmt = _cache_format()
+    cache_path = f"{path}.cache.{fmt}"  # Typed copy of the parsed CSV
+    meta_path = f"{path}.cache.json"  # Fingerprint of the CSV the cache was built from
+    fp = _source_fingerprint(path)
+
+    # Warm path: fingerprint matches, load the typed frame without any text parsing
+    if os.path.exists(cache_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("format") == fmt and meta.get("source") == fp:
+            return pd.read_parquet(cache_path) if fmt == "parquet" else pd.read_pickle(cache_path)
 
-# Function to load users.csv
-def load_users():
-    path = os.path.join(DATA_DIR, "users.csv")  # Construct file path to users.csv
-    return pd.read_csv(path)  # Read CSV into pandas DataFrame and return
+    # Cold path: parse the CSV and refresh the cache
+    df = read_csv(path)
+    if fmt == "parquet":
+        df.to_parquet(cache_path, index=False)
+    else:
+        df.to_pickle(cache_path)
+    with open(meta_path, "w") as f:
+        json.dump({"format": fmt, "source": fp}, f)
+    return df
 
 
-# Function to load transactions.csv
-def load_transactions():
+# Function to write a result frame as CSV, Parquet or Feather
+def write_frame(df, directory, name, fmt="csv", part=None):
+    check_output_format(fmt)
+
+    path = os.path.join(directory, f"{name}.{fmt}")
+    if part is not None and fmt != "csv":
+        # Columnar outputs written in parts become a directory of part files
+        if part == 0 and os.path.isdir(path):
+            for stale in os.listdir(path):  # Parts of an earlier run must not be read back with this one
+                os.remove(os.path.join(path, stale))
+        os.makedirs(path, exist_ok=True)
+        path = os.path.join(path, f"part-{part:05d}.{fmt}")
+
+    if fmt == "csv":
+        first = part is None or part == 0  # CSV parts are appended to a single file
+        df.to_csv(path, index=False, mode="w" if first else "a", header=first)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(path)
+    return os.path.basename(path) if part is None else f"{name}.{fmt}"
+
+
+# Function to read back a frame written by write_frame (single file or directory of parts)
+def read_frame(directory, name, fmt="csv"):
+    check_output_format(fmt)
+    path = os.path.join(directory, f"{name}.{fmt}")
+    if fmt == "csv":
+        return pd.read_csv(path, float_precision="round_trip")  # Floats read back bit for bit, as they were written
+    if fmt == "parquet":
+        return pd.read_parquet(path)  # Handles both a file and a directory of parts
+    if os.path.isdir(path):
+        parts = sorted(os.listdir(path))
+        return pd.concat([pd.read_feather(os.path.join(path, p)) for p in parts], ignore_index=True)
+    return pd.read_feather(path)
+
+
+# Function to load users.csv (or another users file)
+def load_users(path=None):
+    path = path or os.path.join(DATA_DIR, "users.csv")  # Construct file path to users.csv
+    return apply_schema(_cached_read(path, pd.read_csv), USERS_SCHEMA)  # Read CSV (or its cache) with compact dtypes
+
+
+# Function to load transactions.csv (or another transactions file)
+def load_transactions(path=None):
+    path = path or os.path.join(DATA_DIR, "transactions.csv")  # Construct file path to transactions.csv
+    return apply_schema(_cached_read(path, _read_transactions_csv), TRANSACTIONS_SCHEMA)  # Caches of older dtypes too
+
+
+# Helper that parses transactions.csv into its typed frame
+def _read_transactions_csv(path):
+    df = pd.read_csv(path, dtype=TRANSACTION_DTYPES, parse_dates=["timestamp"])  # Categoricals, parsed timestamps
+    return apply_schema(df, TRANSACTIONS_SCHEMA)  # int32 ids and float amounts, bounds-checked
+
+
+# Function to stream transactions.csv in chunks with compact dtypes
+def iter_transactions(chunksize=DEFAULT_CHUNKSIZE, path=None):
+    path = path or os.path.join(DATA_DIR, "transactions.csv")  # Construct file path to transactions.csv
+    reader = pd.read_csv(
+        path,
+        dtype=TRANSACTION_DTYPES,  # Categoricals keep each chunk small
+        parse_dates=["timestamp"],  # Parse 'timestamp' column as datetime
+        chunksize=chunksize,  # Only one chunk is held in memory at a time
+    )
+    with reader:
+        for chunk in reader:
+            yield apply_schema(chunk, TRANSACTIONS_SCHEMA)  # Hand each chunk to the caller and drop it afterwards
+
+
+# Function to read rows appended to transactions.csv after a byte offset
+def read_transactions_since(offset):
     path = os.path.join(DATA_DIR, "transactions.csv")  # Construct file path to transactions.csv
-    df = pd.read_csv(path, parse_dates=["timestamp"])  # Read CSV and parse 'timestamp' column as datetime
-    # Ensure 'amount' column is float type for calculations
-    df["amount"] = df["amount"].astype(float)
-    return df  # Return the transactions DataFrame
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        columns = f.readline().decode().strip().split(",")  # Header row
+        if size < offset:
+            raise ValueError(f"{path} shrank below the last processed offset; run a full pipeline")
+        f.seek(max(offset, f.tell()))  # Skip everything processed before (and the header)
+        df = pd.read_csv(f, names=columns, dtype=TRANSACTION_DTYPES, parse_dates=["timestamp"])
+    return apply_schema(df, TRANSACTIONS_SCHEMA), size  # New rows and the offset to resume from next time
+
+
+# Function to load prices.csv (or another prices file)
+def load_prices(path=None):
+    path = path or os.path.join(DATA_DIR, "prices.csv")  # Construct file path to prices.csv
+    return apply_schema(_cached_read(path, _read_prices_csv), PRICES_SCHEMA)  # Read CSV (or its cache) and return
 
 
-# Function to load prices.csv
-def load_prices():
-    path = os.path.join(DATA_DIR, "prices.csv")  # Construct file path to prices.csv
+# Helper that parses and sorts prices.csv
+def _read_prices_csv(path):
     df = pd.read_csv(path, parse_dates=["date"])  # Read CSV and parse 'date' column as datetime
     df = df.sort_values(["asset", "date"]).reset_index(drop=True)  # Sort by asset and date, reset index
     return df  # Return the prices DataFrame
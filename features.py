@@ -1,14 +1,19 @@
 import pandas as pd  # Import pandas for data manipulation
 
+from store import TransactionStore, as_frame
+from rollups import rollup
+from streaming import DAILY_TYPES
 
-# Function to compute daily aggregates per user
+
+# Function to compute daily aggregates per user (accepts a frame or a TransactionStore)
 def daily_user_aggregates(transactions):
-    # Create a separate date column from timestamp
-    df = transactions.copy()  # Make a copy to avoid modifying original DataFrame
-    df["date"] = df["timestamp"].dt.date  # Extract date part of timestamp
+    df = as_frame(transactions)
+    if isinstance(transactions, TransactionStore):
+        df = df.sort_index()  # Sum each day in arrival order, as on the raw frame (float sums depend on order)
+    date = df["timestamp"].dt.normalize().rename("date")  # Calendar day as datetime64 (no copy of the frame)
 
     # Aggregate amounts by user, date, and type (spend/deposit/transfer)
-    agg = df.groupby(["user_id", "date", "type"])["amount"].sum().reset_index()
+    agg = df["amount"].groupby([df["user_id"], date, df["type"]]).sum().reset_index()
 
     # Pivot the 'type' column to create separate columns for spend, deposit, transfer
     pivot = agg.pivot_table(
@@ -17,6 +22,9 @@ def daily_user_aggregates(transactions):
         values="amount",  # Values = aggregated amount
         fill_value=0  # Fill missing combinations with 0
     ).reset_index()
+    # Every transaction type gets a column, even when a shard or an empty input has none of its rows
+    types = sorted(set(DAILY_TYPES).union(pivot.columns[2:]))
+    pivot = pivot.reindex(columns=["user_id", "date", *types], fill_value=0.0)
 
     # Calculate total net movement: deposits minus spend and transfer
     pivot["net"] = pivot.get("deposit", 0) - pivot.get("spend", 0) - pivot.get("transfer", 0)
@@ -25,44 +33,29 @@ def daily_user_aggregates(transactions):
     return pivot  # Return daily aggregated DataFrame
 
 
-# Function to compute weekly aggregates per user
+# Function to compute weekly aggregates per user (weeks start on Monday; see rollups.rollup)
 def weekly_user_aggregates(daily_agg):
-    d = daily_agg.copy()  # Make a copy
-    d["date"] = pd.to_datetime(d["date"])  # Ensure date column is datetime
-    # Convert date to week period, then get week start date
-    d["week"] = d["date"].dt.to_period("W").apply(lambda r: r.start_time.date())
-
-    # Aggregate spend, deposit, transfer, net per user per week
-    wk = d.groupby(["user_id", "week"]).agg({
-        "spend": "sum",
-        "deposit": "sum",
-        "transfer": "sum",
-        "net": "sum"
-    }).reset_index()
-
-    return wk  # Return weekly aggregated DataFrame
+    return rollup(daily_agg, "week")  # One pass over the (user, date)-ordered days, no Period objects
 
 
 # Function to add rolling features to daily aggregates
-def add_rolling_features(daily_agg):
+def add_rolling_features(daily_agg, windows=(7,), columns=("spend", "deposit")):
     d = daily_agg.copy()  # Copy to avoid modifying original
     d["date"] = pd.to_datetime(d["date"])  # Ensure date column is datetime
     d = d.sort_values(["user_id", "date"])  # Sort by user and date
 
-    # 7-day rolling average of spend
-    d["spend_7d_avg"] = d.groupby("user_id")["spend"].transform(
-        lambda x: x.rolling(7, min_periods=1).mean()
-    )
-    # 7-day rolling average of deposit
-    d["deposit_7d_avg"] = d.groupby("user_id")["deposit"].transform(
-        lambda x: x.rolling(7, min_periods=1).mean()
-    )
+    # Rolling averages of every column for every window (e.g. spend_7d_avg, net_30d_avg),
+    # one grouped rolling pass per window over all columns at once
+    cols = list(columns)
+    grouped = d.groupby("user_id", sort=False)[cols]
+    for w in windows:
+        rolled = grouped.rolling(w, min_periods=1).mean().reset_index(level=0, drop=True)
+        for col in cols:
+            d[f"{col}_{w}d_avg"] = rolled[col]
 
     # Compute daily savings rate: deposit / (deposit + spend)
     # Guard against divide-by-zero by returning 0 if sum is 0
-    d["savings_rate"] = d.apply(
-        lambda r: r["deposit"] / (r["deposit"] + r["spend"]) if (r["deposit"] + r["spend"]) > 0 else 0,
-        axis=1
-    )
+    total = d["deposit"] + d["spend"]
+    d["savings_rate"] = (d["deposit"] / total.where(total > 0)).fillna(0.0)
 
     return d  # Return daily features DataFrame with rolling averages and savings_rate
@@ -0,0 +1,256 @@
+import os  # For state file paths
+import pickle  # For persisting run state between runs
+import numpy as np  # For numerical computations
+import pandas as pd  # For data manipulation
+
+from etl import read_transactions_since, read_frame, write_frame
+from features import daily_user_aggregates, weekly_user_aggregates, add_rolling_features
+from budget import smart_overall_budget
+from summaries import compose_daily_summary, compose_weekly_summary
+from streaming import TransactionAggregates, score_chunks, _merge_stats, _remove_stats, _add_series, DAILY_TYPES
+from schema import DAILY_SCHEMA, WEEKLY_SCHEMA, apply_schema
+
+
+# File (inside the output directory) holding the state of the previous run
+STATE_FILE = os.path.join("state", "incremental.pkl")
+
+# Daily rows kept per user: enough history to recompute the 7-row rolling window
+TAIL_ROWS = 7
+
+
+# Raised when a delta cannot be applied incrementally and a full run is required
+class FullRunRequired(Exception):
+    pass
+
+
+# Function to check whether a previous run left incremental state behind
+def has_state(output_dir):
+    return os.path.exists(os.path.join(output_dir, STATE_FILE))
+
+
+# Function to drop the state of a previous incremental run. Every full run that does not save fresh state
+# calls it: its outputs replace the ones the state describes, so resuming from the old offset would fold
+# transactions in twice.
+def clear_state(output_dir):
+    path = os.path.join(output_dir, STATE_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+# Function to load the state of the previous run
+def load_state(output_dir):
+    with open(os.path.join(output_dir, STATE_FILE), "rb") as f:
+        return pickle.load(f)
+
+
+# Function to save run state atomically (write to a temp file, then rename)
+def save_state(state, output_dir):
+    path = os.path.join(output_dir, STATE_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+
+
+# Function to build incremental state at the end of a full run
+def build_state(tx_agg, daily, anom_tx, csv_offset):
+    # Last TAIL_ROWS daily rows per user, with the number of flagged transactions on each day
+    tail = _daily_with_anomaly_counts(daily, anom_tx)
+    tail = tail.groupby("user_id").tail(TAIL_ROWS).reset_index(drop=True)
+
+    return {
+        "csv_offset": csv_offset,  # Byte offset in transactions.csv already processed
+        "last_transaction_id": tx_agg.max_transaction_id,  # Guards against re-reading rows
+        "tx_stats": tx_agg.user_stats,  # Per-user count / mean / M2 of absolute amounts
+        "category_month": tx_agg.category_month,  # Per-user-category-month spend in cents
+        "last_timestamp": tx_agg.last_timestamp,  # End of the data, for the budgets' last closed month
+        "net_stats": _net_stats(daily),  # Per-user count / mean / M2 of daily net
+        "tail": tail,  # Rolling window tail per user
+    }
+
+
+# Helper to attach per-day flagged transaction counts to daily rows
+def _daily_with_anomaly_counts(daily, anom_tx):
+    d = daily.copy()
+    d["date"] = pd.to_datetime(d["date"])
+    flagged = anom_tx[anom_tx["is_anomaly"].astype(bool)]
+    counts = flagged.groupby([flagged["user_id"], flagged["timestamp"].dt.normalize()]).size()
+    counts.index.names = ["user_id", "date"]
+    d = d.merge(counts.rename("anomalies").reset_index(), on=["user_id", "date"], how="left")
+    d["anomalies"] = d["anomalies"].fillna(0).astype("int64")
+    return d.sort_values(["user_id", "date"]).reset_index(drop=True)
+
+
+# Helper to compute per-user count / mean / M2 of daily net (two passes: mean first, then squared deviations,
+# so the variance does not come from a difference of two large sums)
+def _net_stats(daily):
+    net = daily["net"].astype("float64")
+    g = net.groupby(daily["user_id"])
+    mean = g.mean()
+    dev = net - daily["user_id"].map(mean)
+    return pd.DataFrame({"count": g.count(), "mean": mean, "m2": (dev * dev).groupby(daily["user_id"]).sum()})
+
+
+# Helper: net statistics of the state, converting the count / sum / sumsq layout saved by older versions
+def _state_net_stats(state):
+    stats = state["net_stats"]
+    if "sumsq" not in stats.columns:
+        return stats
+    mean = stats["sum"] / stats["count"]
+    return pd.DataFrame({"count": stats["count"], "mean": mean, "m2": stats["sumsq"] - stats["count"] * mean ** 2})
+
+
+# Helper to replace rows of `existing` that share key columns with `new` and re-sort
+def _upsert(existing, new, keys):
+    existing_keys = pd.MultiIndex.from_frame(existing[keys])
+    new_keys = pd.MultiIndex.from_frame(new[keys])
+    kept = existing[~existing_keys.isin(new_keys)]
+    return pd.concat([kept, new], ignore_index=True).sort_values(keys, kind="stable").reset_index(drop=True)
+
+
+# Helper to read an output frame back with the column types the batch stages produce
+def _read_output(output_dir, name, fmt):
+    return apply_schema(apply_schema(read_frame(output_dir, name, fmt), DAILY_SCHEMA), WEEKLY_SCHEMA)
+
+
+# Function to apply transactions appended since the last run to every per-user output
+def run_incremental(output_dir, fmt="csv", z_thresh=3.0):
+    state = load_state(output_dir)
+
+    # 1) Read only the bytes appended to transactions.csv since the last run
+    delta, csv_offset = read_transactions_since(state["csv_offset"])
+    delta = delta[delta["transaction_id"] > state["last_transaction_id"]]
+    if delta.empty:
+        print("No new transactions since the last run.")
+        return state
+
+    # 2) Fold the delta into per-user running statistics and category-month sums
+    delta_agg = TransactionAggregates().update(delta)
+    tx_stats = _merge_stats(state["tx_stats"], delta_agg.user_stats)
+    category_month = _add_series(state["category_month"], delta_agg.category_month)
+
+    # 3) Merge the delta's daily sums into the per-user rolling tails
+    tail = state["tail"]
+    delta_daily = daily_user_aggregates(delta)
+    for col in DAILY_TYPES:
+        if col not in delta_daily.columns:
+            delta_daily[col] = 0.0
+    touched_users = delta_daily["user_id"].unique()
+
+    # A delta may only append new days or extend each user's latest day; anything older
+    # falls outside the kept window and needs a full run
+    last_day = tail.groupby("user_id")["date"].max()
+    first_touched = delta_daily.groupby("user_id")["date"].min()
+    known = first_touched.index.intersection(last_day.index)
+    if (first_touched[known] < last_day[known]).any():
+        raise FullRunRequired("delta contains days older than the latest processed day")
+
+    # Score the new transactions against the updated per-user statistics
+    stats = tx_stats.copy()
+    stats["std"] = np.sqrt(stats["m2"] / stats["count"])
+    anom_delta = next(score_chunks([delta], stats, z_thresh))
+    anom_delta = anom_delta.sort_values(["user_id", "timestamp"], kind="stable")
+    new_flags = anom_delta[anom_delta["is_anomaly"]]
+    new_counts = new_flags.groupby([new_flags["user_id"], new_flags["timestamp"].dt.normalize()]).size()
+
+    # Rows of touched users: their tail plus the delta days, summed per (user, date)
+    cols = ["user_id", "date"] + DAILY_TYPES
+    user_tail = tail[tail["user_id"].isin(touched_users)]
+    merged = (
+        pd.concat([user_tail[cols + ["anomalies"]], delta_daily[cols].assign(anomalies=0)], ignore_index=True)
+        .groupby(["user_id", "date"], as_index=False).sum()
+    )
+    merged["net"] = merged["deposit"] - merged["spend"] - merged["transfer"]
+    key = pd.MultiIndex.from_frame(merged[["user_id", "date"]])
+    merged["anomalies"] += new_counts.reindex(key, fill_value=0).to_numpy()
+
+    # Rows whose values changed: every (user, date) at or after the user's first touched day
+    changed = merged["date"].to_numpy() >= merged["user_id"].map(first_touched).to_numpy()
+
+    # 4) Update per-user daily net statistics: remove replaced days, add new values
+    old = user_tail.merge(merged.loc[changed, ["user_id", "date"]], on=["user_id", "date"])
+    net_stats = _merge_stats(_remove_stats(_state_net_stats(state), _net_stats(old)), _net_stats(merged[changed]))
+
+    # 5) Daily rows, rolling features and net z-scores for the changed rows only
+    daily_rows = merged[cols + ["net"]]
+    daily_out = daily_rows[changed]
+    daily_all = _upsert(_read_output(output_dir, "daily_aggregates", fmt), daily_out, ["user_id", "date"])
+    # Rolling means are recomputed over each touched user's whole history: a window started on the kept
+    # tail would round differently from the full run's
+    history = daily_all[daily_all["user_id"].isin(touched_users)]
+    out_keys = pd.MultiIndex.from_frame(daily_out[["user_id", "date"]])
+    feat_rows = add_rolling_features(history).loc[lambda d: pd.MultiIndex.from_frame(d[["user_id", "date"]])
+                                                  .isin(out_keys)]
+    mu = merged["user_id"].map(net_stats["mean"]).to_numpy()
+    sigma = np.sqrt(np.clip(merged["user_id"].map(net_stats["m2"] / net_stats["count"]).to_numpy(), 0, None))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_net = np.where(np.isclose(sigma, 0) | np.isnan(sigma), 0.0, (merged["net"].to_numpy() - mu) / sigma)
+    anom_daily_rows = daily_rows.assign(z_net=z_net, is_anomaly=np.abs(z_net) > z_thresh)[changed]
+
+    # 6) Upsert changed rows into the previous outputs
+    feat_all = _upsert(_read_output(output_dir, "daily_features", fmt), feat_rows, ["user_id", "date"])
+    anom_daily_all = _upsert(_read_output(output_dir, "anomalies_daily", fmt), anom_daily_rows,
+                             ["user_id", "date"])
+    write_frame(daily_all, output_dir, "daily_aggregates", fmt)
+    write_frame(feat_all, output_dir, "daily_features", fmt)
+    write_frame(anom_daily_all, output_dir, "anomalies_daily", fmt)
+    _append_anomalies(anom_delta, output_dir, fmt)
+
+    # Weekly aggregates for the weeks touched by changed days
+    weeks = weekly_user_aggregates(daily_rows)
+    changed_weeks = weekly_user_aggregates(daily_out)[["user_id", "week"]]
+    weeks = weeks.merge(changed_weeks, on=["user_id", "week"])
+    wk_all = _upsert(_read_output(output_dir, "weekly_aggregates", fmt), weeks, ["user_id", "week"])
+    write_frame(wk_all, output_dir, "weekly_aggregates", fmt)
+
+    # 7) Budgets and summaries
+    tx_agg = TransactionAggregates()
+    tx_agg.category_month = category_month
+    ends = [t for t in (state.get("last_timestamp"), delta_agg.last_timestamp) if t is not None]
+    tx_agg.last_timestamp = max(ends) if ends else None  # State saved by older versions has no end
+    tx_agg.category_monthly_budget().to_csv(os.path.join(output_dir, "budgets_by_category.csv"), index=False)
+    smart_overall_budget(feat_all).to_csv(os.path.join(output_dir, "budgets_overall.csv"), index=False)
+
+    flagged_rows = merged.loc[changed].loc[lambda d: d["anomalies"] > 0]
+    flagged = flagged_rows.loc[flagged_rows.index.repeat(flagged_rows["anomalies"])]
+    flagged = pd.DataFrame({"user_id": flagged["user_id"], "timestamp": flagged["date"], "is_anomaly": True})
+    daily_summ = _upsert(_read_output(output_dir, "daily_summaries", "csv"), compose_daily_summary(feat_rows, flagged),
+                         ["user_id", "date"])
+    daily_summ.to_csv(os.path.join(output_dir, "daily_summaries.csv"), index=False)
+    weekly_summ = _upsert(_read_output(output_dir, "weekly_summaries", "csv"), compose_weekly_summary(weeks),
+                          ["user_id", "week"])
+    weekly_summ.to_csv(os.path.join(output_dir, "weekly_summaries.csv"), index=False)
+
+    # 8) Persist the new state: advanced offsets, merged statistics and refreshed tails
+    merged = merged[cols + ["net", "anomalies"]]
+    tail = (
+        pd.concat([tail[~tail["user_id"].isin(touched_users)], merged], ignore_index=True)
+        .sort_values(["user_id", "date"], kind="stable")
+        .groupby("user_id").tail(TAIL_ROWS)
+        .reset_index(drop=True)
+    )
+    state = {
+        "csv_offset": csv_offset,
+        "last_transaction_id": int(max(state["last_transaction_id"], delta["transaction_id"].max())),
+        "tx_stats": tx_stats,
+        "category_month": category_month,
+        "last_timestamp": tx_agg.last_timestamp,
+        "net_stats": net_stats,
+        "tail": tail,
+    }
+    save_state(state, output_dir)
+    print(f"Applied {len(delta)} new transactions for {len(touched_users)} users "
+          f"({int(changed.sum())} user-days updated).")
+    return state
+
+
+# Helper to append newly scored transactions to the transaction anomaly output
+def _append_anomalies(anom_delta, output_dir, fmt):
+    path = os.path.join(output_dir, f"anomalies_transactions.{fmt}")
+    if fmt == "csv":
+        write_frame(anom_delta, output_dir, "anomalies_transactions", fmt, part=1)  # Later CSV parts append
+    elif os.path.isdir(path):
+        write_frame(anom_delta, output_dir, "anomalies_transactions", fmt, part=len(os.listdir(path)))
+    else:
+        existing = read_frame(output_dir, "anomalies_transactions", fmt)
+        write_frame(pd.concat([existing, anom_delta], ignore_index=True), output_dir, "anomalies_transactions", fmt)
@@ -0,0 +1,179 @@
+import io  # For capturing profiler text
+import os  # For profile dump paths
+import json  # For structured log lines and the run report
+import time  # For wall-clock and CPU timing
+import threading  # For thread-safe record collection
+import tracemalloc  # For optional traced-memory deltas
+import cProfile  # For the opt-in stage profile
+import pstats  # For summarizing the cProfile dump
+from contextlib import contextmanager, nullcontext  # For the stage context managers
+import pandas as pd  # For the end-of-run report
+
+try:
+    import resource  # Peak RSS (Unix only)
+except ImportError:
+    resource = None
+
+_MB = 2 ** 20
+
+
+# Helper: peak resident set size of this process so far, in MB (None where unavailable)
+def peak_rss_mb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss is in KB on Linux
+
+
+# Helper: number of rows in a stage value (frames, dicts of frames, aggregate objects); None if unknown
+def row_count(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, dict):
+        counts = [row_count(v) for v in value.values()]
+        return sum(c for c in counts if c is not None) if any(c is not None for c in counts) else None
+    return getattr(value, "rows", None)  # e.g. streaming.TransactionAggregates
+
+
+# Records wall time, CPU time, row counts and memory of each pipeline stage.
+# Every record is appended to `log_path` as one JSON line as soon as the stage finishes;
+# report() returns all records as a table at the end of the run.
+# CPU time is the stage's own thread, and RSS / traced memory are process-wide, so for exact
+# memory attribution run stages one at a time (main.py --jobs 1).
+class Instrumentation:
+
+    enabled = True
+
+    def __init__(self, log_path=None, trace_memory=False, profile_stage=None, profiler="cprofile", profile_dir="."):
+        if profiler not in ("cprofile", "pyinstrument"):
+            raise ValueError(f"Unknown profiler {profiler!r}, expected 'cprofile' or 'pyinstrument'")
+        self.log_path = log_path  # JSON lines log, or None to keep records in memory only
+        self.trace_memory = trace_memory  # tracemalloc slows allocations, so it is opt-in
+        self.profile_stage = profile_stage  # Name of the stage to profile, if any
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.records = []
+        self._lock = threading.Lock()
+        self._log = open(log_path, "w") if log_path else None
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    # Context manager measuring one phase ("compute", "write", "cache_write", "cache_load", ...) of a stage.
+    # Yields the record so the caller can add rows_out or other fields.
+    @contextmanager
+    def stage(self, name, phase="compute", inputs=()):
+        rec = {"stage": name, "phase": phase}
+        if inputs:
+            counts = [row_count(v) for v in inputs]
+            rec["rows_in"] = sum(c for c in counts if c is not None)
+        rss0 = peak_rss_mb()
+        if self.trace_memory:
+            traced0 = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        profiler = self._start_profiler() if name == self.profile_stage and phase == "compute" else None
+        t0, c0 = time.perf_counter(), time.thread_time()
+        rec["status"] = "ok"
+        try:
+            yield rec
+        except BaseException:
+            rec["status"] = "error"
+            raise
+        finally:
+            rec["wall_seconds"] = round(time.perf_counter() - t0, 6)
+            rec["cpu_seconds"] = round(time.thread_time() - c0, 6)
+            if profiler is not None:
+                rec["profile"] = self._stop_profiler(profiler, name)
+            if rss0 is not None:
+                rss1 = peak_rss_mb()
+                rec["peak_rss_mb"] = round(rss1, 1)
+                rec["peak_rss_growth_mb"] = round(rss1 - rss0, 1)  # How far this phase raised the high-water mark
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                rec["traced_peak_mb"] = round((peak - traced0) / _MB, 2)
+                rec["traced_delta_mb"] = round((current - traced0) / _MB, 2)
+            self._emit(rec)
+
+    # Helper: store a record and append it to the JSON log
+    def _emit(self, rec):
+        rec = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), **rec}
+        with self._lock:
+            self.records.append(rec)
+            if self._log is not None:
+                self._log.write(json.dumps(rec) + "\n")
+                self._log.flush()
+
+    # Helper: start the configured profiler for the current thread
+    def _start_profiler(self):
+        if self.profiler == "pyinstrument":
+            from pyinstrument import Profiler  # Optional dependency
+            profiler = Profiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    # Helper: stop the profiler, dump it next to the outputs and print its summary; returns the dump path
+    def _stop_profiler(self, profiler, name):
+        if self.profiler == "pyinstrument":
+            profiler.stop()
+            path = os.path.join(self.profile_dir, f"profile_{name}.html")
+            with open(path, "w") as f:
+                f.write(profiler.output_html())
+            print(profiler.output_text())
+        else:
+            profiler.disable()
+            path = os.path.join(self.profile_dir, f"profile_{name}.prof")
+            profiler.dump_stats(path)  # Open with pstats or snakeviz
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(20)
+            print(out.getvalue())
+        print(f"Saved profile of stage {name} to {path}")
+        return path
+
+    # End-of-run report: one row per stage phase, slowest first
+    def report(self):
+        if not self.records:
+            return pd.DataFrame()
+        df = pd.DataFrame(self.records).drop(columns=["time"])
+        first = ["stage", "phase", "status", "wall_seconds", "cpu_seconds", "rows_in", "rows_out"]
+        df = df[[c for c in first if c in df] + [c for c in df if c not in first]]
+        for col in ("rows_in", "rows_out"):
+            if col in df:
+                df[col] = df[col].astype("Int64")  # Missing counts stay <NA> instead of turning rows into floats
+        return df.sort_values("wall_seconds", ascending=False, kind="stable").reset_index(drop=True)
+
+    # Write the report as JSON (with process totals) and return the table
+    def write_report(self, path):
+        df = self.report()
+        rows = df.astype(object).where(df.notna(), None).to_dict("records")  # Missing fields become null, not NaN
+        summary = {"peak_rss_mb": peak_rss_mb(), "stages": rows}
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=1, default=str)
+        return df
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+# Stand-in used when instrumentation is off: stage() is a shared no-op context manager
+class NullInstrumentation:
+
+    enabled = False
+    profile_stage = None  # Nothing is profiled
+    _context = nullcontext({})  # Reusable; the yielded dict is scratch space nobody reads
+
+    def stage(self, name, phase="compute", inputs=()):
+        return self._context
+
+    def report(self):
+        return pd.DataFrame()
+
+    def close(self):
+        pass
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
@@ -1,58 +1,179 @@
+import string  # For reading the fields used by reason templates
+import numpy as np  # Import numpy for vectorized rule evaluation
 import pandas as pd  # Import pandas for data manipulation
 
 
-# Function to compute short-term and long-term momentum of assets
+# Function to pivot prices into a date x asset matrix and compute returns over several windows.
+# Returns (prices_wide, {window: returns_wide}); windows count rows of the panel (the dates
+# present in prices), and a return touching a missing price is NaN. When a (date, asset) pair appears more
+# than once, its last row wins, as with a price feed that re-sends a corrected quote.
+def momentum_matrices(prices, windows=(7, 30, 90)):
+    wide = (
+        prices.assign(date=pd.to_datetime(prices["date"]))  # Work on a copy; the input is not mutated
+        .drop_duplicates(["date", "asset"], keep="last")  # pivot() refuses duplicate (date, asset) rows
+        .pivot(index="date", columns="asset", values="price")
+        .sort_index()
+    )
+    values = wide.to_numpy(dtype="float64")
+    returns = {}
+    for w in windows:
+        r = np.full_like(values, np.nan)
+        if w < len(values):
+            r[w:] = values[w:] / values[:-w] - 1  # Same arithmetic as Series.pct_change(periods=w)
+        returns[w] = pd.DataFrame(r, index=wide.index, columns=wide.columns)
+    return wide, returns
+
+
+# Function to compute the full-history momentum panel in long format:
+# one row per (asset, date) with price and pct_<w>d for every window
+def momentum_panel(prices, windows=(7, 30, 90)):
+    wide, returns = momentum_matrices(prices, windows)
+    panel = wide.stack().rename("price").to_frame()  # Drops dates an asset has no price for
+    for w, r in returns.items():
+        panel[f"pct_{w}d"] = r.stack(future_stack=True).reindex(panel.index)
+    return panel.reset_index()[["asset", "date", "price"] + [f"pct_{w}d" for w in windows]] \
+        .sort_values(["asset", "date"]).reset_index(drop=True)
+
+
+# Function to compute short-term and long-term momentum of assets (latest snapshot per asset)
 def asset_momentum(df, window_short=7, window_long=30):
-    df["date"] = pd.to_datetime(df["date"])  # Ensure 'date' column is datetime type
-    out = []  # Initialize list to store momentum snapshots per asset
+    wide, returns = momentum_matrices(df, (window_short, window_long))
+    values = wide.to_numpy()
+
+    # Latest row with a price for each asset
+    has_price = ~np.isnan(values)
+    last = len(values) - 1 - np.argmax(has_price[::-1], axis=0)
+    cols = np.arange(values.shape[1])
+
+    out = pd.DataFrame({
+        "asset": wide.columns.to_numpy(),  # Asset name
+        "date": wide.index[last].date,  # Latest date
+        "price": values[last, cols],  # Latest price
+        "pct_7d": returns[window_short].to_numpy()[last, cols],  # Short-window change
+        "pct_30d": returns[window_long].to_numpy()[last, cols],  # Long-window change
+    })
+    out[["pct_7d", "pct_30d"]] = out[["pct_7d", "pct_30d"]].fillna(0.0)  # 0 if NaN
+    return out  # Return DataFrame with momentum snapshot for each asset
+
+
+# Recommendation rules, evaluated in order for every (user, asset) pair.
+# Each rule has conditions on the asset row (from asset_momentum) and on the user row
+# (from the surplus frame); reasons are format templates over the same rows, where
+# "<col>_pct" is the column multiplied by 100. The user template is appended to the asset one.
+RECOMMENDATION_RULES = [
+    {
+        # Buy signal: asset dropped >3% in 7 days and user has healthy savings_rate (>15%)
+        "action": "BUY",
+        "asset_conditions": [("pct_7d", "<", -0.03)],
+        "user_conditions": [("savings_rate", ">", 0.15)],
+        "asset_reason": "{asset} down {pct_7d_pct:.2f}% in 7d",
+        "user_reason": " and savings_rate {savings_rate:.2f}",
+    },
+    {
+        # Take profit signal: asset rose >6% in 7 days
+        "action": "CONSIDER_TAKE_PROFIT",
+        "asset_conditions": [("pct_7d", ">", 0.06)],
+        "user_conditions": [],
+        "asset_reason": "{asset} up {pct_7d_pct:.2f}% in 7d",
+        "user_reason": "",
+    },
+]
+
+# Comparison operators allowed in rule conditions
+_OPS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal, "==": np.equal, "!=": np.not_equal}
+
+# Columns of the recommendations frame
+RECOMMENDATION_COLUMNS = ["user_id", "asset", "action", "reason", "price"]
+
+
+# Helper: row mask for a list of (column, op, threshold) conditions
+def _rule_mask(df, conditions):
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, threshold in conditions:
+        mask &= _OPS[op](df[col].to_numpy(), threshold)
+    return mask
+
+
+# Helper: format a reason template once per row of df (only for the rows in idx)
+def _format_rows(df, idx, template):
+    fields = [f for _, f, _, _ in string.Formatter().parse(template) if f]  # Fields the template uses
+    if not fields:
+        return np.full(len(idx), template, dtype=object)
+    rows = df.iloc[idx]
+    columns = {}
+    for f in dict.fromkeys(fields):
+        if f.endswith("_pct") and f not in rows.columns:
+            columns[f] = (rows[f[:-4]] * 100).tolist()  # Percentage view of a ratio column
+        else:
+            columns[f] = rows[f].tolist()
+    names = list(columns)
+    return np.array([template.format(**dict(zip(names, vals))) for vals in zip(*columns.values())], dtype=object)
+
+
+# Function to generate investment recommendations in chunks of at most chunk_rows rows.
+# Assets and users are filtered once per rule, and only the qualifying sets are cross joined.
+def iter_investment_recommendations(user_surplus_df, asset_mom, rules=None, chunk_rows=1_000_000):
+    rules = RECOMMENDATION_RULES if rules is None else rules
+    users = user_surplus_df.reset_index(drop=True)
+    assets = asset_mom.reset_index(drop=True)
+
+    # Per rule: qualifying assets (with their reason text) and a user mask
+    prepared = []
+    for rule_no, rule in enumerate(rules):
+        a_idx = np.flatnonzero(_rule_mask(assets, rule["asset_conditions"]))
+        u_mask = _rule_mask(users, rule["user_conditions"])
+        if len(a_idx) == 0 or not u_mask.any():
+            continue
+        a_text = _format_rows(assets, a_idx, rule["asset_reason"])
+        prepared.append((rule_no, rule, a_idx, a_text, u_mask))
+    if not prepared:
+        return
 
-    # Loop through each asset
-    for asset, g in df.groupby("asset"):
-        g = g.sort_values("date")  # Sort asset data by date ascending
-        g["pct_7d"] = g["price"].pct_change(periods=window_short)   # 7-day percentage change
-        g["pct_30d"] = g["price"].pct_change(periods=window_long)  # 30-day percentage change
+    # Rows each user contributes; cut users into blocks that stay within chunk_rows
+    per_user = sum(u_mask.astype("int64") * len(a_idx) for _, _, a_idx, _, u_mask in prepared)
+    cum = np.cumsum(per_user)
+    start = 0
+    while start < len(users):
+        base = cum[start - 1] if start else 0
+        stop = max(start + 1, int(np.searchsorted(cum, base + chunk_rows, side="right")))
+        chunk = _recommendation_block(users, assets, prepared, start, stop)
+        if len(chunk):
+            yield chunk
+        start = stop
 
-        # Take the latest row as a snapshot of momentum
-        latest = g.iloc[-1]
-        out.append({
-            "asset": asset,                      # Asset name
-            "date": latest["date"].date(),       # Latest date
-            "price": latest["price"],            # Latest price
-            "pct_7d": float(latest["pct_7d"]) if pd.notnull(latest["pct_7d"]) else 0.0,   # 7-day change, 0 if NaN
-            "pct_30d": float(latest["pct_30d"]) if pd.notnull(latest["pct_30d"]) else 0.0, # 30-day change, 0 if NaN
-        })
 
-    return pd.DataFrame(out)  # Return DataFrame with momentum snapshot for each asset
+# Helper: recommendations for users[start:stop], in the user → asset → rule order
+def _recommendation_block(users, assets, prepared, start, stop):
+    parts = []
+    for rule_no, rule, a_idx, a_text, u_mask in prepared:
+        u_idx = start + np.flatnonzero(u_mask[start:stop])
+        if len(u_idx) == 0:
+            continue
+        u_text = _format_rows(users, u_idx, rule["user_reason"])
+        uu = np.repeat(u_idx, len(a_idx))  # Cross join of qualifying users and assets
+        ai = np.tile(np.arange(len(a_idx)), len(u_idx))
+        parts.append(pd.DataFrame({
+            "_u": uu,
+            "_a": a_idx[ai],
+            "_r": rule_no,
+            "user_id": users["user_id"].to_numpy()[uu],
+            "asset": assets["asset"].to_numpy()[a_idx[ai]],
+            "action": rule["action"],
+            "reason": a_text[ai] + np.repeat(u_text, len(a_idx)),
+            "price": assets["price"].to_numpy()[a_idx[ai]],
+        }))
+    if not parts:
+        return pd.DataFrame(columns=RECOMMENDATION_COLUMNS)
+    block = pd.concat(parts, ignore_index=True)
+    block = block.sort_values(["_u", "_a", "_r"], kind="stable")  # Same order as the nested user/asset loops
+    return block[RECOMMENDATION_COLUMNS].reset_index(drop=True)
 
 
 # Function to generate investment recommendations per user
-def investment_recommendations(user_surplus_df, asset_mom):
+def investment_recommendations(user_surplus_df, asset_mom, rules=None):
     # user_surplus_df: DataFrame with user_id and 'savings_rate' or surplus indicator
     # asset_mom: DataFrame from asset_momentum() containing latest price & momentum
-    recs = []  # Initialize list to store recommendations
-
-    # Loop through each user
-    for _, u in user_surplus_df.iterrows():
-        # Loop through each asset
-        for _, a in asset_mom.iterrows():
-            # Buy signal: asset dropped >3% in 7 days and user has healthy savings_rate (>15%)
-            if a["pct_7d"] < -0.03 and u["savings_rate"] > 0.15:
-                recs.append({
-                    "user_id": u["user_id"],  # User ID
-                    "asset": a["asset"],      # Asset name
-                    "action": "BUY",          # Recommended action
-                    "reason": f"{a['asset']} down {a['pct_7d']*100:.2f}% in 7d and savings_rate {u['savings_rate']:.2f}",  # Explanation
-                    "price": a["price"]       # Current price
-                })
-
-            # Take profit signal: asset rose >6% in 7 days
-            if a["pct_7d"] > 0.06:
-                recs.append({
-                    "user_id": u["user_id"],  # User ID
-                    "asset": a["asset"],      # Asset name
-                    "action": "CONSIDER_TAKE_PROFIT",  # Recommended action
-                    "reason": f"{a['asset']} up {a['pct_7d']*100:.2f}% in 7d",  # Explanation
-                    "price": a["price"]       # Current price
-                })
-
-    return pd.DataFrame(recs)  # Return DataFrame with all user-asset recommendations
+    chunks = list(iter_investment_recommendations(user_surplus_df, asset_mom, rules, chunk_rows=np.inf))
+    if not chunks:
+        return pd.DataFrame(columns=RECOMMENDATION_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)  # Return DataFrame with all user-asset recommendations
@@ -0,0 +1,93 @@
+import json  # For transaction bodies
+import time  # For latency measurement
+import random  # For picking users and request kinds
+import asyncio  # For concurrent clients
+import argparse  # For command line options
+import numpy as np  # For latency percentiles
+
+
+# Read one HTTP/1.1 response (status line, headers, Content-Length body); returns the status code
+async def _read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        header = await reader.readline()
+        if header in (b"\r\n", b""):
+            break
+        name, _, value = header.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+# One client: a keep-alive connection sending `n` requests back to back and recording each latency
+async def _client(host, port, n, users, write_ratio, seed, latencies, errors):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    views = ["", "/summary", "/budgets", "/anomalies"]
+    try:
+        for _ in range(n):
+            uid = rng.randint(1, users)
+            if rng.random() < write_ratio:
+                body = json.dumps({"amount": round(rng.uniform(1, 200), 2), "type": "spend",
+                                   "category": rng.choice(["groceries", "travel", "utilities"]),
+                                   "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")}).encode()
+                request = (f"POST /users/{uid}/transactions HTTP/1.1\r\nHost: {host}\r\n"
+                           f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+                kind = "write"
+            else:
+                request = f"GET /users/{uid}{rng.choice(views)} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+                kind = "read"
+            t0 = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await _read_response(reader)
+            latencies[kind].append(time.perf_counter() - t0)
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+# Function to drive the service with `clients` concurrent connections and report throughput and latency
+async def run_load(host="127.0.0.1", port=8080, clients=32, requests=20_000, users=None, write_ratio=0.1, seed=0):
+    if users is None:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f"GET /health HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        users = json.loads((await reader.read()).split(b"\r\n\r\n", 1)[1])["users"]  # Ids are 1..users
+        writer.close()
+
+    latencies = {"read": [], "write": []}
+    errors = {}
+    per_client = max(1, requests // clients)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, per_client, users, write_ratio, seed + i, latencies, errors) for i in range(clients)
+    ))
+    elapsed = time.perf_counter() - t0
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{total} requests from {clients} clients in {elapsed:.2f}s -> {total / elapsed:.0f} req/s; errors: {errors}")
+    report = {"requests": total, "seconds": elapsed, "errors": errors}
+    for kind, values in latencies.items():
+        if values:
+            ms = np.asarray(values) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            print(f"  {kind:5s} n={len(ms):6d}  p50={p50:.3f}ms  p95={p95:.3f}ms  p99={p99:.3f}ms  max={ms.max():.3f}ms")
+            report[kind] = {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test service.py with concurrent keep-alive clients.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent connections")
+    parser.add_argument("--requests", type=int, default=20_000, help="Total requests across all clients")
+    parser.add_argument("--users", type=int, default=None, help="Query user ids 1..N (default: ask /health)")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="Fraction of requests posting a transaction")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(run_load(args.host, args.port, args.clients, args.requests, args.users, args.write_ratio, args.seed))
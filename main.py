@@ -1,91 +1,123 @@
 import os  # For directory and path management
-import pandas as pd  # For data handling
+import argparse  # For command line options
 
 # Importing functions from other modules in the project
-from etl import load_users, load_transactions, load_prices
-from features import daily_user_aggregates, weekly_user_aggregates, add_rolling_features
-from anomaly import transaction_zscore_anomalies, daily_net_anomalies
-from budget import category_monthly_budget, smart_overall_budget
-from investment import asset_momentum, investment_recommendations
-from summaries import compose_daily_summary, compose_weekly_summary
+import etl
+from etl import DEFAULT_CHUNKSIZE, OUTPUT_FORMATS
+from incremental import FullRunRequired, has_state, run_incremental, clear_state
+from pipeline import PipelineRunner, build_stages, TARGET_GROUPS
+from outofcore import BACKENDS, USERS_PER_PARTITION
+from instrumentation import Instrumentation, NULL_INSTRUMENTATION
 
 # Output directory to save results
 OUTPUT_DIR = "output"
-os.makedirs(OUTPUT_DIR, exist_ok=True)  # Create output folder if it doesn't exist
 
-# Loading data from CSV files
-print("Loading data...")
-users = load_users()           # Load users.csv into DataFrame
-transactions = load_transactions()   # Load transactions.csv into DataFrame
-prices = load_prices()         # Load prices.csv into DataFrame
 
-# Compute daily aggregates
-print("Computing daily aggregates...")
-daily = daily_user_aggregates(transactions)  # Summarize daily user transactions
-daily.to_csv(os.path.join(OUTPUT_DIR, 'daily_aggregates.csv'), index=False)  # Save CSV
-print('Saved daily_aggregates.csv')
+# Function to parse command line options
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the financial insights pipeline.")
+    parser.add_argument("--stages", nargs="+", default=None,
+                        help=f"Only (re)compute these stages and what they need; groups: {', '.join(sorted(TARGET_GROUPS))}")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Recompute every stage even if its inputs and parameters are unchanged")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Stages that may run concurrently (default: number of CPUs)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Read transactions.csv in chunks so memory does not grow with file size")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="Rows per chunk in streaming mode")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv",
+                        help="File format for intermediate frames (daily, features, weekly, anomalies)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process transactions appended since the previous --incremental run")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for the per-user stages (users are hash-partitioned across them)")
+    parser.add_argument("--backend", choices=BACKENDS, default="memory",
+                        help="How the per-user stages run: in one in-memory frame, or out of core over "
+                             "user_id partitions spilled to disk (for data larger than RAM)")
+    parser.add_argument("--users-per-partition", type=int, default=USERS_PER_PARTITION,
+                        help="Users per partition of the spill backend")
+    parser.add_argument("--recommendation-chunk-rows", type=int, default=None,
+                        help="Generate and write recommendations this many rows at a time instead of as one frame")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Record per-stage wall/CPU time, row counts and peak memory to output/run_metrics.jsonl "
+                             "and print a report at the end")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="With --metrics, also record tracemalloc peaks per stage (slower; use with --jobs 1)")
+    parser.add_argument("--profile-stage", default=None,
+                        help="Profile one stage and save the dump to the output folder (implies --metrics)")
+    parser.add_argument("--profiler", choices=["cprofile", "pyinstrument"], default="cprofile",
+                        help="Profiler used by --profile-stage (pyinstrument must be installed)")
+    args = parser.parse_args(argv)
+    if args.streaming and args.workers > 1:
+        parser.error("--streaming and --workers cannot be combined")
+    if args.backend == "spill" and (args.streaming or args.incremental or args.workers > 1):
+        parser.error("--backend spill cannot be combined with --streaming, --incremental or --workers")
+    try:
+        etl.check_output_format(args.format)
+    except ImportError as e:
+        parser.error(str(e))
+    if args.profile_stage is not None:
+        # Checked against the stages of this run mode (plus the incremental fast path) before anything runs
+        stages = build_stages(streaming=args.streaming, workers=args.workers, fmt=args.format,
+                              incremental=args.incremental, backend=args.backend)
+        known = sorted(set(stages) | ({"incremental"} if args.incremental else set()))
+        if args.profile_stage not in known:
+            parser.error(f"--profile-stage: unknown stage {args.profile_stage!r}, expected one of {', '.join(known)}")
+    return args
 
-# Add rolling features for better analysis
-print('Adding rolling features...')
-daily_feat = add_rolling_features(daily)  # Compute 7-day rolling averages & savings rate
-daily_feat.to_csv(os.path.join(OUTPUT_DIR, 'daily_features.csv'), index=False)
-print('Saved daily_features.csv')
 
-# Compute weekly aggregates
-print('Weekly aggregates...')
-wk = weekly_user_aggregates(daily)  # Summarize weekly user transactions
-wk.to_csv(os.path.join(OUTPUT_DIR, 'weekly_aggregates.csv'), index=False)
-print('Saved weekly_aggregates.csv')
+# Function to run the pipeline from the command line
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)  # Create output folder if it doesn't exist
+    if args.metrics or args.profile_stage:
+        instr = Instrumentation(os.path.join(OUTPUT_DIR, "run_metrics.jsonl"), trace_memory=args.trace_memory,
+                                profile_stage=args.profile_stage, profiler=args.profiler, profile_dir=OUTPUT_DIR)
+    else:
+        instr = NULL_INSTRUMENTATION  # No measurements, no overhead
+    try:
+        _run(args, instr)
+    finally:
+        if instr.enabled:
+            report = instr.write_report(os.path.join(OUTPUT_DIR, "run_report.json"))
+            print('\nStage report (slowest first):')
+            print(report.to_string(index=False))
+        instr.close()
 
-# Detect anomalies at the transaction level using z-score
-print('Detecting anomalies (transaction-level)...')
-anom_tx = transaction_zscore_anomalies(transactions)  # Flag unusual transactions
-anom_tx.to_csv(os.path.join(OUTPUT_DIR, 'anomalies_transactions.csv'), index=False)
-print('Saved anomalies_transactions.csv')
 
-# Detect anomalies in daily net balance
-print('Detecting anomalies (daily net)...')
-anom_daily = daily_net_anomalies(daily)  # Flag unusual daily net movements
-anom_daily.to_csv(os.path.join(OUTPUT_DIR, 'anomalies_daily.csv'), index=False)
-print('Saved anomalies_daily.csv')
+# Helper running the incremental fast path or the stage DAG
+def _run(args, instr):
+    # Incremental mode: apply only the new transactions when a previous run left state behind
+    if args.incremental and has_state(OUTPUT_DIR):
+        print("Applying new transactions incrementally...")
+        try:
+            with instr.stage("incremental"):
+                run_incremental(OUTPUT_DIR, args.format)
+            print('\nIncremental run finished. Asset momentum and recommendations are refreshed by full runs only.')
+            return
+        except FullRunRequired as e:
+            print(f"Incremental run not possible ({e}); running the full pipeline.")
 
-# Compute category-wise monthly budget suggestions
-print('Budget suggestions by category...')
-bud_cat = category_monthly_budget(transactions)  # Propose budget per category per user
-bud_cat.to_csv(os.path.join(OUTPUT_DIR, 'budgets_by_category.csv'), index=False)
-print('Saved budgets_by_category.csv')
+    if not args.incremental:
+        clear_state(OUTPUT_DIR)  # This run rewrites the outputs; a later --incremental run must start over
 
-# Compute overall smart budget per user
-print('Smart overall budgets...')
-bud_overall = smart_overall_budget(daily_feat)  # Suggest overall monthly budget per user
-bud_overall.to_csv(os.path.join(OUTPUT_DIR, 'budgets_overall.csv'), index=False)
-print('Saved budgets_overall.csv')
+    # Size of transactions.csv before reading it; the next incremental run resumes from here
+    csv_offset = os.path.getsize(os.path.join(etl.DATA_DIR, "transactions.csv"))
 
-# Compute asset momentum & investment recommendations
-print('Asset momentum & investment recommendations...')
-asset_mom = asset_momentum(prices)  # Analyze recent asset trends (7d/30d % changes)
-asset_mom.to_csv(os.path.join(OUTPUT_DIR, 'asset_momentum.csv'), index=False)
-print('Saved asset_momentum.csv')
+    stages = build_stages(
+        streaming=args.streaming, chunksize=args.chunksize, workers=args.workers, fmt=args.format,
+        incremental=args.incremental, csv_offset=csv_offset, output_dir=OUTPUT_DIR,
+        backend=args.backend, users_per_partition=args.users_per_partition,
+        recommendation_chunk_rows=args.recommendation_chunk_rows,
+    )
+    runner = PipelineRunner(stages, OUTPUT_DIR, use_cache=not args.no_cache, max_workers=args.jobs,
+                            instrumentation=instr)
+    runner.run(args.stages, fmt=args.format)
 
-# Prepare user surplus data for generating investment recommendations
-df_surplus = daily_feat.groupby('user_id').agg({'savings_rate':'mean'}).reset_index()
-recs = investment_recommendations(df_surplus, asset_mom)  # Generate investment advice
-if not recs.empty:
-    recs.to_csv(os.path.join(OUTPUT_DIR, 'recommendations.csv'), index=False)
-    print('Saved recommendations.csv')
-else:
-    print('No recommendations generated for given synthetic data and rules (this can happen).')
+    # Final message after pipeline completion
+    print('\nPipeline finished. Check the ./output folder for CSVs.')
 
-# Produce readable daily summaries
-print('Producing readable summaries...')
-daily_summ = compose_daily_summary(daily_feat, anom_tx)  # Combine features & anomalies
-daily_summ.to_csv(os.path.join(OUTPUT_DIR, 'daily_summaries.csv'), index=False)
-print('Saved daily_summaries.csv')
 
-# Produce readable weekly summaries
-weekly_summ = compose_weekly_summary(wk)
-weekly_summ.to_csv(os.path.join(OUTPUT_DIR, 'weekly_summaries.csv'), index=False)
-print('Saved weekly_summaries.csv')
-
-# Final message after pipeline completion
-print('\nPipeline finished. Check the ./output folder for CSVs.')
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import os  # For snapshot paths
+import numpy as np  # Import numpy for numerical computations
+import pandas as pd  # Import pandas for id lookups and record batches
+
+
+# Largest exponent allowed when rescaling decayed sums inside one batch (float64 safe margin)
+_MAX_DECAY_EXPONENT = 300.0
+
+
+# Online per-user z-score scorer for transactions as they arrive.
+# Each user keeps a (weight, mean, M2) triple updated with Welford's algorithm;
+# with decay < 1 older transactions are exponentially down-weighted.
+# A transaction is scored against the state *before* it, so scoring never looks ahead.
+class OnlineAnomalyScorer:
+
+    def __init__(self, z_thresh=3.0, decay=1.0, min_count=2):
+        if not 0 < decay <= 1:
+            raise ValueError("decay must be in (0, 1]")
+        self.z_thresh = z_thresh  # |z| above this is flagged
+        self.decay = decay  # Weight multiplier applied to history per new transaction
+        self.min_count = min_count  # Transactions needed before a user can be flagged
+        self._slots = {}  # user_id -> row in the state arrays
+        self._index = None  # Cached pd.Index over user ids for batch lookups
+        self._user_ids = []  # user_id per slot
+        self.count = np.zeros(0, dtype="int64")  # Transactions seen per user
+        self.weight = np.zeros(0)  # (Decayed) total weight per user
+        self.mean = np.zeros(0)  # (Decayed) mean absolute amount per user
+        self.m2 = np.zeros(0)  # (Decayed) sum of squared deviations per user
+
+    # Number of users with state
+    def __len__(self):
+        return len(self._user_ids)
+
+    # Helper to grow the state arrays to hold `n` users (capacity doubles, so growth is amortized O(1))
+    def _grow(self, n):
+        if n > len(self.count):
+            extra = max(n, 2 * len(self.count), 16) - len(self.count)
+            self.count = np.concatenate([self.count, np.zeros(extra, dtype="int64")])
+            self.weight = np.concatenate([self.weight, np.zeros(extra)])
+            self.mean = np.concatenate([self.mean, np.zeros(extra)])
+            self.m2 = np.concatenate([self.m2, np.zeros(extra)])
+
+    # Helper to find (or allocate) the state slot of one user
+    def _slot(self, user_id):
+        slot = self._slots.get(user_id)
+        if slot is None:
+            slot = len(self._user_ids)
+            self._slots[user_id] = slot
+            self._user_ids.append(user_id)
+            self._index = None
+            self._grow(slot + 1)
+        return slot
+
+    # Helper to map an array of user ids to slots, allocating slots for new users
+    def _slots_for(self, user_ids):
+        if self._index is None:
+            self._index = pd.Index(self._user_ids)
+        slots = self._index.get_indexer(user_ids)
+        missing = slots < 0
+        if missing.any():
+            # Allocate all new users at once, then grow the state arrays a single time
+            for uid in pd.unique(user_ids[missing]).tolist():
+                self._slots[uid] = len(self._user_ids)
+                self._user_ids.append(uid)
+            self._grow(len(self._user_ids))
+            self._index = pd.Index(self._user_ids)
+            slots = self._index.get_indexer(user_ids)
+        return slots
+
+    # Helper to compute z from (weight, mean, M2); 0 until min_count or when std is zero
+    def _z(self, x, count, weight, mean, m2):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sigma = np.sqrt(np.maximum(m2, 0) / weight)
+            z = (x - mean) / sigma
+        return np.where((count < self.min_count) | ~(sigma > 0), 0.0, z)
+
+    # Score one transaction in O(1) and fold it into the user's state
+    def score(self, user_id, amount):
+        s = self._slot(user_id)
+        x = abs(float(amount))
+        z = float(self._z(x, self.count[s], self.weight[s], self.mean[s], self.m2[s]))
+
+        # Weighted Welford update (decay == 1 is the classic update)
+        w = self.weight[s] * self.decay + 1.0
+        delta = x - self.mean[s]
+        mean = self.mean[s] + delta / w
+        self.m2[s] = self.m2[s] * self.decay + delta * (x - mean)
+        self.mean[s] = mean
+        self.weight[s] = w
+        self.count[s] += 1
+        return z, abs(z) > self.z_thresh
+
+    # Score a batch of transactions (in arrival order) with NumPy; equivalent to calling score() per record
+    def score_batch(self, user_ids, amounts):
+        user_ids = np.asarray(user_ids)
+        x = np.abs(np.asarray(amounts, dtype="float64"))
+        z = np.zeros(len(x))
+        if len(x) == 0:
+            return z, z.astype(bool)
+
+        slots = self._slots_for(user_ids)
+        order = np.argsort(slots, kind="stable")  # Group by user, keep arrival order within a user
+        s_sorted = slots[order]
+        starts = np.r_[True, s_sorted[1:] != s_sorted[:-1]]  # First row of each user's run
+        run_start = np.maximum.accumulate(np.where(starts, np.arange(len(x)), 0))
+        pos = np.arange(len(x)) - run_start  # Position of each record within its user's run
+
+        # Split long runs into blocks so decay factors stay inside float64 range
+        if self.decay < 1:
+            block = max(1, int(_MAX_DECAY_EXPONENT / -np.log(self.decay)))
+        else:
+            block = len(x)
+        for b in range(0, int(pos.max()) + 1, block):
+            sel = order[(pos >= b) & (pos < b + block)]
+            z[sel] = self._score_block(slots[sel], x[sel])
+        return z, np.abs(z) > self.z_thresh
+
+    # Helper that scores one block in which every user appears at most `block` times
+    def _score_block(self, slots, x):
+        order = np.argsort(slots, kind="stable")
+        s = slots[order]
+        xs = x[order]
+        n = len(xs)
+        starts = np.r_[True, s[1:] != s[:-1]]
+        run_id = np.cumsum(starts) - 1
+        first = np.flatnonzero(starts)
+        k = np.arange(n) - first[run_id]  # Records of this user before the current one (within the block)
+
+        # Prior state per row; shift values by the prior mean (or first value for new users) for stability
+        w0 = self.weight[s]
+        m20 = self.m2[s]
+        c0 = self.count[s]
+        shift = np.where(c0 > 0, self.mean[s], xs[first][run_id])
+        y = xs - shift
+
+        # Decayed exclusive prefix sums: sum_{j<k} d^(k-1-j) * v_j = d^(k-1) * sum_{j<k} d^(-j) * v_j
+        d = self.decay
+        up = d ** (-k.astype("float64"))
+        down = d ** (k.astype("float64") - 1)
+
+        def excl_prefix(v):
+            scaled = v * up
+            cs = pd.Series(scaled).groupby(run_id).cumsum().to_numpy()  # Per-user running sums
+            return (cs - scaled) * down
+
+        ones = np.ones(n)
+        dk = d ** k.astype("float64")
+        w_k = dk * w0 + excl_prefix(ones)
+        a_k = excl_prefix(y)
+        b_k = dk * m20 + excl_prefix(y * y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_k = np.where(w_k > 0, a_k / w_k, 0.0)
+        z_sorted = self._z(y, c0 + k, w_k, mean_k, b_k - w_k * mean_k ** 2)
+
+        # Fold the whole block into the state using each user's last row
+        last = np.r_[first[1:] - 1, n - 1]
+        w_n = d * w_k[last] + 1.0
+        a_n = d * a_k[last] + y[last]
+        b_n = d * b_k[last] + y[last] ** 2
+        mean_n = a_n / w_n
+        us = s[last]
+        self.weight[us] = w_n
+        self.mean[us] = shift[last] + mean_n
+        self.m2[us] = np.maximum(b_n - w_n * mean_n ** 2, 0.0)
+        self.count[us] = c0[last] + k[last] + 1
+
+        z = np.empty(n)
+        z[order] = z_sorted
+        return z
+
+    # Score a batch of records (DataFrame or list of dicts with user_id and amount)
+    def score_records(self, records):
+        df = records if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(records)
+        z, flags = self.score_batch(df["user_id"].to_numpy(), df["amount"].to_numpy())
+        return df.assign(z=z, is_anomaly=flags)
+
+    # Write the scorer state to disk (atomic replace)
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            user_ids=np.asarray(self._user_ids),
+            count=self.count[:len(self)], weight=self.weight[:len(self)],
+            mean=self.mean[:len(self)], m2=self.m2[:len(self)],
+            params=np.array([self.z_thresh, self.decay, self.min_count], dtype="float64"),
+        )
+        os.replace(tmp, path)
+
+    # Start a scorer from batch per-user statistics (DataFrame indexed by user_id with count, mean, m2
+    # of absolute amounts, e.g. TransactionAggregates.user_stats)
+    @classmethod
+    def from_stats(cls, stats, **kwargs):
+        scorer = cls(**kwargs)
+        scorer._user_ids = stats.index.tolist()
+        scorer._slots = {uid: i for i, uid in enumerate(scorer._user_ids)}
+        scorer.count = stats["count"].to_numpy(dtype="int64").copy()
+        scorer.weight = scorer.count.astype("float64")  # Undecayed history: weight equals count
+        scorer.mean = stats["mean"].to_numpy(dtype="float64").copy()
+        scorer.m2 = stats["m2"].to_numpy(dtype="float64").copy()
+        return scorer
+
+    # Restore a scorer from a snapshot written by save()
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as snap:
+            z_thresh, decay, min_count = snap["params"]
+            scorer = cls(z_thresh=float(z_thresh), decay=float(decay), min_count=int(min_count))
+            scorer._user_ids = snap["user_ids"].tolist()
+            scorer._slots = {uid: i for i, uid in enumerate(scorer._user_ids)}
+            scorer.count = snap["count"].copy()
+            scorer.weight = snap["weight"].copy()
+            scorer.mean = snap["mean"].copy()
+            scorer.m2 = snap["m2"].copy()
+        return scorer
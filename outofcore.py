@@ -0,0 +1,158 @@
+import os  # For spill file paths
+import pickle  # For appending typed frames to spill files
+import shutil  # For removing the spill directory
+import numpy as np  # For partition arithmetic
+import pandas as pd  # For data manipulation
+from pandas.api.types import union_categoricals  # For concatenating categoricals with different categories
+
+from etl import write_frame
+from sharding import run_shard
+from budget import last_closed_month
+from schema import TRANSACTIONS_SCHEMA, apply_schema
+
+
+# Execution backends for the per-user transaction stages, picked per run:
+#   memory - the pandas reference path: all transactions are loaded into one frame (a TransactionStore)
+#   spill  - transactions are streamed from disk into per-partition spill files (users partitioned by
+#            user_id range), then every per-user stage runs on one partition at a time and writes its
+#            outputs part by part, so memory is bounded by the largest partition, not the dataset
+BACKENDS = ("memory", "spill")
+
+# Users per spill partition (user_id // USERS_PER_PARTITION is the partition key)
+USERS_PER_PARTITION = 50_000
+# Memory (bytes of buffered transaction frames) held across all partitions before they are appended to the
+# spill files; typed rows take about 27 bytes, so this is roughly 2.5 million transactions
+SPILL_BUFFER_BYTES = 64 * 2**20
+# Directory (inside the output directory) holding the spill files of a run
+SPILL_DIR = ".spill"
+
+# Per-user outputs of sharding.run_shard, by output file stem
+SPILL_OUTPUTS = {
+    "daily_aggregates": "daily", "daily_features": "daily_feat", "weekly_aggregates": "wk",
+    "anomalies_transactions": "anom_tx", "anomalies_daily": "anom_daily",
+    "budgets_by_category": "bud_cat", "budgets_overall": "bud_overall",
+    "daily_summaries": "daily_summ", "weekly_summaries": "weekly_summ",
+}
+
+
+# Transactions spilled to disk, one file per user_id range (a sequence of pickled frames per file)
+class SpilledTransactions:
+
+    def __init__(self, spill_dir, partitions, rows, budget_as_of):
+        self.spill_dir = spill_dir
+        self.partitions = partitions  # Partition keys in ascending user_id order
+        self.rows = rows  # Number of transactions spilled
+        self.budget_as_of = budget_as_of  # Last closed month (month ordinal) of the whole dataset
+
+    # Helper: spill file of one partition
+    def path(self, key):
+        return os.path.join(self.spill_dir, f"users-{key:08d}.pkl")
+
+    # Read every piece of one partition back as a single typed frame in arrival order
+    def read(self, key):
+        pieces = []
+        with open(self.path(key), "rb") as f:
+            while True:
+                try:
+                    pieces.append(pickle.load(f))
+                except EOFError:
+                    break
+        return apply_schema(_concat(pieces), TRANSACTIONS_SCHEMA)
+
+    # Iterate (key, frame) over the partitions in user_id order
+    def __iter__(self):
+        for key in self.partitions:
+            yield key, self.read(key)
+
+    # Delete the spill files
+    def remove(self):
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+
+# Function to assign each user to its spill partition (contiguous user_id ranges, so partitions
+# processed in key order produce outputs already sorted by user_id)
+def partition_of(user_ids, users_per_partition=USERS_PER_PARTITION):
+    return np.asarray(user_ids).astype("int64") // users_per_partition
+
+
+# Function to stream transaction chunks into per-partition spill files.
+# Chunks are buffered until they hold `buffer_bytes` of memory, then each partition's rows are appended
+# to its file as one piece, so the number of pieces grows with the data size / buffer, not the chunk count.
+def spill_transactions(chunks, spill_dir, users_per_partition=USERS_PER_PARTITION,
+                       buffer_bytes=SPILL_BUFFER_BYTES):
+    shutil.rmtree(spill_dir, ignore_errors=True)  # Never mix with the pieces of an earlier run
+    os.makedirs(spill_dir)
+    spilled = SpilledTransactions(spill_dir, [], 0, None)
+    keys, buffer, buffered, last_timestamp = set(), [], 0, None
+
+    def flush():
+        frame = _concat(buffer)
+        part = partition_of(frame["user_id"].to_numpy(), users_per_partition)
+        order = np.argsort(part, kind="stable")  # Group rows by partition, keeping arrival order within each
+        bounds = np.flatnonzero(np.diff(part[order])) + 1
+        for rows in np.split(order, bounds):
+            key = int(part[rows[0]])
+            with open(spilled.path(key), "ab") as f:
+                pickle.dump(frame.take(rows), f, protocol=pickle.HIGHEST_PROTOCOL)
+            keys.add(key)
+        buffer.clear()
+
+    for chunk in chunks:
+        if not len(chunk):
+            continue  # A file without rows yields one empty chunk; it has nothing to spill
+        last = chunk["timestamp"].max()
+        last_timestamp = last if last_timestamp is None else max(last_timestamp, last)
+        spilled.rows += len(chunk)
+        buffer.append(chunk)
+        buffered += int(chunk.memory_usage(index=True).sum())
+        if buffered >= buffer_bytes:
+            flush()
+            buffered = 0
+    if buffer:
+        flush()
+    spilled.partitions = sorted(keys)
+    spilled.budget_as_of = last_closed_month(last_timestamp) if last_timestamp is not None else None
+    return spilled
+
+
+# Helper to concatenate frames whose categorical columns have different categories without falling back
+# to object strings (pd.concat only keeps a categorical when every frame has the same categories)
+def _concat(frames):
+    cats = [c for c in frames[0].columns if isinstance(frames[0][c].dtype, pd.CategoricalDtype)]
+    frame = pd.concat([f.drop(columns=cats) for f in frames], ignore_index=True)
+    for col in cats:
+        frame[col] = union_categoricals([f[col] for f in frames])
+    return frame[frames[0].columns]
+
+
+# Function to run the per-user stage chain (sharding.run_shard) on each spilled partition in user_id order.
+# Every output named in SPILL_OUTPUTS is written to output_dir as parts (one per partition, in the format
+# formats[name], default CSV); as user_id ranges ascend, the parts concatenate to the same rows in the same
+# order as the in-memory path. `reduce(outputs)` may map each partition's outputs to a small frame; those
+# are concatenated and returned together with the row count of every output.
+# Without any spilled transaction the chain runs once on an empty frame, so every output is still written
+# (empty, with its columns, replacing the files of an earlier run) and `reduce` still sees typed frames.
+def run_spilled(spilled, output_dir, formats=None, reduce=None):
+    formats = formats or {}
+    counts = dict.fromkeys(SPILL_OUTPUTS, 0)
+    reduced = []
+    partitions = iter(spilled) if spilled.partitions else [(None, _empty_transactions())]
+    for part, (key, transactions) in enumerate(partitions):
+        outputs = run_shard(transactions, spilled.budget_as_of)
+        del transactions  # Only this partition's outputs stay alive while they are written
+        for name, out_key in SPILL_OUTPUTS.items():
+            write_frame(outputs[out_key], output_dir, name, formats.get(name, "csv"), part=part)
+            counts[name] += len(outputs[out_key])
+        if reduce is not None:
+            reduced.append(reduce(outputs))
+        if key is not None:
+            os.remove(spilled.path(key))  # Free the disk space of the partition as soon as it is done
+    result = {"rows": counts}
+    if reduce is not None:
+        result["reduced"] = pd.concat(reduced, ignore_index=True)
+    return result
+
+
+# Helper: typed transactions frame without rows
+def _empty_transactions():
+    return apply_schema(pd.DataFrame(columns=list(TRANSACTIONS_SCHEMA)), TRANSACTIONS_SCHEMA)
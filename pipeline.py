@@ -0,0 +1,493 @@
+import os  # For output and cache paths
+import sys  # For the modules behind each stage's code
+import json  # For the cache index
+import pickle  # For cached stage values
+import hashlib  # For stage fingerprints
+import inspect  # For hashing stage code
+import threading  # For lazy, thread-safe cache loads
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait  # For running independent stages concurrently
+import pandas as pd  # For data handling
+
+import etl
+from etl import load_users, load_prices, iter_transactions, write_frame
+from features import daily_user_aggregates, add_rolling_features
+from anomaly import transaction_zscore_anomalies, daily_net_anomalies
+from budget import category_monthly_budget, smart_overall_budget
+from investment import (asset_momentum, momentum_panel, investment_recommendations, iter_investment_recommendations,
+                        RECOMMENDATION_COLUMNS)
+from summaries import compose_daily_summary, compose_weekly_summary
+from streaming import SCORED_DTYPES, TransactionAggregates, aggregate_chunks, score_chunks
+from incremental import build_state, save_state
+from sharding import run_sharded
+from outofcore import BACKENDS, SPILL_DIR, SPILL_OUTPUTS, USERS_PER_PARTITION, spill_transactions, run_spilled
+from instrumentation import NULL_INSTRUMENTATION, row_count
+from store import TransactionStore, as_frame
+from rollups import RollupCube
+from schema import USERS_SCHEMA, TRANSACTIONS_SCHEMA, PRICES_SCHEMA, apply_schema
+
+
+# Directory (inside the output directory) holding cached stage values
+CACHE_DIR = ".cache"
+
+# Stages written in the --format chosen for intermediate frames (the rest are always CSV)
+INTERMEDIATE_STAGES = {
+    "daily_aggregates", "daily_features", "weekly_aggregates", "anomalies_transactions", "anomalies_daily",
+    "momentum_panel",
+}
+
+# Target aliases accepted by --stages in addition to stage names
+TARGET_GROUPS = {
+    "aggregates": ["daily_aggregates", "weekly_aggregates"],
+    "features": ["daily_features"],
+    "anomalies": ["anomalies_transactions", "anomalies_daily"],
+    "budgets": ["budgets_by_category", "budgets_overall"],
+    "momentum": ["asset_momentum", "momentum_panel"],
+    "summaries": ["daily_summaries", "weekly_summaries"],
+}
+
+
+# One node of the pipeline DAG
+class Stage:
+
+    def __init__(self, name, func, deps=(), params=None, output=None, cache=True, source=None, writer=None,
+                 files=()):
+        self.name = name  # Unique stage name (also the output file stem)
+        self.func = func  # Called as func(*dep_values, **params)
+        self.deps = list(deps)  # Names of the stages whose values are passed to func
+        self.params = params or {}  # Keyword parameters, part of the fingerprint
+        self.output = output  # Output file stem, or None if the stage writes nothing
+        self.cache = cache  # Whether the value may be reused from the cache
+        self.source = source  # Input file whose fingerprint stands in for deps (source stages)
+        self.writer = writer  # Optional writer(value, output_dir) replacing the default write_frame
+        self.files = list(files)  # Other files (in the output directory) the stage writes, e.g. through `writer`
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, deps={self.deps})"
+
+
+# Directory of the project modules whose code and constants are part of stage fingerprints
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Module-level constant types folded into fingerprints by value (so runtime overrides count too)
+_CONSTANT_TYPES = (bool, int, float, str, tuple, list, dict, frozenset, type(None))
+
+
+# Helper: names of the project modules `module_name` depends on (itself included), found transitively
+# through the modules and objects each module imports
+def _module_closure(module_name):
+    seen, todo = set(), [module_name]
+    while todo:
+        name = todo.pop()
+        module = sys.modules.get(name)
+        path = getattr(module, "__file__", None)
+        if name in seen or path is None or os.path.dirname(os.path.abspath(path)) != _PROJECT_DIR:
+            continue
+        seen.add(name)
+        for value in vars(module).values():
+            dep = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+            if isinstance(dep, str) and dep not in seen:
+                todo.append(dep)
+    return seen
+
+
+# Helper: hash of one project module's source plus the current values of its UPPER_CASE constants
+def _module_hash(module_name):
+    module = sys.modules[module_name]
+    h = hashlib.sha256()
+    with open(module.__file__, "rb") as f:
+        h.update(f.read())
+    for name, value in sorted(vars(module).items()):
+        if name.isupper() and isinstance(value, _CONSTANT_TYPES):
+            h.update(f"{name}={value!r}".encode())
+    return h.hexdigest()
+
+
+# Helper to hash the code of a stage function so code changes invalidate the cache.
+# Besides the function's own source this covers every project module it can reach (callees such as
+# grouped_zscores or BudgetEngine.budgets, methods called from lambdas) and their constants
+# (RECENT_MONTHS, BUDGET_SLACK, ...); an edit anywhere in that closure re-runs the stage.
+def _code_hash(func):
+    try:
+        src = inspect.getsource(func)
+    except (OSError, TypeError):
+        src = getattr(func, "__qualname__", repr(func))
+    h = hashlib.sha256(src.encode())
+    for name in sorted(_module_closure(getattr(func, "__module__", None) or "")):
+        h.update(f"{name}:{_module_hash(name)}".encode())
+    return h.hexdigest()[:16]
+
+
+# Function to compute the fingerprint of a stage from its code, parameters and inputs
+def stage_fingerprint(stage, dep_fingerprints, fmt=None):
+    payload = {
+        "format": fmt,
+        "name": stage.name,
+        "code": _code_hash(stage.func),
+        "params": {k: repr(v) for k, v in sorted(stage.params.items())},
+        "deps": dep_fingerprints,
+        "source": etl._source_fingerprint(stage.source) if stage.source else None,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:24]
+
+
+# Function to expand targets (stage names or TARGET_GROUPS aliases) into stage names
+def expand_targets(stages, targets=None):
+    wanted = []
+    for t in targets or [s for s in stages if stages[s].output or stages[s].writer]:
+        names = TARGET_GROUPS.get(t, [t])
+        for n in names:
+            if n not in stages:
+                raise KeyError(f"Unknown stage {t!r}; known stages: {sorted(stages)}, groups: {sorted(TARGET_GROUPS)}")
+        wanted.extend(names)
+    return wanted
+
+
+# Function to list the stages the targets need, in dependency order
+def resolve(stages, targets=None):
+    wanted = expand_targets(stages, targets)
+    order, seen = [], set()
+
+    def visit(name):  # Depth-first topological sort
+        if name in seen:
+            return
+        seen.add(name)
+        for dep in stages[name].deps:
+            visit(dep)
+        order.append(name)
+
+    for name in wanted:
+        visit(name)
+    return order
+
+
+# Executes a set of stages with dependency-aware parallelism and fingerprint caching
+class PipelineRunner:
+
+    def __init__(self, stages, output_dir="output", use_cache=True, max_workers=None, instrumentation=None,
+                 write_outputs=True, verbose=True):
+        self.stages = stages
+        self.write_outputs = write_outputs  # False keeps every value in memory (nothing is written)
+        self.verbose = verbose  # Print stage progress
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION  # Per-stage timings and memory
+        profile_stage = self.instrumentation.profile_stage
+        if profile_stage is not None and profile_stage not in stages:
+            raise ValueError(f"Unknown stage {profile_stage!r} to profile, expected one of {sorted(stages)}")
+        self.output_dir = output_dir
+        self.use_cache = use_cache
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache_dir = os.path.join(output_dir, CACHE_DIR)
+        self.values = {}  # Stage values computed or loaded in this run
+        self.status = {}  # Stage name -> "ran" / "cached"
+        self._locks = {name: threading.Lock() for name in stages}
+        self._index_path = os.path.join(self.cache_dir, "index.json")
+        self._index = {}
+        if use_cache and os.path.exists(self._index_path):  # Without the cache nothing under cache_dir is read
+            with open(self._index_path) as f:
+                self._index = json.load(f)
+
+    # Helper: path of the cached value of a stage
+    def _cache_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.pkl")
+
+    # Helper: format a stage's output is written in
+    def _format(self, stage, fmt):
+        return fmt if stage.name in INTERMEDIATE_STAGES else "csv"
+
+    # Helper: a stage is fresh when its cached fingerprint matches and every file it writes still exists
+    # (its output, whether written by write_frame or by its own writer, and its other files)
+    def _is_fresh(self, stage, fp, fmt):
+        if not (self.use_cache and stage.cache and self._index.get(stage.name) == fp):
+            return False
+        if not os.path.exists(self._cache_path(stage.name)):
+            return False
+        files = [f"{stage.output}.{self._format(stage, fmt)}"] if stage.output else []
+        return all(os.path.exists(os.path.join(self.output_dir, f)) for f in files + stage.files)
+
+    # Helper: value of a stage, loading it from the cache on first use (thread-safe)
+    def value(self, name):
+        with self._locks[name]:
+            if name not in self.values:
+                with self.instrumentation.stage(name, "cache_load") as rec, open(self._cache_path(name), "rb") as f:
+                    self.values[name] = pickle.load(f)
+                    rec["rows_out"] = row_count(self.values[name])
+            return self.values[name]
+
+    # Helper: compute one stage, write its output and store it in the cache
+    def _run_stage(self, stage, fp, fmt):
+        instr = self.instrumentation
+        args = [self.value(d) for d in stage.deps]
+        with instr.stage(stage.name, "compute", args) as rec:
+            value = stage.func(*args, **stage.params)
+            rec["rows_out"] = row_count(value)
+        with self._locks[stage.name]:
+            self.values[stage.name] = value
+
+        if self.write_outputs and (stage.writer is not None or stage.output):
+            with instr.stage(stage.name, "write") as rec:
+                if stage.writer is not None:
+                    stage.writer(value, self.output_dir)
+                else:
+                    print('Saved', write_frame(value, self.output_dir, stage.output, self._format(stage, fmt)))
+                rec["rows_out"] = row_count(value)
+
+        if self.use_cache and stage.cache:
+            with instr.stage(stage.name, "cache_write"):
+                with open(self._cache_path(stage.name) + ".tmp", "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(self._cache_path(stage.name) + ".tmp", self._cache_path(stage.name))
+        return fp
+
+    # Run everything the targets need; unchanged stages are skipped
+    def run(self, targets=None, fmt="csv"):
+        if self.use_cache:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        order = resolve(self.stages, targets)
+
+        # Fingerprints flow top-down from source files, so freshness is known before anything runs
+        fps, to_run = {}, []
+        for name in order:
+            stage = self.stages[name]
+            fps[name] = stage_fingerprint(stage, [fps[d] for d in stage.deps], self._format(stage, fmt))
+            if self._is_fresh(stage, fps[name], fmt):
+                self.status[name] = "cached"
+            else:
+                to_run.append(name)
+
+        # Only run a stale stage if it is a target or feeds a stage that runs
+        # (sources are never cached, so this keeps warm runs from loading them)
+        wanted = set(expand_targets(self.stages, targets))
+        keep = set()
+        for name in reversed(to_run):
+            if name in wanted or any(name in self.stages[k].deps for k in keep):
+                keep.add(name)
+        to_run = [n for n in to_run if n in keep]
+
+        # Dependency-aware scheduling: submit a stage once every dependency that has to run is done
+        done = {n for n in order if n not in to_run}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while to_run or running:
+                for name in [n for n in to_run if all(d in done for d in self.stages[n].deps)]:
+                    if self.verbose:
+                        print(f"Running stage {name}...")
+                    running[pool.submit(self._run_stage, self.stages[name], fps[name], fmt)] = name
+                    to_run.remove(name)
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    name = running.pop(fut)
+                    self._index[name] = fut.result()  # Re-raises a stage's exception
+                    self.status[name] = "ran"
+                    done.add(name)
+
+        if self.use_cache:
+            with open(self._index_path + ".tmp", "w") as f:
+                json.dump(self._index, f, indent=1, sort_keys=True)
+            os.replace(self._index_path + ".tmp", self._index_path)
+        for name in order:
+            if self.verbose and self.status.get(name) == "cached":
+                print(f"Skipped stage {name} (unchanged)")
+        return self.status
+
+
+# Helper: average savings rate per user, the surplus indicator for recommendations
+def user_surplus(daily_feat):
+    return daily_feat.groupby('user_id').agg({'savings_rate': 'mean'}).reset_index()
+
+
+# Helper: write recommendations (only the header when there are none, so an earlier run's file never survives)
+def _write_recommendations(recs, output_dir):
+    recs.to_csv(os.path.join(output_dir, 'recommendations.csv'), index=False)
+    if not recs.empty:
+        print('Saved recommendations.csv')
+    else:
+        print('No recommendations generated for given synthetic data and rules (this can happen).')
+
+
+# Helper: generate recommendations `chunk_rows` rows at a time and append every chunk to recommendations.csv
+# as a part, so the whole user x asset cross join is never held at once; returns the number of rows written
+def _write_recommendation_parts(surplus, asset_mom, chunk_rows, output_dir):
+    rows = 0
+    for part, chunk in enumerate(iter_investment_recommendations(surplus, asset_mom, chunk_rows=chunk_rows)):
+        write_frame(chunk, output_dir, 'recommendations', part=part)
+        rows += len(chunk)
+    if rows:
+        print('Saved recommendations.csv')
+    else:
+        write_frame(pd.DataFrame(columns=RECOMMENDATION_COLUMNS), output_dir, 'recommendations', part=0)
+        print('No recommendations generated for given synthetic data and rules (this can happen).')
+    return rows
+
+
+# Helper: recommendations stage from deps [per-user data, asset momentum]; `surplus(data)` gives the user surplus.
+# With `chunk_rows` the rows are written as parts while they are generated and the stage value is their count.
+def _recommendations_stage(deps, surplus, chunk_rows, output_dir):
+    if chunk_rows is None:
+        return Stage("recommendations", lambda data, mom: investment_recommendations(surplus(data), mom), deps,
+                     output="recommendations", writer=_write_recommendations)
+    return Stage("recommendations",
+                 lambda data, mom, chunk_rows: _write_recommendation_parts(surplus(data), mom, chunk_rows, output_dir),
+                 deps, params={"chunk_rows": chunk_rows}, output="recommendations", writer=lambda value, out: None)
+
+
+# Helper: streaming second pass that scores chunks and writes them as parts; returns only flagged rows.
+# A file without rows still gets an (empty) output, so an earlier run's file is never left behind.
+def _stream_transaction_anomalies(tx_agg, output_dir, fmt, chunksize, path=None):
+    flagged = []
+    for i, scored in enumerate(score_chunks(iter_transactions(chunksize, path), tx_agg.amount_stats())):
+        write_frame(scored, output_dir, 'anomalies_transactions', fmt, part=i)
+        flagged.append(scored[scored['is_anomaly']])
+    if not flagged:
+        empty = pd.DataFrame({c: pd.Series(dtype=t) for c, t in SCORED_DTYPES.items()})
+        write_frame(empty, output_dir, 'anomalies_transactions', fmt, part=0)
+        return empty
+    return pd.concat(flagged, ignore_index=True)
+
+
+# Helper: format a spill-backend output is written in (as PipelineRunner picks it for the other backends)
+def _spill_format(name, fmt):
+    return fmt if name in INTERMEDIATE_STAGES else "csv"
+
+
+# Helper: spill-backend stage spilling transactions to disk by user_id range and running every per-user
+# stage one partition at a time (outputs are written as parts); returns row counts and the user surplus
+def _spill_per_user_outputs(chunksize, path, users_per_partition, fmt, output_dir):
+    spilled = spill_transactions(iter_transactions(chunksize, path), os.path.join(output_dir, SPILL_DIR),
+                                 users_per_partition)
+    try:
+        formats = {name: _spill_format(name, fmt) for name in SPILL_OUTPUTS}
+        result = run_spilled(spilled, output_dir, formats, reduce=lambda out: user_surplus(out["daily_feat"]))
+    finally:
+        spilled.remove()
+    for name in SPILL_OUTPUTS:
+        print('Saved', f"{name}.{formats[name]}")
+    return result
+
+
+# Helper: true for an input given as a file path rather than a DataFrame
+def _is_path(value):
+    return isinstance(value, (str, os.PathLike))
+
+
+# Helper: source stage reading a file with `loader`, or handing over an in-memory frame (conformed to
+# `schema` like etl does at load, then passed through `wrap`). File sources are fingerprinted by their input
+# files; neither kind is cached here because etl keeps its own columnar cache (so runs from in-memory frames
+# must not use the stage cache).
+def _source_stage(name, loader, value, wrap=None, schema=None):
+    if not _is_path(value):
+        def hand_over():
+            frame = apply_schema(value, schema) if schema else value
+            return wrap(frame) if wrap else frame
+        return Stage(name, hand_over, cache=False)
+    return Stage(name, loader, source=value, params={"path": value}, cache=False)
+
+
+# Function to declare the pipeline DAG for a run mode.
+# Inputs are read from data_dir (default etl.DATA_DIR) unless `inputs` maps users / transactions / prices
+# to another path or to a DataFrame.
+# `backend` picks how the per-user transaction stages execute (outofcore.BACKENDS): "memory" is the pandas
+# reference path, "spill" runs them out of core, `users_per_partition` users at a time.
+# `recommendation_chunk_rows` generates and writes recommendations that many rows at a time (None: one frame).
+def build_stages(streaming=False, chunksize=etl.DEFAULT_CHUNKSIZE, workers=1, fmt="csv",
+                 incremental=False, csv_offset=None, output_dir="output", data_dir=None, inputs=None,
+                 backend="memory", users_per_partition=USERS_PER_PARTITION, recommendation_chunk_rows=None):
+    etl.check_output_format(fmt)  # Before anything runs, not when the first frame is written
+    data_dir = data_dir or etl.DATA_DIR
+    inputs = {name: os.path.join(data_dir, f"{name}.csv") for name in ("users", "transactions", "prices")} | {
+        k: v for k, v in (inputs or {}).items() if v is not None}
+    tx_path = inputs["transactions"]
+    if streaming and not _is_path(tx_path):
+        raise ValueError("streaming reads transactions from disk; pass a path instead of a frame")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    if backend == "spill":
+        if not _is_path(tx_path):
+            raise ValueError("the spill backend reads transactions from disk; pass a path instead of a frame")
+        if streaming or incremental or workers > 1:
+            raise ValueError("the spill backend cannot be combined with streaming, incremental or workers")
+    stages = [
+        _source_stage("users", load_users, inputs["users"], schema=USERS_SCHEMA),
+        _source_stage("prices", load_prices, inputs["prices"], schema=PRICES_SCHEMA),
+        Stage("asset_momentum", asset_momentum, ["prices"], output="asset_momentum"),
+        Stage("momentum_panel", momentum_panel, ["prices"], output="momentum_panel"),
+        _recommendations_stage(["daily_features", "asset_momentum"], user_surplus, recommendation_chunk_rows,
+                               output_dir),
+        Stage("daily_features", add_rolling_features, ["daily_aggregates"], output="daily_features"),
+        Stage("rollups", RollupCube, ["daily_aggregates"]),  # Week-level cube, kept in the stage cache
+        Stage("weekly_aggregates", RollupCube.weekly, ["rollups"], output="weekly_aggregates"),
+        Stage("anomalies_daily", daily_net_anomalies, ["daily_aggregates"], output="anomalies_daily"),
+        Stage("budgets_overall", smart_overall_budget, ["daily_features"], output="budgets_overall"),
+        Stage("daily_summaries", compose_daily_summary, ["daily_features", "anomalies_transactions"],
+              output="daily_summaries"),
+        Stage("weekly_summaries", compose_weekly_summary, ["weekly_aggregates"], output="weekly_summaries"),
+    ]
+
+    if streaming:
+        # Transactions are folded chunk by chunk; the anomaly pass re-reads the file and writes its own parts
+        stages += [
+            Stage("transaction_aggregates",
+                  lambda chunksize, path: aggregate_chunks(iter_transactions(chunksize, path)),
+                  source=tx_path, params={"chunksize": chunksize, "path": tx_path}),
+            Stage("daily_aggregates", lambda agg: agg.daily_aggregates(), ["transaction_aggregates"],
+                  output="daily_aggregates"),
+            Stage("anomalies_transactions",
+                  lambda agg, chunksize, path: _stream_transaction_anomalies(agg, output_dir, fmt, chunksize, path),
+                  ["transaction_aggregates"], output="anomalies_transactions",
+                  params={"chunksize": chunksize, "path": tx_path},
+                  writer=lambda value, out: print('Saved', f"anomalies_transactions.{fmt}")),  # Written as parts
+            Stage("budgets_by_category", lambda agg: agg.category_monthly_budget(), ["transaction_aggregates"],
+                  output="budgets_by_category"),
+        ]
+        tx_state_dep = "transaction_aggregates"
+    elif backend == "spill":
+        # One pass over the partitions writes every per-user output; these stages just report their row counts
+        stages = [s for s in stages if s.name not in SPILL_OUTPUTS and s.name != "recommendations"]
+        stages += [
+            Stage("per_user_outputs", _spill_per_user_outputs, source=tx_path,
+                  params={"chunksize": chunksize, "path": tx_path, "users_per_partition": users_per_partition,
+                          "fmt": fmt, "output_dir": output_dir},
+                  writer=lambda value, out: None,
+                  files=[f"{name}.{_spill_format(name, fmt)}" for name in SPILL_OUTPUTS]),
+            _recommendations_stage(["per_user_outputs", "asset_momentum"], lambda res: res["reduced"],
+                                   recommendation_chunk_rows, output_dir),
+        ]
+        for name in SPILL_OUTPUTS:
+            stages.append(Stage(name, lambda res, name=name: res["rows"][name], ["per_user_outputs"],
+                                params={"name": name}, writer=lambda value, out: None, cache=False))
+    else:
+        # Sorted once by (user_id, timestamp); the per-user stages take the store directly
+        stages.append(_source_stage("transactions", TransactionStore.load, tx_path, wrap=TransactionStore,
+                                    schema=TRANSACTIONS_SCHEMA))
+        if workers > 1:
+            # Every per-user stage runs inside the sharded worker pool; these stages just pick their frame
+            stages.append(Stage("shards", run_sharded, ["transactions"], params={"workers": workers}))
+            picks = {
+                "daily_aggregates": "daily", "daily_features": "daily_feat", "weekly_aggregates": "wk",
+                "anomalies_transactions": "anom_tx", "anomalies_daily": "anom_daily",
+                "budgets_by_category": "bud_cat", "budgets_overall": "bud_overall",
+                "daily_summaries": "daily_summ", "weekly_summaries": "weekly_summ",
+            }
+            stages = [s for s in stages if s.name not in picks]
+            for name, key in picks.items():
+                stages.append(Stage(name, lambda shards, key=key: shards[key], ["shards"], output=name,
+                                    params={"key": key}, cache=False))
+        else:
+            stages += [
+                Stage("daily_aggregates", daily_user_aggregates, ["transactions"], output="daily_aggregates"),
+                Stage("anomalies_transactions", transaction_zscore_anomalies, ["transactions"],
+                      output="anomalies_transactions"),
+                Stage("budgets_by_category", category_monthly_budget, ["transactions"],
+                      output="budgets_by_category"),
+            ]
+        tx_state_dep = "transactions"
+
+    if incremental:
+        # Save state so the next --incremental run only processes new transactions
+        def save_incremental_state(tx, daily, anom_tx):
+            tx_agg = tx if isinstance(tx, TransactionAggregates) else TransactionAggregates().update(as_frame(tx))
+            save_state(build_state(tx_agg, daily, anom_tx, csv_offset), output_dir)
+            print('Saved incremental state')
+
+        stages.append(Stage("incremental_state", save_incremental_state,
+                            [tx_state_dep, "daily_aggregates", "anomalies_transactions"], cache=False,
+                            writer=lambda value, out: None))
+    return {s.name: s for s in stages}
@@ -0,0 +1,119 @@
+import numpy as np  # For vectorized date arithmetic and binary search
+import pandas as pd  # For data handling
+
+
+# Granularities of the rollup cube, finest first, and the column holding each level's bucket start
+LEVELS = {"day": "date", "week": "week", "month": "month"}
+
+# Amount columns (one per transaction type, plus net) rolled up at every level
+ROLLUP_COLUMNS = ["spend", "deposit", "transfer", "net"]
+
+
+# Function to map dates to the Monday starting their week (pandas "W" periods run Monday..Sunday).
+# Pure datetime64 arithmetic: day number since 1970-01-01 (a Thursday) modulo 7 gives the weekday.
+def week_start(dates):
+    days = np.asarray(dates).astype("datetime64[D]")
+    monday = days - (days.astype("int64") + 3) % 7
+    return monday.astype(np.asarray(dates).dtype)
+
+
+# Function to map dates to the first day of their month
+def month_start(dates):
+    return np.asarray(dates).astype("datetime64[M]").astype(np.asarray(dates).dtype)
+
+
+# Function to roll daily aggregates up to one coarser level ("week" or "month").
+# Rows are (user_id, date) ordered, so each (user, bucket) is a contiguous run: one pass marks where runs
+# start and sums every amount column per run, with no Period objects and no hashing of the keys.
+def rollup(daily_agg, level):
+    d = _day_level(daily_agg)
+    bucket = {"week": week_start, "month": month_start}[level](d["date"].to_numpy())
+    user = d["user_id"].to_numpy()
+    starts = np.r_[True, (user[1:] != user[:-1]) | (bucket[1:] != bucket[:-1])] if len(d) else np.zeros(0, bool)
+    run = np.cumsum(starts) - 1  # Run number of every day
+
+    cols = [c for c in ROLLUP_COLUMNS if c in d.columns]
+    sums = d[cols].groupby(run, sort=False).sum()  # Same summation as a groupby on (user, bucket)
+    out = pd.DataFrame({"user_id": user[starts], LEVELS[level]: bucket[starts]})
+    for col in cols:
+        out[col] = sums[col].to_numpy()
+    return out
+
+
+# Helper: daily aggregates with a datetime64 date column, ordered by (user_id, date)
+def _day_level(daily_agg):
+    d = daily_agg
+    if not pd.api.types.is_datetime64_any_dtype(d["date"]):
+        d = d.assign(date=pd.to_datetime(d["date"]))
+    user, date = d["user_id"].to_numpy(), d["date"].to_numpy()
+    same_user = user[1:] == user[:-1]
+    if not ((user[1:] >= user[:-1]).all() and (date[1:][same_user] >= date[:-1][same_user]).all()):
+        d = d.sort_values(["user_id", "date"], kind="stable")
+    return d.reset_index(drop=True)
+
+
+# Multi-granularity cube of per-user amounts: day / week / month x user x type.
+# Built once from the daily aggregates (weeks and months are rolled up from the days, never from raw
+# transactions). Only the requested `levels` are kept: the pipeline's rollups stage holds just the week level
+# that the weekly aggregates (and the weekly summaries built on them) read instead of regrouping, so its stage
+# cache does not duplicate the daily aggregates. There is no category dimension, so category budgets still come
+# from budget.BudgetEngine's own month totals. Every level is sorted by (user_id, bucket) with a per-user offset
+# index, so one user's rows are a binary search away.
+class RollupCube:
+
+    def __init__(self, daily_agg, levels=("week",)):
+        unknown = [level for level in levels if level not in LEVELS]
+        if unknown:
+            raise ValueError(f"Unknown level(s) {unknown}, expected some of {tuple(LEVELS)}")
+        day = _day_level(daily_agg)
+        cols = [c for c in ROLLUP_COLUMNS if c in day.columns]
+        self.levels = {}
+        for level in LEVELS:  # Finest first
+            if level in levels:
+                self.levels[level] = day[["user_id", "date", *cols]] if level == "day" else rollup(day, level)
+        self._offsets = {}  # Level -> (sorted distinct user ids, starts, stops), built on first lookup
+
+    # Row count (finest level held), as reported by instrumentation
+    @property
+    def rows(self):
+        return len(next(iter(self.levels.values()), ()))
+
+    # Rows of one level, optionally for one user and/or buckets with start <= bucket < end
+    def query(self, level="week", user_id=None, start=None, end=None, columns=None):
+        if level not in self.levels:
+            raise ValueError(f"Level {level!r} is not in this cube, expected one of {tuple(self.levels)}")
+        frame = self.levels[level]
+        if user_id is not None:
+            lo, hi = self._span(level, user_id)
+            frame = frame.iloc[lo:hi]
+        if start is not None or end is not None:
+            bucket = frame[LEVELS[level]]
+            keep = np.ones(len(frame), bool)
+            if start is not None:
+                keep &= (bucket >= pd.Timestamp(start)).to_numpy()
+            if end is not None:
+                keep &= (bucket < pd.Timestamp(end)).to_numpy()
+            frame = frame[keep]
+        if columns is not None:
+            frame = frame[["user_id", LEVELS[level], *columns]]
+        return frame
+
+    # Weekly aggregates in the layout of features.weekly_user_aggregates
+    def weekly(self):
+        return self.query("week")
+
+    # Monthly aggregates (month = first day of the month); needs a cube built with the "month" level
+    def monthly(self):
+        return self.query("month")
+
+    # Helper: (start, stop) rows of one user in one level; empty span for unknown users
+    def _span(self, level, user_id):
+        if level not in self._offsets:
+            user = self.levels[level]["user_id"].to_numpy()
+            starts = np.flatnonzero(np.r_[True, user[1:] != user[:-1]]) if len(user) else np.zeros(0, "int64")
+            self._offsets[level] = (user[starts], starts, np.r_[starts[1:], len(user)].astype("int64"))
+        user_ids, starts, stops = self._offsets[level]
+        i = np.searchsorted(user_ids, user_id)
+        if i < len(user_ids) and user_ids[i] == user_id:
+            return int(starts[i]), int(stops[i])
+        return 0, 0
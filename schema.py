@@ -0,0 +1,113 @@
+import numpy as np  # For integer / float limits
+import pandas as pd  # For dtype checks and casts
+
+
+# Marker for "native datetime64 column" (the unit is kept as parsed)
+DATETIME = "datetime64"
+
+# Column dtypes of the input frames, applied by etl at load time.
+# Repeated strings become categoricals, ids are downcast to int32 and dates are datetime64; money stays
+# float64 because float32 cannot hold every cent of large amounts (and outputs would change).
+USERS_SCHEMA = {
+    "user_id": "int32",
+    "starting_balance": "float64",
+}
+TRANSACTIONS_SCHEMA = {
+    "transaction_id": "int32",
+    "user_id": "int32",
+    "timestamp": DATETIME,
+    "amount": "float64",
+    "category": "category",
+    "type": pd.CategoricalDtype(["deposit", "spend", "transfer"]),  # Closed set: anything else is an error
+    "merchant": "category",
+}
+PRICES_SCHEMA = {
+    "date": DATETIME,
+    "asset": "category",
+    "price": "float64",
+}
+
+# Dtypes of the per-user frames built from transactions (daily / weekly aggregates and features).
+# Stages produce these dtypes themselves; conform() re-applies them to frames read back from outputs.
+DAILY_SCHEMA = {
+    "user_id": "int32",
+    "date": DATETIME,
+}
+WEEKLY_SCHEMA = {
+    "user_id": "int32",
+    "week": DATETIME,
+}
+
+
+# Raised when a column cannot be stored in its schema dtype without losing values
+class SchemaError(ValueError):
+    pass
+
+
+# Function to cast the columns of `df` named in `schema` to their dtypes (other columns are left alone).
+# Integer and float narrowing is bounds-checked: values that do not fit (out of range, fractional,
+# missing, or not exactly representable in the narrower float) raise SchemaError instead of being
+# silently truncated, and so do values outside a categorical with fixed categories (missing ones
+# included). Columns that already have the right dtype are not copied.
+def apply_schema(df, schema):
+    casts = {}
+    for col, dtype in schema.items():
+        if col in df.columns and not _has_dtype(df[col], dtype):
+            casts[col] = _cast(df[col], dtype)
+    return df.assign(**casts) if casts else df
+
+
+# Helper: whether a column already has the schema dtype
+def _has_dtype(s, dtype):
+    if dtype == DATETIME:
+        return pd.api.types.is_datetime64_dtype(s.dtype)
+    if isinstance(dtype, str) and dtype == "category":
+        return isinstance(s.dtype, pd.CategoricalDtype)  # Open categories: any categorical will do
+    return s.dtype == pd.api.types.pandas_dtype(dtype)
+
+
+# Helper: cast one column to its schema dtype with bounds checks
+def _cast(s, dtype):
+    if dtype == DATETIME:
+        try:
+            return pd.to_datetime(s)
+        except (ValueError, TypeError) as exc:
+            raise SchemaError(f"column {s.name!r} is not a valid datetime: {exc}") from exc
+    target = pd.api.types.pandas_dtype(dtype)
+    if isinstance(target, pd.CategoricalDtype) and target.categories is not None:
+        unknown = ~s.isin(target.categories)  # Missing values are not in the categories either
+        if unknown.any():
+            values = sorted(map(str, pd.unique(s[unknown])))
+            raise SchemaError(f"column {s.name!r} has values {values} outside {list(target.categories)}")
+        return s.astype(target)
+    if target.kind in "iu":
+        return _cast_integer(s, target)
+    if target.kind == "f" and pd.api.types.is_float_dtype(s.dtype) and target.itemsize < s.dtype.itemsize:
+        narrowed = s.astype(target)
+        if not np.array_equal(narrowed.to_numpy(dtype="float64"), s.to_numpy(dtype="float64"), equal_nan=True):
+            raise SchemaError(f"column {s.name!r} loses precision as {target}")
+        return narrowed
+    return s.astype(target)
+
+
+# Helper: cast a column to a (possibly narrower) integer dtype, refusing to wrap around or truncate
+def _cast_integer(s, target):
+    if s.isna().any():
+        raise SchemaError(f"column {s.name!r} has missing values and cannot be stored as {target}")
+    values = s.to_numpy()
+    if not len(values):
+        return s.astype(target)  # An empty column (e.g. from a header-only CSV) has nothing to check
+    if values.dtype.kind == "f" and not np.array_equal(values, np.trunc(values)):
+        raise SchemaError(f"column {s.name!r} has fractional values and cannot be stored as {target}")
+    if values.dtype.kind not in "iuf":
+        raise SchemaError(f"column {s.name!r} ({s.dtype}) is not numeric and cannot be stored as {target}")
+    info = np.iinfo(target)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        raise SchemaError(f"column {s.name!r} has values in [{values.min()}, {values.max()}], "
+                          f"outside the {target} range [{info.min}, {info.max}]")
+    return s.astype(target)
+
+
+# Function to report the in-memory size of a frame in MB (deep: includes string and object payloads)
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
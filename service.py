@@ -0,0 +1,354 @@
+import json  # For request and response bodies
+import math  # For rejecting non-finite amounts
+import asyncio  # For the HTTP server
+import argparse  # For command line options
+from bisect import insort  # For keeping each user's days sorted
+from datetime import datetime  # For parsing transaction timestamps
+from urllib.parse import urlsplit, parse_qs  # For request routing
+import numpy as np  # For building the index
+import pandas as pd  # For loading pipeline outputs
+
+from etl import read_frame
+from online import OnlineAnomalyScorer
+from streaming import TransactionAggregates, DAILY_TYPES
+from budget import RECENT_MONTHS, BUDGET_SLACK, last_closed_month
+from summaries import daily_summary_line, anomaly_counts_by_day
+
+
+# Days averaged for the overall budget's spend estimate (the 7-row rolling window of features.py)
+SPEND_WINDOW = 7
+
+
+# Per-user state, materialized from the index arrays the first time a user is touched
+class UserState:
+
+    __slots__ = ("days", "dates", "category_month", "flagged", "last_timestamp")
+
+    def __init__(self):
+        self.days = {}  # date -> [deposit, spend, transfer, anomalies]
+        self.dates = []  # Sorted dates in `days`
+        self.category_month = {}  # (category, month ordinal) -> spend in cents
+        self.flagged = []  # Flagged transactions, oldest first
+        self.last_timestamp = None  # Latest transaction posted for this user (None: batch data only)
+
+
+# In-memory per-user index over pipeline outputs answering per-user queries in microseconds.
+# Daily rows, category-month spend and flagged transactions are stored as arrays sorted by user with
+# per-user offsets; a user's rows become a UserState on first access. New transactions update that state
+# and the user's z-score state (OnlineAnomalyScorer, scored against history before the transaction).
+class InsightsIndex:
+
+    def __init__(self, daily_features, anomalies_tx, z_thresh=3.0):
+        tx = anomalies_tx.assign(timestamp=pd.to_datetime(anomalies_tx["timestamp"]))
+        agg = TransactionAggregates().update(tx)  # Per-user amount stats and category-month spend
+        self.scorer = OnlineAnomalyScorer.from_stats(agg.user_stats, z_thresh=z_thresh)
+        self._users = {}  # user_id -> UserState for users touched so far
+
+        # Daily rows with flagged-transaction counts
+        d = daily_features.assign(date=pd.to_datetime(daily_features["date"])).sort_values(["user_id", "date"])
+        key = pd.MultiIndex.from_arrays([d["user_id"].to_numpy(), d["date"].to_numpy()])
+        counts = anomaly_counts_by_day(tx).reindex(key, fill_value=0).to_numpy()
+        self._daily = {
+            "date": d["date"].dt.date.to_numpy(),
+            "values": np.column_stack([d[t].to_numpy(dtype="float64") for t in DAILY_TYPES]),
+            "anomalies": counts,
+        }
+        self._daily_offsets = self._offsets(d["user_id"].to_numpy())
+
+        cm = agg.category_month.sort_index()
+        self._cat_month = {
+            "category": cm.index.get_level_values("category").to_numpy(),
+            "month": cm.index.get_level_values("month").asi8,  # Month ordinals, as in budget.BudgetEngine
+            "cents": cm.to_numpy(),
+        }
+        self._cat_offsets = self._offsets(cm.index.get_level_values("user_id").to_numpy())
+        # Last closed month of the batch data; a user's budget window ends there or at the last closed month
+        # of that user's own posted transactions, so one user's transactions never move another user's window
+        self.closed_month = last_closed_month(agg.last_timestamp) if agg.last_timestamp is not None else None
+
+        flagged = tx[tx["is_anomaly"].astype(bool)].sort_values(["user_id", "timestamp"], kind="stable")
+        self._flagged = flagged[["transaction_id", "timestamp", "amount", "category", "type", "z"]].assign(
+            timestamp=flagged["timestamp"].astype(str), category=flagged["category"].astype(str),
+            type=flagged["type"].astype(str)).to_dict("records")
+        self._flagged_offsets = self._offsets(flagged["user_id"].to_numpy())
+
+    # Load the index from the outputs of a pipeline run
+    @classmethod
+    def from_output(cls, output_dir="output", fmt="csv", z_thresh=3.0):
+        return cls(read_frame(output_dir, "daily_features", fmt),
+                   read_frame(output_dir, "anomalies_transactions", fmt), z_thresh)
+
+    # Helper: user_id -> (start, stop) for an array sorted by user
+    @staticmethod
+    def _offsets(users):
+        if len(users) == 0:
+            return {}
+        uniq, starts = np.unique(users, return_index=True)
+        stops = np.r_[starts[1:], len(users)]
+        return dict(zip(uniq.tolist(), zip(starts.tolist(), stops.tolist())))
+
+    # Number of users known to the index
+    def __len__(self):
+        return len(self._daily_offsets.keys() | self._users.keys())
+
+    def __contains__(self, user_id):
+        return user_id in self._users or user_id in self._daily_offsets
+
+    # Helper: state of one user, materialized on first use (None for unknown users unless create=True)
+    def _user(self, user_id, create=False):
+        state = self._users.get(user_id)
+        if state is not None:
+            return state
+        if user_id not in self._daily_offsets and not create:
+            return None
+        state = UserState()
+        lo, hi = self._daily_offsets.get(user_id, (0, 0))
+        values = self._daily["values"][lo:hi].tolist()
+        for day, row, count in zip(self._daily["date"][lo:hi], values, self._daily["anomalies"][lo:hi].tolist()):
+            state.days[day] = row + [count]
+        state.dates = list(self._daily["date"][lo:hi])
+        lo, hi = self._cat_offsets.get(user_id, (0, 0))
+        state.category_month = dict(zip(zip(self._cat_month["category"][lo:hi], self._cat_month["month"][lo:hi].tolist()),
+                                        self._cat_month["cents"][lo:hi].tolist()))
+        lo, hi = self._flagged_offsets.get(user_id, (0, 0))
+        state.flagged = self._flagged[lo:hi]
+        self._users[user_id] = state
+        return state
+
+    # Daily summary of one user for `date` (default: the latest day with activity)
+    def summary(self, user_id, date=None):
+        state = self._user(user_id)
+        if state is None or not state.dates:
+            return None
+        day = state.dates[-1] if date is None else datetime.strptime(date, "%Y-%m-%d").date()
+        if day not in state.days:
+            return None
+        deposit, spend, transfer, count = state.days[day]
+        rate = deposit / (deposit + spend) if (deposit + spend) > 0 else 0
+        stamp = pd.Timestamp(day)
+        return {"user_id": user_id, "date": str(day), "deposit": deposit, "spend": spend, "transfer": transfer,
+                "savings_rate": rate, "anomalies": count,
+                "summary": daily_summary_line(user_id, stamp, spend, deposit, rate, count)}
+
+    # Category and overall budgets of one user (same rules as budget.py: trailing RECENT_MONTHS window
+    # ending at the last closed month, averaged over the user's history if that is shorter, with zero rows
+    # for categories only spent in before the window)
+    def budgets(self, user_id):
+        state = self._user(user_id)
+        if state is None:
+            return None
+        ends = [self.closed_month] if self.closed_month is not None else []
+        if state.last_timestamp is not None:
+            ends.append(last_closed_month(state.last_timestamp))
+        as_of = max(ends, default=None)
+        totals = {}
+        history = []
+        if as_of is not None:
+            history = [month for _, month in state.category_month if month <= as_of]
+            for (category, month), cents in state.category_month.items():
+                if month <= as_of:
+                    totals[category] = totals.get(category, 0) + (cents if as_of - month < RECENT_MONTHS else 0)
+        n = min(RECENT_MONTHS, as_of - min(history) + 1) if history else 1
+        categories = [{"category": c, "avg_monthly_spend": total / 100 / n,
+                       "proposed_budget": float(np.round(total / 100 / n * BUDGET_SLACK, 2))} for c, total in sorted(totals.items())]
+
+        recent = [state.days[d][1] for d in state.dates[-SPEND_WINDOW:]]
+        rates = [dep / (dep + sp) if (dep + sp) > 0 else 0 for dep, sp, _, _ in state.days.values()]
+        savings_rate = sum(rates) / len(rates) if rates else 0.0
+        estimated = round(sum(recent) / len(recent) * 30, 2) if recent else 0.0
+        overall = {"estimated_monthly_spend": estimated, "savings_rate": savings_rate,
+                   "recommended_monthly_budget": round(estimated * 0.9, 2) if savings_rate < 0.1 else estimated}
+        return {"user_id": user_id, "categories": categories, "overall": overall}
+
+    # Most recent flagged transactions of one user (at most `limit`, a positive integer)
+    def anomalies(self, user_id, limit=50):
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+            raise ValueError("limit must be a positive integer")
+        state = self._user(user_id)
+        if state is None:
+            return None
+        return {"user_id": user_id, "anomalies": state.flagged[-limit:][::-1]}
+
+    # Apply one new transaction: score it, then fold it into the user's daily, budget and z-score state.
+    # The transaction is validated first (ValueError), so a rejected one leaves no trace.
+    def add_transaction(self, user_id, tx):
+        return self.apply(user_id, parse_transaction(tx))
+
+    # Apply one transaction already checked by parse_transaction
+    def apply(self, user_id, parsed):
+        amount, ttype, ts, category, transaction_id = parsed
+        state = self._user(user_id, create=True)
+        state.last_timestamp = ts if state.last_timestamp is None else max(state.last_timestamp, ts)
+        z, flagged = self.scorer.score(user_id, amount)
+        day = ts.date()
+        row = state.days.get(day)
+        if row is None:
+            row = state.days[day] = [0.0, 0.0, 0.0, 0]
+            insort(state.dates, day)
+        row[DAILY_TYPES.index(ttype)] += amount
+        if ttype == "spend":
+            month = (ts.year - 1970) * 12 + ts.month - 1  # Month ordinal
+            key = (category, month)
+            state.category_month[key] = state.category_month.get(key, 0) + round(amount * 100)
+        if flagged:
+            row[3] += 1
+            state.flagged.append({"transaction_id": transaction_id, "timestamp": str(ts),
+                                  "amount": amount, "category": category, "type": ttype, "z": z})
+        return {"user_id": user_id, "z": z, "is_anomaly": bool(flagged)}
+
+
+# Function to validate one posted transaction without touching any state.
+# Returns (amount, type, timestamp, category, transaction_id); raises ValueError for anything the index
+# cannot fold in: a non-object body, a missing, non-numeric or non-finite amount, an unknown type, or a
+# timestamp that is not ISO 8601, carries a time zone (stored days are naive local dates) or lies in the future.
+def parse_transaction(tx):
+    if not isinstance(tx, dict):
+        raise ValueError("each transaction must be a JSON object")
+    if "amount" not in tx:
+        raise ValueError("missing field 'amount'")
+    amount = tx["amount"]
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        raise ValueError("amount must be a number")
+    amount = float(amount)
+    if not math.isfinite(amount):
+        raise ValueError("amount must be finite")
+    ttype = tx.get("type", "spend")
+    if ttype not in DAILY_TYPES:
+        raise ValueError(f"type must be one of {DAILY_TYPES}")
+    now = datetime.now()
+    if "timestamp" in tx:
+        if not isinstance(tx["timestamp"], str):
+            raise ValueError("timestamp must be an ISO 8601 string")
+        ts = datetime.fromisoformat(tx["timestamp"])
+        if ts.tzinfo is not None:
+            raise ValueError("timestamp must not carry a time zone")
+        if ts > now:
+            raise ValueError("timestamp must not be in the future")
+    else:
+        ts = now
+    category = tx.get("category", ttype)
+    if not isinstance(category, str):
+        raise ValueError("category must be a string")
+    return amount, ttype, ts, category, tx.get("transaction_id")
+
+
+# Function to parse the ?limit= query parameter; raises ValueError unless it is a positive integer
+def parse_limit(value):
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError("limit must be a positive integer")
+    return int(value)
+
+
+# HTTP reason phrases used by the service
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            500: "Internal Server Error"}
+
+
+# Minimal asyncio HTTP/1.1 JSON service (keep-alive) over an InsightsIndex.
+# GET  /health                         -> {"status": "ok", "users": n}
+# GET  /users/<id>                     -> summary, budgets and anomalies
+# GET  /users/<id>/summary[?date=...]  -> daily summary
+# GET  /users/<id>/budgets             -> category and overall budgets
+# GET  /users/<id>/anomalies[?limit=n] -> flagged transactions, newest first
+# POST /users/<id>/transactions        -> body: one transaction object or a list of them
+class InsightsService:
+
+    def __init__(self, index):
+        self.index = index
+
+    # Route one request; returns (status, payload)
+    def dispatch(self, method, target, body=b""):
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if parts == ["health"]:
+            return 200, {"status": "ok", "users": len(self.index)}
+        if len(parts) < 2 or parts[0] != "users":
+            return 404, {"error": "not found"}
+        try:
+            user_id = int(parts[1])
+        except ValueError:
+            return 400, {"error": "user id must be an integer"}
+        view = parts[2] if len(parts) > 2 else ""
+
+        if view == "transactions":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            try:
+                records = json.loads(body or b"null")
+                records = records if isinstance(records, list) else [records]
+                parsed = [parse_transaction(r) for r in records]  # The whole request is checked before any update
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            return 200, {"results": [self.index.apply(user_id, p) for p in parsed]}
+        if method != "GET":
+            return 405, {"error": "use GET"}
+        if user_id not in self.index:
+            return 404, {"error": f"unknown user {user_id}"}
+        try:
+            if view == "summary":
+                result = self.index.summary(user_id, query.get("date"))
+            elif view == "budgets":
+                result = self.index.budgets(user_id)
+            elif view == "anomalies":
+                result = self.index.anomalies(user_id, parse_limit(query.get("limit", "50")))
+            elif view == "":
+                result = {"summary": self.index.summary(user_id), "budgets": self.index.budgets(user_id),
+                          "anomalies": self.index.anomalies(user_id)["anomalies"]}
+            else:
+                return 404, {"error": "not found"}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        return (200, result) if result is not None else (404, {"error": "no data for that day"})
+
+    # Serve one connection: requests are answered in order until the client closes it
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, version = line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, payload = self.dispatch(method, target, body)
+                    data = json.dumps(payload, default=str, allow_nan=False).encode()
+                except Exception as e:  # A bug must not drop the connection: answer 500 and keep serving
+                    status, data = 500, json.dumps({"error": f"internal error: {e}"}).encode()
+                writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if version == "HTTP/1.0" or headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Malformed request or client went away: drop the connection
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving {len(self.index)} users on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve per-user insights from pipeline outputs.")
+    parser.add_argument("--output-dir", default="output", help="Directory with the outputs of main.py")
+    parser.add_argument("--format", default="csv", help="Format the intermediate outputs were written in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--z-thresh", type=float, default=3.0, help="|z| above this flags a new transaction")
+    args = parser.parse_args()
+
+    index = InsightsIndex.from_output(args.output_dir, args.format, args.z_thresh)
+    asyncio.run(InsightsService(index).serve(args.host, args.port))
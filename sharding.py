@@ -0,0 +1,85 @@
+import os  # For the default worker count
+from concurrent.futures import ProcessPoolExecutor  # For running shards in parallel processes
+import numpy as np  # For partition arithmetic
+import pandas as pd  # For data manipulation
+
+from features import daily_user_aggregates, weekly_user_aggregates, add_rolling_features
+from anomaly import transaction_zscore_anomalies, daily_net_anomalies
+from budget import category_monthly_budget, smart_overall_budget, last_closed_month
+from summaries import compose_daily_summary, compose_weekly_summary
+from store import TransactionStore, as_frame
+
+
+# Per-user outputs produced by every shard, in the order main.py writes them
+SHARD_OUTPUTS = [
+    "daily", "daily_feat", "wk", "anom_tx", "anom_daily",
+    "bud_cat", "bud_overall", "daily_summ", "weekly_summ",
+]
+
+
+# Function to assign each user to one of n_shards partitions (stable across processes and runs)
+def shard_of(user_ids, n_shards):
+    hashed = pd.util.hash_array(np.asarray(user_ids))  # Deterministic 64-bit hash of each id
+    return (hashed % np.uint64(n_shards)).astype("int64")
+
+
+# Function to split transactions (frame or TransactionStore) into per-shard frames by user_id
+def partition_transactions(transactions, n_shards):
+    transactions = as_frame(transactions)  # Shards of a sorted store stay sorted
+    shard = shard_of(transactions["user_id"].to_numpy(), n_shards)
+    return [transactions[shard == i] for i in range(n_shards)]
+
+
+# Function running the full per-user stage chain on one shard (executed in a worker process)
+# `budget_as_of` is the last closed month of the whole dataset, so every shard budgets over the same window.
+def run_shard(transactions, budget_as_of=None):
+    transactions = TransactionStore(transactions)  # Sorted once; the stages below reuse its user index
+    daily = daily_user_aggregates(transactions)  # Summarize daily user transactions
+    daily_feat = add_rolling_features(daily)  # Compute 7-day rolling averages & savings rate
+    wk = weekly_user_aggregates(daily)  # Summarize weekly user transactions
+    anom_tx = transaction_zscore_anomalies(transactions)  # Flag unusual transactions
+    return {
+        "daily": daily,
+        "daily_feat": daily_feat,
+        "wk": wk,
+        "anom_tx": anom_tx,
+        "anom_daily": daily_net_anomalies(daily),  # Flag unusual daily net movements
+        "bud_cat": category_monthly_budget(transactions, as_of=budget_as_of),  # Propose budget per category per user
+        "bud_overall": smart_overall_budget(daily_feat),  # Suggest overall monthly budget per user
+        "daily_summ": compose_daily_summary(daily_feat, anom_tx),  # Combine features & anomalies
+        "weekly_summ": compose_weekly_summary(wk),
+    }
+
+
+# Function to merge shard outputs in a deterministic order.
+# Every stage output is already sorted by user_id first and each user lives in exactly one shard,
+# so a stable sort on user_id reproduces the single-process row order. An output no shard has rows for
+# is returned empty, with the columns of the first shard's frame.
+def merge_shards(results):
+    if not results:
+        raise ValueError("merge_shards needs the outputs of at least one shard")
+    merged = {}
+    for name in SHARD_OUTPUTS:
+        parts = [r[name] for r in results if len(r[name])]
+        if not parts:
+            merged[name] = results[0][name]
+            continue
+        frame = pd.concat(parts)
+        merged[name] = frame.iloc[np.argsort(frame["user_id"].to_numpy(), kind="stable")].reset_index(drop=True)
+    return merged
+
+
+# Function to run the per-user stages over hash-partitioned shards in a process pool
+def run_sharded(transactions, workers=None, n_shards=None):
+    workers = workers or os.cpu_count() or 1
+    n_shards = n_shards or workers  # One shard per worker by default
+    shards = [s for s in partition_transactions(transactions, n_shards) if len(s)]
+    if not shards:
+        return merge_shards([run_shard(as_frame(transactions))])  # Empty input: empty outputs with their columns
+    as_of = last_closed_month(as_frame(transactions)["timestamp"].max())
+    if workers == 1 or len(shards) <= 1:
+        results = [run_shard(s, as_of) for s in shards]  # No pool needed
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_shard, shards, [as_of] * len(shards)))  # map() keeps shard order
+    return merge_shards(results)
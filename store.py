@@ -0,0 +1,90 @@
+import numpy as np  # For offsets and binary search
+import pandas as pd  # For data handling
+
+from etl import load_transactions
+
+
+# Transactions sorted once by (user_id, timestamp) with a per-user offset index.
+# Each user's rows are one contiguous block, so user and user+time-range lookups are O(log n)
+# binary searches returning positional (zero-copy) slices of the sorted frame, and stages that
+# accept a store skip their own factorize / sort passes.
+class TransactionStore:
+
+    def __init__(self, transactions, presorted=False):
+        df = transactions
+        if not presorted and not _is_sorted(df):
+            df = df.sort_values(["user_id", "timestamp"])  # Stable multi-key sort, same order as the stages used
+        self.frame = df  # Sorted transactions (index labels are kept, lookups are positional)
+
+        user = df["user_id"].to_numpy()
+        self.starts = np.flatnonzero(np.r_[True, user[1:] != user[:-1]]) if len(user) else np.zeros(0, "int64")
+        self.stops = np.r_[self.starts[1:], len(user)].astype("int64")
+        self.user_ids = user[self.starts]  # Sorted distinct user ids
+        self.codes = np.repeat(np.arange(len(self.starts)), self.stops - self.starts)  # Row -> user position
+        self._timestamps = df["timestamp"].to_numpy()  # Sorted within each user block
+        self._categories = None  # Lazily built category index
+
+    # Load transactions.csv (or `path`) through etl and sort it once
+    @classmethod
+    def load(cls, path=None):
+        return cls(load_transactions(path))
+
+    def __len__(self):
+        return len(self.frame)
+
+    # Row count, as reported by instrumentation
+    @property
+    def rows(self):
+        return len(self.frame)
+
+    # Helper: (start, stop) rows of one user; empty span for unknown users
+    def _span(self, user_id):
+        i = np.searchsorted(self.user_ids, user_id)
+        if i < len(self.user_ids) and self.user_ids[i] == user_id:
+            return int(self.starts[i]), int(self.stops[i])
+        return 0, 0
+
+    # All transactions of one user, oldest first (a view of the sorted frame)
+    def user(self, user_id):
+        lo, hi = self._span(user_id)
+        return self.frame.iloc[lo:hi]
+
+    # Transactions of one user with start <= timestamp < end (either bound may be None)
+    def user_range(self, user_id, start=None, end=None):
+        lo, hi = self._span(user_id)
+        ts = self._timestamps[lo:hi]
+        if start is not None:
+            lo += int(np.searchsorted(ts, np.datetime64(pd.Timestamp(start)), side="left"))
+        if end is not None:
+            hi = lo + int(np.searchsorted(self._timestamps[lo:hi], np.datetime64(pd.Timestamp(end)), side="left"))
+        return self.frame.iloc[lo:max(lo, hi)]
+
+    # Transactions of one category (optionally of one user), in (user_id, timestamp) order.
+    # Category rows are not contiguous, so unlike user slices this gathers rows (one take).
+    def category(self, category, user_id=None):
+        if self._categories is None:
+            codes, uniques = pd.factorize(self.frame["category"])
+            order = np.argsort(codes, kind="stable")  # Positions grouped by category, still sorted within
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self._categories = (order, {c: (bounds[i], bounds[i + 1]) for i, c in enumerate(uniques)})
+        order, spans = self._categories
+        lo, hi = spans.get(category, (0, 0))
+        positions = order[lo:hi]
+        if user_id is not None:
+            ulo, uhi = self._span(user_id)
+            positions = positions[np.searchsorted(positions, ulo):np.searchsorted(positions, uhi)]
+        return self.frame.take(positions)
+
+
+# Helper: whether a frame is already ordered by (user_id, timestamp)
+def _is_sorted(df):
+    if len(df) < 2:
+        return True
+    du = np.diff(df["user_id"].to_numpy())
+    dt = np.diff(df["timestamp"].to_numpy())
+    return bool((du >= 0).all() and ((du > 0) | (dt >= np.timedelta64(0))).all())
+
+
+# Function to get the transactions frame out of a TransactionStore (frames pass through unchanged)
+def as_frame(transactions):
+    return transactions.frame if isinstance(transactions, TransactionStore) else transactions
@@ -0,0 +1,180 @@
+import numpy as np  # Import numpy for numerical computations
+import pandas as pd  # Import pandas for data manipulation
+
+from budget import BudgetEngine, RECENT_MONTHS
+
+
+# Transaction types that become columns of the daily aggregates
+DAILY_TYPES = ["deposit", "spend", "transfer"]
+
+# Columns (and dtypes) of the scored transactions written by the streaming anomaly pass
+SCORED_DTYPES = {
+    "transaction_id": "int32", "user_id": "int32", "timestamp": "datetime64[ns]", "amount": "float64",
+    "category": "category", "type": "category", "merchant": "category", "z": "float64", "is_anomaly": "bool",
+}
+
+
+# Helper to convert float amounts to exact integer cents (fixed-point)
+def _to_cents(amount):
+    return np.round(amount.to_numpy(dtype="float64") * 100).astype("int64")
+
+
+# Mergeable partial aggregates folded from transaction chunks.
+# Memory grows with the number of distinct (user, day) / (user, category, month)
+# keys, never with the number of transactions read.
+class TransactionAggregates:
+
+    def __init__(self):
+        self.daily = None  # Integer-cent sums indexed by (user_id, date, type)
+        self.category_month = None  # Integer-cent spend indexed by (user_id, category, month)
+        self.user_stats = None  # Per-user count / mean / M2 of absolute amounts
+        self.rows = 0  # Number of transactions folded so far
+        self.max_transaction_id = 0  # Highest transaction_id folded so far
+        self.last_timestamp = None  # Latest transaction timestamp folded so far (end of the data)
+
+    # Fold one chunk of transactions into the partial aggregates
+    def update(self, chunk):
+        if chunk.empty:
+            return self  # Nothing to fold (e.g. a header-only file)
+        cents = _to_cents(chunk["amount"])  # Fixed-point amounts make sums exact and order-independent
+        user = chunk["user_id"].to_numpy()
+        ts = chunk["timestamp"]
+        ttype = chunk["type"].astype(str).to_numpy()
+
+        # Daily sums per user, date and type
+        day = ts.dt.normalize().to_numpy()
+        daily = pd.Series(cents).groupby([user, day, ttype]).sum()
+        daily.index.names = ["user_id", "date", "type"]
+
+        # Monthly spend per user and category (spend transactions only)
+        is_spend = ttype == "spend"
+        cat_month = pd.Series(cents[is_spend]).groupby([
+            user[is_spend],
+            chunk["category"].astype(str).to_numpy()[is_spend],
+            ts[is_spend].dt.to_period("M").to_numpy(),
+        ]).sum()
+        cat_month.index.names = ["user_id", "category", "month"]
+
+        # Per-user count, mean and M2 of absolute amounts for z-scores
+        abs_amount = pd.Series(np.abs(chunk["amount"].to_numpy(dtype="float64")))
+        grouped = abs_amount.groupby(user)
+        stats = pd.DataFrame({
+            "count": grouped.count(),
+            "mean": grouped.mean(),
+            "m2": grouped.var(ddof=0) * grouped.count(),  # Sum of squared deviations from the chunk mean
+        })
+        stats.index.name = "user_id"
+
+        self._merge_parts(daily, cat_month, stats, len(chunk))
+        self.max_transaction_id = max(self.max_transaction_id, int(chunk["transaction_id"].max()))
+        self._see_timestamp(ts.max())
+        return self
+
+    # Merge another TransactionAggregates (e.g. from a different file shard) into this one
+    def merge(self, other):
+        self._merge_parts(other.daily, other.category_month, other.user_stats, other.rows)
+        self.max_transaction_id = max(self.max_transaction_id, other.max_transaction_id)
+        self._see_timestamp(other.last_timestamp)
+        return self
+
+    # Helper: advance the end of the data
+    def _see_timestamp(self, ts):
+        if ts is not None and not pd.isna(ts):
+            self.last_timestamp = ts if self.last_timestamp is None else max(self.last_timestamp, ts)
+
+    # Combine partial sums and Welford/Chan statistics with the current state
+    def _merge_parts(self, daily, category_month, stats, rows):
+        self.daily = _add_series(self.daily, daily)
+        self.category_month = _add_series(self.category_month, category_month)
+        self.user_stats = _merge_stats(self.user_stats, stats)
+        self.rows += rows
+
+    # Daily aggregates in the same layout as features.daily_user_aggregates
+    def daily_aggregates(self):
+        if self.daily is None:
+            return pd.DataFrame({"user_id": pd.Series(dtype="int32"), "date": pd.Series(dtype="datetime64[ns]"),
+                                 **{t: pd.Series(dtype="float64") for t in DAILY_TYPES + ["net"]}})
+        pivot = (self.daily.unstack("type", fill_value=0) / 100.0).reset_index()
+        pivot["net"] = pivot.get("deposit", 0) - pivot.get("spend", 0) - pivot.get("transfer", 0)
+        pivot.columns.name = None
+        return pivot.sort_values(["user_id", "date"]).reset_index(drop=True)
+
+    # Category budgets in the same layout as budget.category_monthly_budget, from the running monthly totals
+    def category_monthly_budget(self, recent_months=RECENT_MONTHS, method="trailing", alpha=None, as_of=None):
+        engine = BudgetEngine(self.category_month, last_timestamp=self.last_timestamp)
+        return engine.budgets(recent_months, method=method, alpha=alpha, as_of=as_of)
+
+    # Per-user mean and population std of absolute amounts
+    def amount_stats(self):
+        if self.user_stats is None:
+            return pd.DataFrame({c: pd.Series(dtype="float64") for c in ["count", "mean", "std"]})
+        stats = self.user_stats.copy()
+        stats["std"] = np.sqrt(stats["m2"] / stats["count"])  # Population std (ddof=0)
+        return stats[["count", "mean", "std"]]
+
+
+# Helper to add two sparse sum Series, treating missing keys as zero
+def _add_series(a, b):
+    if a is None:
+        return b
+    if b is None or b.empty:
+        return a
+    return a.add(b, fill_value=0).astype("int64")
+
+
+# Helper to merge per-user (count, mean, m2) frames with Chan's parallel update
+def _merge_stats(a, b):
+    if a is None:
+        return b
+    if b is None or b.empty:
+        return a
+    idx = a.index.union(b.index)
+    a = a.reindex(idx, fill_value=0)
+    b = b.reindex(idx, fill_value=0)
+    n = a["count"] + b["count"]
+    delta = b["mean"] - a["mean"]
+    return pd.DataFrame({
+        "count": n,
+        "mean": a["mean"] + delta * b["count"] / n,
+        "m2": a["m2"] + b["m2"] + delta ** 2 * a["count"] * b["count"] / n,
+    })
+
+
+# Helper to take per-user (count, mean, m2) statistics `b` of a subset of rows back out of `a` (Chan's update
+# solved for one side); users left without rows get zeros
+def _remove_stats(a, b):
+    if b is None or b.empty:
+        return a
+    b = b.reindex(a.index, fill_value=0)
+    n = a["count"] - b["count"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = ((a["count"] * a["mean"] - b["count"] * b["mean"]) / n).where(n > 0, 0.0)
+        delta = b["mean"] - mean
+        m2 = (a["m2"] - b["m2"] - delta ** 2 * n * b["count"] / a["count"]).where(n > 0, 0.0)
+    return pd.DataFrame({"count": n, "mean": mean, "m2": m2.clip(lower=0)})
+
+
+# Function to fold an iterable of transaction chunks into TransactionAggregates
+def aggregate_chunks(chunks):
+    agg = TransactionAggregates()
+    for chunk in chunks:
+        agg.update(chunk)  # Each chunk is released after it has been folded in
+    return agg
+
+
+# Function to score transaction chunks against precomputed per-user statistics
+def score_chunks(chunks, amount_stats, z_thresh=3.0):
+    for chunk in chunks:
+        stats = amount_stats.reindex(chunk["user_id"].to_numpy())  # Look up each row's user statistics
+        mu = stats["mean"].to_numpy()
+        sigma = stats["std"].to_numpy()
+        abs_amount = np.abs(chunk["amount"].to_numpy(dtype="float64"))
+
+        # If std is zero or NaN, assign z-score zero to avoid division by zero
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where((sigma == 0) | np.isnan(sigma), 0.0, (abs_amount - mu) / sigma)
+
+        out = chunk[list(SCORED_DTYPES)[:-2]].copy()  # Transaction columns; z and is_anomaly are added below
+        out["z"] = z
+        out["is_anomaly"] = np.abs(z) > z_thresh  # Flag transaction as anomaly if z-score exceeds threshold
+        yield out
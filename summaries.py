@@ -1,6 +1,11 @@
+import numpy as np  # Import numpy for vectorized day formatting
 import pandas as pd  # Import pandas library for data manipulation
 
 
+# Rows composed per batch in the summary functions (bounds the temporary per-row Python objects)
+SUMMARY_CHUNK = 100_000
+
+
 # Function to generate daily summary strings per user-day
 def compose_daily_summary(daily_features, anomalies_tx, user_id=None):
     """
@@ -14,40 +19,55 @@ def compose_daily_summary(daily_features, anomalies_tx, user_id=None):
     Returns:
         pd.DataFrame: Summary lines with ['user_id', 'date', 'summary']
     """
-    df = daily_features.copy()  # Copy the daily features DataFrame to avoid modifying original
+    df = daily_features
     if user_id is not None:
         df = df[df['user_id'] == user_id]  # Filter for a specific user if provided
 
-    lines = []  # Initialize list to store summary rows
-    for _, r in df.iterrows():  # Iterate over each row in daily features
-        uid = r['user_id']  # Extract user ID
-        date = r['date']    # Extract date
-        spend = r['spend']  # Extract daily spending
-        deposit = r['deposit']  # Extract daily deposit
-        savings_rate = r.get('savings_rate', 0)  # Extract savings rate, default to 0 if missing
-
-        # Count number of anomaly transactions for this user on this date
-        anomalies_count = anomalies_tx[
-            (anomalies_tx['user_id'] == uid)  # Match user
-            & (anomalies_tx['timestamp'].dt.date == pd.to_datetime(date).date())  # Match date
-            & (anomalies_tx['is_anomaly'])  # Only count flagged anomalies
-        ].shape[0]
-
-        # Compose human-readable summary string
-        text = (
+    # Count flagged anomaly transactions once per (user_id, date) instead of rescanning per row
+    anomaly_counts = anomaly_counts_by_day(anomalies_tx)
+    day_key = pd.MultiIndex.from_arrays([
+        df['user_id'].to_numpy(),
+        pd.to_datetime(df['date']).dt.normalize().astype('datetime64[ns]').to_numpy(),
+    ])
+    counts = anomaly_counts.reindex(day_key, fill_value=0).to_numpy()
+
+    # Compose human-readable summary strings in bulk, SUMMARY_CHUNK rows at a time so the
+    # per-row Python objects of only one chunk are alive at once
+    rates = df['savings_rate'] if 'savings_rate' in df.columns else pd.Series(0, index=df.index)
+    parts = []
+    for lo in range(0, len(df), SUMMARY_CHUNK):
+        rows = slice(lo, lo + SUMMARY_CHUNK)
+        texts = [
             f"User {uid} | {date} — Spent: ₹{spend:.2f}, "
-            f"Deposited: ₹{deposit:.2f}, Savings rate: {savings_rate:.2f}, "
-            f"Anomalies: {anomalies_count}"
-        )
+            f"Deposited: ₹{deposit:.2f}, Savings rate: {rate:.2f}, "
+            f"Anomalies: {count}"
+            for uid, date, spend, deposit, rate, count in zip(
+                df['user_id'].iloc[rows].tolist(), df['date'].iloc[rows].tolist(),
+                df['spend'].iloc[rows].tolist(), df['deposit'].iloc[rows].tolist(),
+                rates.iloc[rows].tolist(), counts[rows].tolist()
+            )
+        ]
+        parts.append(pd.array(texts, dtype='str'))
+
+    return pd.DataFrame({
+        'user_id': df['user_id'].to_numpy(),
+        'date': df['date'].to_numpy(),
+        'summary': _concat_strings(parts)
+    })
+
+
+# Function to render one daily summary line (same text as compose_daily_summary, used per user by service.py)
+def daily_summary_line(uid, date, spend, deposit, rate, count):
+    return (f"User {uid} | {date} — Spent: ₹{spend:.2f}, "
+            f"Deposited: ₹{deposit:.2f}, Savings rate: {rate:.2f}, "
+            f"Anomalies: {count}")
 
-        # Append dictionary with summary to the lines list
-        lines.append({
-            'user_id': uid,
-            'date': date,
-            'summary': text
-        })
 
-    return pd.DataFrame(lines)  # Convert the list of dictionaries to a DataFrame and return
+# Helper to count flagged anomaly transactions per (user_id, date)
+def anomaly_counts_by_day(anomalies_tx):
+    flagged = anomalies_tx[anomalies_tx['is_anomaly'].astype(bool)]  # Only count flagged anomalies
+    days = flagged['timestamp'].dt.normalize().astype('datetime64[ns]')  # Truncate timestamps to calendar days
+    return flagged.groupby([flagged['user_id'], days]).size()  # Series indexed by (user_id, date)
 
 
 # Function to generate weekly summary strings per user
@@ -61,19 +81,37 @@ def compose_weekly_summary(weekly_agg):
     Returns:
         pd.DataFrame: Summary lines with ['user_id', 'week', 'summary']
     """
-    lines = []  # Initialize list to store weekly summary rows
-    for _, r in weekly_agg.iterrows():  # Iterate over each row in weekly aggregates
-        # Compose human-readable summary string for the week
-        text = (
-            f"User {r['user_id']} | Week starting {r['week']} — "
-            f"Spend: ₹{r['spend']:.2f}, Deposits: ₹{r['deposit']:.2f}, Net: ₹{r['net']:.2f}"
-        )
-
-        # Append dictionary with summary to the lines list
-        lines.append({
-            'user_id': r['user_id'],
-            'week': r['week'],
-            'summary': text
-        })
-
-    return pd.DataFrame(lines)  # Convert the list of dictionaries to a DataFrame and return
+    # Compose human-readable summary strings for every week in bulk (one chunk of rows at a time)
+    parts = []
+    for lo in range(0, len(weekly_agg), SUMMARY_CHUNK):
+        rows = slice(lo, lo + SUMMARY_CHUNK)
+        texts = [
+            f"User {uid} | Week starting {week} — "
+            f"Spend: ₹{spend:.2f}, Deposits: ₹{deposit:.2f}, Net: ₹{net:.2f}"
+            for uid, week, spend, deposit, net in zip(
+                weekly_agg['user_id'].iloc[rows].tolist(), _day_strings(weekly_agg['week'].iloc[rows]),
+                weekly_agg['spend'].iloc[rows].tolist(), weekly_agg['deposit'].iloc[rows].tolist(),
+                weekly_agg['net'].iloc[rows].tolist()
+            )
+        ]
+        parts.append(pd.array(texts, dtype='str'))
+
+    return pd.DataFrame({
+        'user_id': weekly_agg['user_id'].to_numpy(),
+        'week': weekly_agg['week'].to_numpy(),
+        'summary': _concat_strings(parts)
+    })
+
+
+# Helper to render a column of days as YYYY-MM-DD strings (datetime64 or date objects)
+def _day_strings(days):
+    if pd.api.types.is_datetime64_any_dtype(days):
+        return np.datetime_as_string(days.to_numpy().astype('datetime64[D]')).tolist()
+    return [str(day) for day in days.tolist()]
+
+
+# Helper to join chunk arrays of summary strings into one string column
+def _concat_strings(parts):
+    if not parts:
+        return pd.array([], dtype='str')
+    return parts[0] if len(parts) == 1 else pd.concat([pd.Series(p) for p in parts], ignore_index=True).array
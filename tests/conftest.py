@@ -0,0 +1,5 @@
+import os  # For the repository root
+import sys  # For making the top-level modules importable
+
+# The pipeline modules live at the repository root, next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
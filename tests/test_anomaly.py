@@ -0,0 +1,56 @@
+import numpy as np  # For synthetic values
+import pandas as pd  # For frames and comparisons
+
+from anomaly import grouped_zscores, transaction_zscore_anomalies
+
+
+# Baseline: pandas groupby mean / population std, which skip missing keys and values
+def groupby_zscores(df, col, by="user_id"):
+    g = df.groupby(by)[col]
+    mu, sigma = g.transform("mean"), g.transform(lambda s: s.std(ddof=0))
+    z = (df[col] - mu) / sigma
+    return z.where(~((sigma == 0) | sigma.isna()), 0.0).where(df[by].notna())
+
+
+def frame(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"user_id": rng.integers(1, 8, n).astype("float64"), "amount": rng.normal(50, 20, n)})
+
+
+def test_matches_groupby_without_missing_values():
+    df = frame()
+    pd.testing.assert_series_equal(grouped_zscores(df, ["amount"])["amount"], groupby_zscores(df, "amount"),
+                                   check_names=False)
+
+
+def test_missing_keys_get_no_zscore():
+    df = frame()
+    df.loc[[3, 50, 120], "user_id"] = np.nan
+    z = grouped_zscores(df, ["amount"])["amount"]
+    assert z[[3, 50, 120]].isna().all()
+    pd.testing.assert_series_equal(z, groupby_zscores(df, "amount"), check_names=False)
+
+
+def test_missing_values_do_not_poison_their_group():
+    df = frame()
+    df.loc[[0, 10, 11], "amount"] = np.nan
+    z = grouped_zscores(df, ["amount"])["amount"]
+    assert z[[0, 10, 11]].isna().all() and z.notna().sum() == len(df) - 3
+    pd.testing.assert_series_equal(z, groupby_zscores(df, "amount"), check_names=False)
+
+
+def test_all_missing_group_and_all_missing_keys():
+    df = pd.DataFrame({"user_id": [1.0, 1.0, 2.0, np.nan], "amount": [np.nan, np.nan, 5.0, 7.0]})
+    assert grouped_zscores(df, ["amount"])["amount"].tolist()[:3] == [0.0, 0.0, 0.0]
+    keyless = pd.DataFrame({"user_id": [np.nan, np.nan], "amount": [1.0, 2.0]})
+    assert grouped_zscores(keyless, ["amount"])["amount"].isna().all()
+
+
+def test_transaction_anomalies_skip_missing_amounts():
+    n = 40
+    tx = pd.DataFrame({
+        "transaction_id": range(n), "user_id": 1, "timestamp": pd.date_range("2024-01-01", periods=n, freq="h"),
+        "amount": [10.0] * (n - 2) + [1000.0, np.nan], "category": "groceries", "type": "spend", "merchant": "m",
+    })
+    flagged = transaction_zscore_anomalies(tx)
+    assert flagged["is_anomaly"].tolist() == [False] * (n - 2) + [True, False]
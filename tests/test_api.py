@@ -0,0 +1,64 @@
+import os  # For listing written files
+from datetime import date  # For a fixed start date
+
+import pandas as pd  # For frames and comparisons
+import pytest
+
+import data_generator
+import etl
+from api import run_pipeline
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = str(tmp_path / "data")
+    data_generator.generate_dataset(path, 20, 30, seed=4, start_date=date(2024, 1, 1))
+    return path
+
+
+def test_path_inputs_in_memory_write_and_read_nothing_else(data_dir, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(".cache")
+    with open(os.path.join(".cache", "index.json"), "w") as f:
+        f.write("not json")  # Would fail the run if it were read
+    before = sorted(os.listdir(data_dir))
+    out = run_pipeline(data_dir=data_dir, stages=["daily_aggregates", "budgets"])
+    assert set(out) == {"daily_aggregates", "budgets_by_category", "budgets_overall"}
+    assert not out["daily_aggregates"].empty
+    assert sorted(os.listdir(data_dir)) == before  # No .csv.cache.* files
+    assert sorted(os.listdir(tmp_path)) == [".cache", "data"]
+    assert etl.CACHE_ENABLED  # Restored for other callers
+
+
+def test_output_dir_without_cache_writes_only_outputs(data_dir, tmp_path):
+    out_dir = str(tmp_path / "output")
+    run_pipeline(data_dir=data_dir, output_dir=out_dir, stages=["weekly_aggregates"])
+    assert sorted(os.listdir(out_dir)) == ["daily_aggregates.csv", "weekly_aggregates.csv"]
+    assert not any(".cache." in name for name in os.listdir(data_dir))
+
+
+def test_use_cache_keeps_both_caches(data_dir, tmp_path):
+    out_dir = str(tmp_path / "output")
+    first = run_pipeline(data_dir=data_dir, output_dir=out_dir, use_cache=True, stages=["daily_features"])
+    assert os.path.exists(os.path.join(out_dir, ".cache", "index.json"))
+    assert any(name.startswith("transactions.csv.cache.") for name in os.listdir(data_dir))
+    again = run_pipeline(data_dir=data_dir, output_dir=out_dir, use_cache=True, stages=["daily_features"])
+    pd.testing.assert_frame_equal(first["daily_features"], again["daily_features"])
+
+
+def test_frames_and_paths_give_the_same_results(data_dir):
+    frames = {name: pd.read_csv(os.path.join(data_dir, f"{name}.csv")) for name in ("users", "transactions", "prices")}
+    from_paths = run_pipeline(data_dir=data_dir, stages=["daily_summaries", "budgets"])
+    from_frames = run_pipeline(frames, stages=["daily_summaries", "budgets"])
+    assert from_paths.keys() == from_frames.keys()
+    for name in from_paths:
+        pd.testing.assert_frame_equal(from_paths[name], from_frames[name], check_dtype=False)
+
+
+def test_invalid_options(data_dir):
+    with pytest.raises(ValueError, match="Unknown run_pipeline option"):
+        run_pipeline(data_dir=data_dir, cache=True)
+    with pytest.raises(ValueError, match="use_cache needs output_dir"):
+        run_pipeline(data_dir=data_dir, use_cache=True)
+    with pytest.raises(ValueError, match="set output_dir"):
+        run_pipeline(data_dir=data_dir, streaming=True)
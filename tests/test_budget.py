@@ -0,0 +1,52 @@
+import pandas as pd  # For transaction frames
+import pytest
+
+from budget import BudgetEngine, category_monthly_budget, last_closed_month
+from streaming import TransactionAggregates
+
+
+# Helper: spend transactions of (user_id, timestamp, amount, category)
+def spend(rows):
+    df = pd.DataFrame(rows, columns=["user_id", "timestamp", "amount", "category"])
+    return df.assign(timestamp=pd.to_datetime(df["timestamp"]), type="spend",
+                     transaction_id=range(1, len(df) + 1))
+
+
+@pytest.mark.parametrize("ts,month", [
+    ("2024-05-10 12:00", "2024-04"),  # Mid-month: May is still open
+    ("2024-05-31 09:00", "2024-05"),  # Data reaches the last day: May is closed
+    ("2024-01-01 00:00", "2023-12"),
+])
+def test_last_closed_month(ts, month):
+    assert last_closed_month(ts) == pd.Period(month, freq="M").ordinal
+
+
+def test_open_month_is_not_averaged_as_a_full_month():
+    tx = spend([(1, "2024-02-10", 300.0, "food"), (1, "2024-03-10", 300.0, "food"),
+                (1, "2024-04-10", 300.0, "food"), (1, "2024-05-02", 10.0, "food")])
+    budgets = category_monthly_budget(tx)
+    assert budgets["avg_monthly_spend"].tolist() == [300.0]  # Feb..Apr; the two days of May are left out
+    as_of_may = category_monthly_budget(tx, as_of="2024-05")
+    assert as_of_may["avg_monthly_spend"].round(2).tolist() == [203.33]  # Explicit as_of still wins
+
+
+def test_categories_outside_the_window_keep_a_zero_row():
+    tx = spend([(1, "2024-01-10", 100.0, "rent"), (1, "2024-04-03", 30.0, "food"),
+                (1, "2024-04-30", 5.0, "food"), (2, "2024-04-20", 10.0, "food")])
+    budgets = category_monthly_budget(tx)
+    assert budgets.values.tolist() == [[1, "food", 35 / 3, round(35 / 3 * 1.05, 2)], [1, "rent", 0.0, 0.0],
+                                       [2, "food", 10.0, 10.5]]
+
+
+def test_engine_paths_agree_on_the_window_end():
+    tx = spend([(u, f"2024-{m:02d}-{d:02d}", 10.0 * u + m, c) for u in (1, 2, 3) for m in range(1, 7)
+                for d, c in ((3, "food"), (17, "travel")) if not (m == 6 and d == 17)])
+    expected = category_monthly_budget(tx)
+
+    engine = BudgetEngine.from_transactions(tx[tx["timestamp"] < "2024-04-01"])
+    engine.update(tx[tx["timestamp"] >= "2024-04-01"])
+    pd.testing.assert_frame_equal(engine.budgets(), expected)
+
+    agg = TransactionAggregates().update(tx.assign(category=tx["category"].astype("category"),
+                                                   type=tx["type"].astype("category")))
+    pd.testing.assert_frame_equal(agg.category_monthly_budget(), expected, check_dtype=False)
@@ -0,0 +1,47 @@
+from datetime import date  # For a fixed start date
+
+import numpy as np  # For the reference balance draw
+import pandas as pd  # For comparisons
+import pytest
+
+import data_generator
+from data_generator import generate_users, iter_transaction_chunks
+
+START = date(2024, 1, 1)
+
+
+@pytest.fixture
+def small_streams(monkeypatch):
+    monkeypatch.setattr(data_generator, "USERS_PER_STREAM", 10)  # Many stream blocks with few users
+
+
+def test_users_slices_match_the_block_draw(monkeypatch):
+    monkeypatch.setattr(data_generator, "USERS_CHUNK", 100)
+    block0 = np.round(np.random.default_rng([4, 1, 0]).uniform(200, 2000, 100), 2)
+    assert generate_users(7, 12, seed=4)["starting_balance"].tolist() == block0[7:12].tolist()
+    whole = generate_users(0, 250, seed=4)
+    parts = pd.concat([generate_users(0, 95, 4), generate_users(95, 230, 4), generate_users(230, 250, 4)],
+                      ignore_index=True)
+    pd.testing.assert_frame_equal(parts, whole)
+
+
+@pytest.mark.parametrize("days_per_chunk,users_per_chunk,workers", [(1, 10, 1), (4, 20, 1), (7, 1, 2), (30, 1000, 1)])
+def test_transactions_do_not_depend_on_chunking(small_streams, days_per_chunk, users_per_chunk, workers):
+    expected = pd.concat(iter_transaction_chunks(45, 12, START, seed=3, days_per_chunk=12, users_per_chunk=10 ** 6),
+                         ignore_index=True)
+    chunks = iter_transaction_chunks(45, 12, START, seed=3, days_per_chunk=days_per_chunk,
+                                     users_per_chunk=users_per_chunk, workers=workers)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+def test_chunk_size_does_not_grow_with_users(small_streams):
+    sizes = {n: max(len(c) for c in iter_transaction_chunks(n, 14, START, days_per_chunk=7, users_per_chunk=20))
+             for n in (20, 200)}
+    assert sizes[200] < 1.5 * sizes[20]
+
+
+def test_each_user_stays_in_day_order(small_streams):
+    tx = pd.concat(iter_transaction_chunks(35, 10, START, days_per_chunk=3, users_per_chunk=10), ignore_index=True)
+    assert tx["transaction_id"].tolist() == list(range(1, len(tx) + 1))
+    day = tx["timestamp"].dt.normalize()
+    assert day.groupby(tx["user_id"]).apply(lambda d: d.is_monotonic_increasing).all()
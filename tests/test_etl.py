@@ -0,0 +1,101 @@
+import os  # For file times and cache paths
+
+import pandas as pd  # For frames and comparisons
+import pytest
+
+import data_generator
+import etl
+import main
+
+
+# Helper: write a small CSV and return its path
+def write_csv(tmp_path, amounts):
+    path = str(tmp_path / "values.csv")
+    pd.DataFrame({"id": range(len(amounts)), "amount": amounts}).to_csv(path, index=False)
+    return path
+
+
+# Helper: read through the cache, counting how often the CSV itself is parsed
+def cached_read(path, parses):
+    def read_csv(p):
+        parses.append(p)
+        return pd.read_csv(p)
+    return etl._cached_read(path, read_csv)
+
+
+@pytest.fixture(autouse=True)
+def cache_on(monkeypatch):
+    monkeypatch.setattr(etl, "CACHE_ENABLED", True)
+    monkeypatch.setattr(etl, "CACHE_VALIDATION", "mtime")
+
+
+def test_warm_read_skips_parsing(tmp_path):
+    path, parses = write_csv(tmp_path, [1.5, 2.5]), []
+    first = cached_read(path, parses)
+    assert os.path.exists(f"{path}.cache.{etl._cache_format()}") and os.path.exists(f"{path}.cache.json")
+    pd.testing.assert_frame_equal(cached_read(path, parses), first)
+    assert len(parses) == 1
+
+
+def test_cache_is_rebuilt_when_the_mtime_changes(tmp_path):
+    path, parses = write_csv(tmp_path, [1.5, 2.5]), []
+    cached_read(path, parses)
+    write_csv(tmp_path, [1.5, 9.5])  # Same size, new content
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert cached_read(path, parses)["amount"].tolist() == [1.5, 9.5]
+    assert len(parses) == 2
+
+
+def test_cache_is_rebuilt_when_the_size_changes(tmp_path):
+    path, parses = write_csv(tmp_path, [1.5, 2.5]), []
+    cached_read(path, parses)
+    st = os.stat(path)
+    write_csv(tmp_path, [1.5, 2.5, 3.5])
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))  # Same mtime, only the size tells them apart
+    assert cached_read(path, parses)["amount"].tolist() == [1.5, 2.5, 3.5]
+    assert len(parses) == 2
+
+
+def test_hash_validation_ignores_a_touched_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl, "CACHE_VALIDATION", "hash")
+    path, parses = write_csv(tmp_path, [1.5, 2.5]), []
+    cached_read(path, parses)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    cached_read(path, parses)
+    assert len(parses) == 1
+    write_csv(tmp_path, [1.5, 9.5])
+    assert cached_read(path, parses)["amount"].tolist() == [1.5, 9.5]
+    assert len(parses) == 2
+
+
+def test_disabled_cache_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl, "CACHE_ENABLED", False)
+    path, parses = write_csv(tmp_path, [1.5]), []
+    cached_read(path, parses)
+    assert os.listdir(tmp_path) == ["values.csv"]
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_columnar_formats_need_pyarrow(tmp_path, monkeypatch, fmt):
+    monkeypatch.setattr(etl, "_has_pyarrow", lambda: False)
+    with pytest.raises(ImportError, match="pyarrow"):
+        etl.write_frame(pd.DataFrame({"a": [1]}), str(tmp_path), "out", fmt)
+    with pytest.raises(SystemExit):
+        main.parse_args(["--format", fmt])
+    assert etl._cache_format() == "pickle"
+    assert os.listdir(tmp_path) == []
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unknown output format"):
+        etl.check_output_format("xlsx")
+
+
+def test_generator_keeps_existing_data_without_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl, "_has_pyarrow", lambda: False)
+    (tmp_path / "users.parquet").write_text("earlier data")
+    with pytest.raises(ImportError):
+        data_generator.generate_dataset(str(tmp_path), 2, 2, fmt="parquet")
+    assert (tmp_path / "users.parquet").read_text() == "earlier data"
@@ -0,0 +1,96 @@
+import numpy as np  # For synthetic daily aggregates
+import pandas as pd  # For frames and comparisons
+import pytest
+
+from features import add_rolling_features, weekly_user_aggregates
+from budget import smart_overall_budget
+
+
+# Row-wise baselines: the implementations the vectorized versions replaced
+def rowwise_rolling_features(daily_agg, windows=(7,), columns=("spend", "deposit")):
+    d = daily_agg.copy()
+    d["date"] = pd.to_datetime(d["date"])
+    d = d.sort_values(["user_id", "date"])
+    for w in windows:
+        for col in columns:
+            d[f"{col}_{w}d_avg"] = d.groupby("user_id")[col].transform(lambda x: x.rolling(w, min_periods=1).mean())
+    d["savings_rate"] = d.apply(
+        lambda r: r["deposit"] / (r["deposit"] + r["spend"]) if (r["deposit"] + r["spend"]) > 0 else 0, axis=1
+    )
+    return d
+
+
+def rowwise_overall_budget(daily_features):
+    agg = daily_features.groupby("user_id").agg({"spend_7d_avg": "last", "savings_rate": "mean"}).reset_index()
+    agg["estimated_monthly_spend"] = (agg["spend_7d_avg"] * 30).round(2)
+    agg["recommended_monthly_budget"] = agg.apply(
+        lambda r: round(r["estimated_monthly_spend"] * (0.9 if r["savings_rate"] < 0.1 else 1.0), 2), axis=1
+    )
+    return agg[["user_id", "estimated_monthly_spend", "savings_rate", "recommended_monthly_budget"]]
+
+
+def rowwise_weekly_aggregates(daily_agg):
+    d = daily_agg.copy()
+    d["date"] = pd.to_datetime(d["date"])
+    d["week"] = d["date"].dt.to_period("W").apply(lambda r: r.start_time.date())
+    return d.groupby(["user_id", "week"]).agg({"spend": "sum", "deposit": "sum", "transfer": "sum",
+                                                "net": "sum"}).reset_index()
+
+
+# Daily aggregates with users of very different history lengths (including single-day users),
+# days without any deposit or spend, and rows in shuffled order
+@pytest.fixture
+def daily():
+    rng = np.random.default_rng(7)
+    lengths = {1: 1, 2: 1, 3: 2, 4: 8, 5: 45, 6: 120, 7: 200}
+    rows = []
+    for user, n in lengths.items():
+        dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.sort(rng.choice(400, n, replace=False)), unit="D")
+        active = rng.random(n) < 0.7  # Roughly a third of the days have no activity at all
+        spend = np.round(rng.gamma(1.5, 40, n) * active, 2)
+        deposit = np.round(rng.gamma(2.0, 300, n) * active * (rng.random(n) < 0.3), 2)
+        transfer = np.round(rng.gamma(2.0, 100, n) * (rng.random(n) < 0.1), 2)
+        rows.append(pd.DataFrame({"user_id": user, "date": dates, "deposit": deposit, "spend": spend,
+                                  "transfer": transfer, "net": deposit - spend - transfer}))
+    df = pd.concat(rows, ignore_index=True)
+    df.loc[df["user_id"] == 2, ["deposit", "spend", "transfer", "net"]] = 0.0  # A single zero-activity day
+    return df.sample(frac=1, random_state=3).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("windows,columns", [
+    ((7,), ("spend", "deposit")),
+    ((7, 30, 90), ("spend", "deposit", "net")),
+    ((30,), ("net",)),
+])
+def test_rolling_features_match_rowwise(daily, windows, columns):
+    expected = rowwise_rolling_features(daily, windows, columns)
+    pd.testing.assert_frame_equal(add_rolling_features(daily, windows, columns), expected, check_dtype=False)
+
+
+def test_zero_activity_days_have_zero_savings_rate(daily):
+    feat = add_rolling_features(daily)
+    idle = (feat["deposit"] + feat["spend"]) == 0
+    assert idle.any() and (feat.loc[idle, "savings_rate"] == 0).all()
+
+
+def test_single_day_users_average_their_only_day(daily):
+    feat = add_rolling_features(daily, windows=(7, 30, 90))
+    single = feat[feat["user_id"].isin([1, 2])]
+    for w in (7, 30, 90):
+        np.testing.assert_array_equal(single[f"spend_{w}d_avg"], single["spend"])
+
+
+def test_overall_budget_matches_rowwise(daily):
+    feat = add_rolling_features(daily)
+    pd.testing.assert_frame_equal(smart_overall_budget(feat), rowwise_overall_budget(feat), check_dtype=False)
+
+
+def test_weekly_aggregates_match_rowwise(daily):
+    expected = rowwise_weekly_aggregates(daily)
+    expected["week"] = pd.to_datetime(expected["week"])
+    pd.testing.assert_frame_equal(weekly_user_aggregates(daily), expected, check_dtype=False)
+
+
+def test_weekly_aggregates_accept_date_objects(daily):
+    as_dates = daily.assign(date=daily["date"].dt.date)
+    pd.testing.assert_frame_equal(weekly_user_aggregates(as_dates), weekly_user_aggregates(daily), check_dtype=False)
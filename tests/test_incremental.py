@@ -0,0 +1,64 @@
+import os  # For the run directory
+
+import pandas as pd  # For comparing outputs
+
+import data_generator
+import main
+from incremental import has_state
+
+
+# Helper: run main.py's entry point inside `workdir`
+def run_main(workdir, monkeypatch, *argv):
+    monkeypatch.chdir(workdir)
+    main.main(["--no-cache", *argv])
+
+
+def test_full_run_drops_incremental_state(tmp_path, monkeypatch):
+    data_generator.generate_dataset(str(tmp_path / "data"), 20, 60, seed=1,
+                                    start_date=pd.Timestamp("2024-01-01").date())
+    csv = tmp_path / "data" / "transactions.csv"
+    lines = csv.read_text().splitlines(keepends=True)
+    head, tail = lines[:len(lines) * 3 // 4], lines[len(lines) * 3 // 4:]
+    csv.write_text("".join(head))
+
+    run_main(tmp_path, monkeypatch, "--incremental")
+    assert has_state(str(tmp_path / "output"))
+    run_main(tmp_path, monkeypatch)  # A plain full run rewrites every output...
+    assert not has_state(str(tmp_path / "output"))  # ...so the old offset must not survive it
+
+    # The next --incremental run starts over instead of re-applying rows the full run already saw
+    with open(csv, "a") as f:
+        f.write("".join(tail))
+    run_main(tmp_path, monkeypatch, "--incremental")
+    incremental = pd.read_csv(os.path.join(tmp_path, "output", "anomalies_transactions.csv"))
+    assert incremental["transaction_id"].is_unique
+    assert len(incremental) == len(lines) - 1  # Every transaction exactly once (minus the header)
+
+
+def test_incremental_run_matches_a_full_run(tmp_path, monkeypatch):
+    data_generator.generate_dataset(str(tmp_path / "data"), 30, 90, seed=4,
+                                    start_date=pd.Timestamp("2024-01-01").date())
+    csv = tmp_path / "data" / "transactions.csv"
+    full_csv = csv.read_text()
+    run_main(tmp_path, monkeypatch)
+    full = {name: (tmp_path / "output" / f"{name}.csv").read_bytes() for name in COMPARED}
+    anomalies_full = pd.read_csv(tmp_path / "output" / "anomalies_daily.csv", float_precision="round_trip")
+
+    # The first 70 days, then the rest appended and applied incrementally
+    lines = full_csv.splitlines(keepends=True)
+    cut = next(i for i, line in enumerate(lines) if i and line.split(",")[2] >= "2024-03-11")
+    csv.write_text("".join(lines[:cut]))
+    run_main(tmp_path, monkeypatch, "--incremental")
+    csv.write_text(full_csv)
+    run_main(tmp_path, monkeypatch, "--incremental")
+
+    for name in COMPARED:
+        assert (tmp_path / "output" / f"{name}.csv").read_bytes() == full[name], name
+    # Rows the delta touched are scored against statistics over every day, as in the full run
+    anomalies = pd.read_csv(tmp_path / "output" / "anomalies_daily.csv", float_precision="round_trip")
+    new = (anomalies["date"] >= "2024-03-11").to_numpy()
+    pd.testing.assert_frame_equal(anomalies[new], anomalies_full[new], check_exact=False, rtol=1e-12)
+
+
+# Outputs an incremental run rewrites in full
+COMPARED = ["daily_aggregates", "daily_features", "weekly_aggregates", "budgets_by_category", "budgets_overall"]
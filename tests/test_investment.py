@@ -0,0 +1,63 @@
+from datetime import date  # For a fixed start date
+
+import numpy as np  # For synthetic prices
+import pandas as pd  # For frames and comparisons
+import pytest
+
+import data_generator
+from api import run_pipeline
+from investment import asset_momentum, investment_recommendations, iter_investment_recommendations, momentum_panel
+
+START = date(2024, 1, 1)
+
+
+# Helper: prices with a 7-day drop (BUY candidates) and a 7-day rally (take-profit candidates)
+def moving_prices(days=30):
+    dates = pd.date_range(START, periods=days)
+    trend = {"gold": np.linspace(1900, 1500, days), "silver": np.linspace(20, 30, days),
+             "bitcoin": np.linspace(40000, 60000, days), "oil": np.full(days, 80.0)}
+    return pd.DataFrame([(d, a, round(p[i], 2)) for i, d in enumerate(dates) for a, p in trend.items()],
+                        columns=["date", "asset", "price"])
+
+
+@pytest.fixture
+def inputs():
+    users = data_generator.generate_users(0, 40, seed=2)
+    transactions = data_generator.generate_transactions(40, 30, START, seed=2)
+    return {"users": users, "transactions": transactions, "prices": moving_prices()}
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 50, 10 ** 6])
+def test_chunks_concatenate_to_the_full_frame(chunk_rows):
+    rng = np.random.default_rng(0)
+    surplus = pd.DataFrame({"user_id": np.arange(1, 61), "savings_rate": rng.uniform(0, 0.4, 60)})
+    momentum = pd.DataFrame({"asset": ["gold", "silver", "bitcoin"], "date": START, "price": [1700.0, 26.0, 52000.0],
+                             "pct_7d": [-0.05, 0.08, 0.0]})
+    expected = investment_recommendations(surplus, momentum)
+    chunks = list(iter_investment_recommendations(surplus, momentum, chunk_rows=chunk_rows))
+    assert all(len(c) <= max(chunk_rows, 2) for c in chunks)  # A user's own rows are never split
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+def test_pipeline_writes_the_same_recommendations_in_parts(tmp_path, inputs):
+    whole = run_pipeline(inputs, stages=["recommendations"], output_dir=str(tmp_path / "whole"))["recommendations"]
+    parts = run_pipeline(inputs, stages=["recommendations"], output_dir=str(tmp_path / "parts"),
+                         recommendation_chunk_rows=5)
+    assert len(whole) > 10 and parts["recommendations"] == len(whole)
+    expected = (tmp_path / "whole" / "recommendations.csv").read_bytes()
+    assert (tmp_path / "parts" / "recommendations.csv").read_bytes() == expected
+
+
+def test_chunked_recommendations_need_an_output_dir(inputs):
+    with pytest.raises(ValueError):
+        run_pipeline(inputs, stages=["recommendations"], recommendation_chunk_rows=5)
+
+
+def test_duplicate_prices_keep_the_last_quote():
+    prices = moving_prices()
+    resent = prices[prices["asset"] == "gold"].tail(3).assign(price=lambda d: d["price"] + 100)  # Corrected quotes
+    with_dupes = pd.concat([prices, resent], ignore_index=True)
+    deduped = pd.concat([prices.drop(resent.index), resent], ignore_index=True)
+    pd.testing.assert_frame_equal(momentum_panel(with_dupes), momentum_panel(deduped))
+    pd.testing.assert_frame_equal(asset_momentum(with_dupes), asset_momentum(deduped))
+    assert asset_momentum(with_dupes).set_index("asset").loc["gold", "price"] == resent["price"].iloc[-1]
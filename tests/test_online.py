@@ -0,0 +1,86 @@
+import numpy as np  # For synthetic records and comparisons
+import pytest
+
+from online import _MAX_DECAY_EXPONENT, OnlineAnomalyScorer
+
+
+DECAYS = [1.0, 0.99, 0.9, 0.5, 0.1]
+
+
+# Helper: arrival-ordered records; user 0 is heavy so strong decays split its run into several blocks
+def records(n=3000, users=12, seed=0):
+    rng = np.random.default_rng(seed)
+    user_ids = np.where(rng.random(n) < 0.3, 0, rng.integers(1, users, n))
+    amounts = np.round(rng.lognormal(3, 1, n) * rng.choice([-1, 1], n), 2)
+    amounts[::97] *= 40  # Outliers, so some records are flagged
+    return user_ids, amounts
+
+
+# Helper: score records one by one with score()
+def one_by_one(scorer, user_ids, amounts):
+    out = [scorer.score(u, a) for u, a in zip(user_ids.tolist(), amounts.tolist())]
+    return np.array([z for z, _ in out]), np.array([f for _, f in out])
+
+
+def assert_same_state(a, b):
+    n = len(a)
+    assert n == len(b) and a._user_ids == b._user_ids
+    np.testing.assert_array_equal(a.count[:n], b.count[:n])
+    for field in ("weight", "mean", "m2"):
+        np.testing.assert_allclose(getattr(a, field)[:n], getattr(b, field)[:n], rtol=1e-8, atol=1e-8)
+
+
+@pytest.mark.parametrize("decay", DECAYS)
+def test_score_batch_matches_score(decay):
+    user_ids, amounts = records()
+    batch, single = OnlineAnomalyScorer(decay=decay), OnlineAnomalyScorer(decay=decay)
+    z, flags = batch.score_batch(user_ids, amounts)
+    z_ref, flags_ref = one_by_one(single, user_ids, amounts)
+    np.testing.assert_allclose(z, z_ref, rtol=1e-7, atol=1e-9)
+    np.testing.assert_array_equal(flags, flags_ref)
+    assert flags.any()
+    assert_same_state(batch, single)
+
+
+# score_batch splits a user's run into blocks of this many records (decay factors stay in float64 range)
+@pytest.mark.parametrize("decay", [0.5, 0.1])
+@pytest.mark.parametrize("extra", [-1, 0, 1])
+def test_score_batch_matches_score_at_a_block_boundary(decay, extra):
+    block = int(_MAX_DECAY_EXPONENT / -np.log(decay))
+    heavy = 2 * block + extra  # User 0 fills two blocks, one record short of / exactly / one past the boundary
+    _, amounts = records(n=heavy + heavy // 4, seed=3)
+    user_ids = np.random.default_rng(3).permutation(np.r_[np.zeros(heavy, int), np.ones(heavy // 4, int)])
+    z, _ = OnlineAnomalyScorer(decay=decay).score_batch(user_ids, amounts)
+    z_ref, _ = one_by_one(OnlineAnomalyScorer(decay=decay), user_ids, amounts)
+    np.testing.assert_allclose(z, z_ref, rtol=1e-7, atol=1e-9)
+
+
+@pytest.mark.parametrize("decay", DECAYS)
+def test_batches_continue_from_earlier_state(decay):
+    user_ids, amounts = records(seed=1)
+    batched = OnlineAnomalyScorer(decay=decay)
+    z = np.concatenate([batched.score_batch(user_ids[i:i + 700], amounts[i:i + 700])[0]
+                        for i in range(0, len(user_ids), 700)])
+    z_ref, _ = one_by_one(OnlineAnomalyScorer(decay=decay), user_ids, amounts)
+    np.testing.assert_allclose(z, z_ref, rtol=1e-7, atol=1e-9)
+
+
+@pytest.mark.parametrize("decay", [1.0, 0.9])
+def test_save_and_load_round_trip(tmp_path, decay):
+    user_ids, amounts = records(seed=2)
+    path = str(tmp_path / "scorer.npz")
+    scorer = OnlineAnomalyScorer(z_thresh=2.5, decay=decay, min_count=3)
+    scorer.score_batch(user_ids[:1500], amounts[:1500])
+    scorer.save(path)
+    loaded = OnlineAnomalyScorer.load(path)
+    assert (loaded.z_thresh, loaded.decay, loaded.min_count) == (2.5, decay, 3)
+    assert_same_state(loaded, scorer)
+    z, flags = loaded.score_batch(user_ids[1500:], amounts[1500:])
+    z_ref, flags_ref = scorer.score_batch(user_ids[1500:], amounts[1500:])
+    np.testing.assert_array_equal(z, z_ref)
+    np.testing.assert_array_equal(flags, flags_ref)
+
+
+def test_empty_batch():
+    z, flags = OnlineAnomalyScorer().score_batch([], [])
+    assert len(z) == 0 and flags.dtype == bool
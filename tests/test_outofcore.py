@@ -0,0 +1,45 @@
+import os  # For output paths
+from datetime import date  # For a fixed start date
+
+import pandas as pd  # For reading outputs back
+import pytest
+
+import data_generator
+from api import run_pipeline
+from outofcore import SPILL_OUTPUTS, run_spilled, spill_transactions
+from pipeline import user_surplus
+from schema import TRANSACTIONS_SCHEMA, apply_schema
+
+
+# Helper: generate a small dataset into tmp_path/data and return its directory
+def dataset(tmp_path, users=40, days=45):
+    data_dir = str(tmp_path / "data")
+    data_generator.generate_dataset(data_dir, users, days, seed=5, start_date=date(2024, 1, 1))
+    return data_dir
+
+
+def test_spill_outputs_match_the_in_memory_run(tmp_path):
+    data_dir = dataset(tmp_path)
+    run_pipeline(data_dir=data_dir, output_dir=str(tmp_path / "memory"))
+    run_pipeline(data_dir=data_dir, output_dir=str(tmp_path / "spill"), backend="spill", users_per_partition=7)
+    written = sorted(f for f in os.listdir(tmp_path / "memory") if f.endswith(".csv"))
+    assert {f"{name}.csv" for name in SPILL_OUTPUTS} <= set(written)
+    assert written == sorted(f for f in os.listdir(tmp_path / "spill") if f.endswith(".csv"))
+    for name in written:
+        assert (tmp_path / "memory" / name).read_bytes() == (tmp_path / "spill" / name).read_bytes(), name
+    assert not os.path.exists(tmp_path / "spill" / ".spill")
+
+
+@pytest.mark.parametrize("chunks", [[], [pd.DataFrame(columns=list(TRANSACTIONS_SCHEMA))]])  # No chunk / header only
+def test_spilling_without_transactions_writes_empty_outputs(tmp_path, chunks):
+    out = tmp_path / "output"
+    out.mkdir()
+    for name in SPILL_OUTPUTS:
+        (out / f"{name}.csv").write_text("stale\n1\n")
+    spilled = spill_transactions([apply_schema(c, TRANSACTIONS_SCHEMA) for c in chunks], str(tmp_path / ".spill"))
+    result = run_spilled(spilled, str(out), reduce=lambda o: user_surplus(o["daily_feat"]))
+    assert result["rows"] == dict.fromkeys(SPILL_OUTPUTS, 0)
+    assert list(result["reduced"].columns) == ["user_id", "savings_rate"]
+    for name in SPILL_OUTPUTS:
+        written = pd.read_csv(out / f"{name}.csv")
+        assert written.empty and "user_id" in written.columns, name
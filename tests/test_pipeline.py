@@ -0,0 +1,104 @@
+import sys  # For importing throwaway modules
+from datetime import date  # For a fixed start date
+
+import pytest
+
+import data_generator
+import main
+import pipeline
+from api import run_pipeline
+from instrumentation import Instrumentation
+from pipeline import Stage, stage_fingerprint
+
+
+# Helper: fingerprint of a stage running `func`
+def fingerprint(func):
+    return stage_fingerprint(Stage("s", func), [])
+
+
+def test_callee_edit_changes_fingerprint(tmp_path, monkeypatch):
+    # stage.py calls helper.py; editing only the callee must invalidate the stage
+    (tmp_path / "fp_helper.py").write_text("SCALE = 2\n\ndef scale(x):\n    return x * SCALE\n")
+    (tmp_path / "fp_stage.py").write_text("from fp_helper import scale\n\ndef run(x):\n    return scale(x)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(pipeline, "_PROJECT_DIR", str(tmp_path))
+    import fp_stage
+    try:
+        before = fingerprint(fp_stage.run)
+        assert fingerprint(fp_stage.run) == before  # Stable while nothing changes
+
+        (tmp_path / "fp_helper.py").write_text("SCALE = 2\n\ndef scale(x):\n    return x * SCALE + 1\n")
+        edited = fingerprint(fp_stage.run)
+        assert edited != before
+
+        monkeypatch.setattr(sys.modules["fp_helper"], "SCALE", 3)  # Runtime override of a constant
+        assert fingerprint(fp_stage.run) != edited
+    finally:
+        sys.modules.pop("fp_stage", None)
+        sys.modules.pop("fp_helper", None)
+
+
+def test_budget_constants_change_fingerprint(monkeypatch):
+    import budget
+    before = fingerprint(budget.category_monthly_budget)
+    monkeypatch.setattr(budget, "BUDGET_SLACK", 1.10)
+    assert fingerprint(budget.category_monthly_budget) != before
+
+
+def test_lambda_stages_cover_the_modules_they_call():
+    stages = pipeline.build_stages(streaming=True)
+    closure = pipeline._module_closure(stages["daily_aggregates"].func.__module__)
+    assert {"streaming", "budget", "anomaly", "rollups"} <= closure
+
+
+# Helper: run `stages` with the stage cache in output_dir and return each stage's status
+def run_cached(stages, output_dir):
+    runner = pipeline.PipelineRunner({s.name: s for s in stages}, str(output_dir), verbose=False)
+    return runner.run()
+
+
+def test_writer_stage_reruns_when_its_files_are_missing(tmp_path):
+    def write(value, out):
+        (tmp_path / "report.csv").write_text(f"{value}\n")
+        (tmp_path / "report.txt").write_text(f"{value}\n")
+    stages = [Stage("report", lambda: 1, output="report", writer=write, files=["report.txt"])]
+    assert run_cached(stages, tmp_path) == {"report": "ran"}
+    assert run_cached(stages, tmp_path) == {"report": "cached"}
+    for name in ("report.csv", "report.txt"):  # The output and the other files are both checked
+        (tmp_path / name).unlink()
+        assert run_cached(stages, tmp_path) == {"report": "ran"}
+        assert (tmp_path / name).exists()
+
+
+def test_deleted_recommendations_are_rewritten(tmp_path):
+    data_generator.generate_dataset(str(tmp_path / "data"), 10, 20, seed=2, start_date=date(2024, 1, 1))
+    out = tmp_path / "output"
+    for backend in ("memory", "spill"):
+        run_pipeline(data_dir=str(tmp_path / "data"), output_dir=str(out), use_cache=True, backend=backend)
+        for name in ("recommendations.csv", "daily_features.csv"):
+            (out / name).unlink()
+            run_pipeline(data_dir=str(tmp_path / "data"), output_dir=str(out), use_cache=True, backend=backend,
+                         stages=["recommendations", "daily_features"])
+            assert (out / name).exists(), (backend, name)
+
+
+def test_profiling_an_unknown_stage_is_an_error(tmp_path):
+    stages = pipeline.build_stages(output_dir=str(tmp_path))
+    with pytest.raises(ValueError, match="Unknown stage 'daily_summary'"):
+        pipeline.PipelineRunner(stages, str(tmp_path), instrumentation=Instrumentation(profile_stage="daily_summary"))
+    pipeline.PipelineRunner(stages, str(tmp_path), instrumentation=Instrumentation(profile_stage="daily_summaries"))
+
+
+@pytest.mark.parametrize("argv, ok", [
+    (["--profile-stage", "daily_summaries"], True),
+    (["--profile-stage", "daily_summary"], False),
+    (["--profile-stage", "per_user_outputs"], False),
+    (["--profile-stage", "per_user_outputs", "--backend", "spill"], True),
+    (["--profile-stage", "incremental", "--incremental"], True),
+])
+def test_profile_stage_option_is_checked_against_the_run_mode(argv, ok):
+    if ok:
+        assert main.parse_args(argv).profile_stage == argv[1]
+    else:
+        with pytest.raises(SystemExit):
+            main.parse_args(argv)
@@ -0,0 +1,60 @@
+import numpy as np  # For synthetic daily aggregates
+import pandas as pd  # For frames and comparisons
+import pytest
+
+from features import weekly_user_aggregates
+from rollups import LEVELS, RollupCube, rollup
+
+
+@pytest.fixture(scope="module")
+def daily():
+    rng = np.random.default_rng(0)
+    rows = [(u, d) for u in (3, 1, 8) for d in pd.date_range("2024-01-25", periods=40 - 10 * (u == 8))]
+    d = pd.DataFrame(rows, columns=["user_id", "date"])
+    for col in ("deposit", "spend", "transfer"):
+        d[col] = np.round(rng.uniform(0, 100, len(d)), 2)
+    d["net"] = d["deposit"] - d["spend"] - d["transfer"]
+    return d.sample(frac=1, random_state=0)  # Not in (user_id, date) order
+
+
+@pytest.fixture(scope="module")
+def cube(daily):
+    return RollupCube(daily, levels=tuple(LEVELS))
+
+
+def test_default_cube_holds_only_the_week_level(daily):
+    weeks = RollupCube(daily)
+    assert list(weeks.levels) == ["week"]
+    pd.testing.assert_frame_equal(weeks.weekly(), weekly_user_aggregates(daily))
+    assert weeks.rows == len(weeks.weekly())
+    with pytest.raises(ValueError):
+        weeks.query("month")
+    with pytest.raises(ValueError):
+        RollupCube(daily, levels=("year",))
+
+
+@pytest.mark.parametrize("level", list(LEVELS))
+def test_query_one_user_matches_filtering_the_level(cube, daily, level):
+    frame = cube.levels[level]
+    for user_id in (1, 3, 8):
+        pd.testing.assert_frame_equal(cube.query(level, user_id=user_id), frame[frame["user_id"] == user_id])
+    assert cube.query(level, user_id=2).empty and cube.query(level, user_id=99).empty
+
+
+def test_query_bucket_range_and_columns(cube, daily):
+    got = cube.query("month", user_id=3, start="2024-02-01", end="2024-03-01", columns=["spend"])
+    days = daily[(daily["user_id"] == 3) & (daily["date"] >= "2024-02-01") & (daily["date"] < "2024-03-01")]
+    assert list(got.columns) == ["user_id", "month", "spend"]
+    assert got["month"].tolist() == [pd.Timestamp("2024-02-01")]
+    assert got["spend"].iloc[0] == pytest.approx(days["spend"].sum())
+    weeks = cube.query("week", start="2024-02-05")
+    assert (weeks["week"] >= pd.Timestamp("2024-02-05")).all() and set(weeks["user_id"]) == {1, 3, 8}
+
+
+def test_levels_match_rollup_and_are_sorted(cube, daily):
+    day = daily.sort_values(["user_id", "date"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(cube.query("day"), day[["user_id", "date", "spend", "deposit", "transfer", "net"]])
+    for level in ("week", "month"):
+        pd.testing.assert_frame_equal(cube.query(level), rollup(daily, level))
+    assert cube.monthly()["month"].dt.day.eq(1).all()
+    assert cube.rows == len(daily)
@@ -0,0 +1,75 @@
+import numpy as np  # For integer limits
+import pandas as pd  # For frames and dtypes
+import pytest
+
+from schema import TRANSACTIONS_SCHEMA, SchemaError, apply_schema
+
+
+# Helper: a valid raw transactions frame, as read_csv produces it
+def raw(**columns):
+    df = pd.DataFrame({
+        "transaction_id": [1, 2, 3],
+        "user_id": [10, 11, 12],
+        "timestamp": ["2024-01-01 09:00:00", "2024-01-02 10:30:00", "2024-01-03 18:15:00"],
+        "amount": [12.5, 100.0, 3.99],
+        "category": ["groceries", "rent", "travel"],
+        "type": ["spend", "deposit", "transfer"],
+        "merchant": ["m1", "employer", "m2"],
+    })
+    return df.assign(**columns)
+
+
+def test_valid_frame_gets_schema_dtypes():
+    df = apply_schema(raw(), TRANSACTIONS_SCHEMA)
+    assert df["transaction_id"].dtype == "int32" and df["user_id"].dtype == "int32"
+    assert pd.api.types.is_datetime64_dtype(df["timestamp"]) and df["amount"].dtype == "float64"
+    assert df["type"].cat.categories.tolist() == ["deposit", "spend", "transfer"]
+    assert apply_schema(df, TRANSACTIONS_SCHEMA) is df  # Nothing left to cast, nothing copied
+
+
+@pytest.mark.parametrize("user_id", [[1, 2, np.iinfo("int32").max + 1], [1, 2, np.iinfo("int32").min - 1]])
+def test_out_of_range_ids_are_refused(user_id):
+    with pytest.raises(SchemaError, match="outside the int32 range"):
+        apply_schema(raw(user_id=user_id), TRANSACTIONS_SCHEMA)
+
+
+def test_fractional_ids_are_refused():
+    with pytest.raises(SchemaError, match="fractional"):
+        apply_schema(raw(transaction_id=[1.0, 2.5, 3.0]), TRANSACTIONS_SCHEMA)
+
+
+@pytest.mark.parametrize("column", ["transaction_id", "user_id"])
+def test_missing_ids_are_refused(column):
+    with pytest.raises(SchemaError, match="missing values"):
+        apply_schema(raw(**{column: [1, np.nan, 3]}), TRANSACTIONS_SCHEMA)
+
+
+def test_unknown_transaction_types_are_refused():
+    with pytest.raises(SchemaError, match="refund"):
+        apply_schema(raw(type=["spend", "refund", "deposit"]), TRANSACTIONS_SCHEMA)
+
+
+def test_missing_transaction_types_are_refused():
+    with pytest.raises(SchemaError, match="outside"):
+        apply_schema(raw(type=pd.Categorical(["spend", None, "deposit"])), TRANSACTIONS_SCHEMA)
+
+
+def test_open_categories_take_new_values():
+    df = apply_schema(raw(category=["groceries", "pets", "rent"]), TRANSACTIONS_SCHEMA)
+    assert df["category"].tolist() == ["groceries", "pets", "rent"]
+
+
+def test_invalid_timestamps_are_refused():
+    with pytest.raises(SchemaError, match="not a valid datetime"):
+        apply_schema(raw(timestamp=["2024-01-01", "yesterday", "2024-01-03"]), TRANSACTIONS_SCHEMA)
+
+
+def test_float32_narrowing_refuses_lost_precision():
+    with pytest.raises(SchemaError, match="loses precision"):
+        apply_schema(pd.DataFrame({"x": [0.1]}), {"x": "float32"})
+    assert apply_schema(pd.DataFrame({"x": [0.5]}), {"x": "float32"})["x"].dtype == "float32"
+
+
+def test_header_only_frame_gets_schema_dtypes():
+    df = apply_schema(raw().iloc[:0].astype(object), TRANSACTIONS_SCHEMA)
+    assert df.empty and df["user_id"].dtype == "int32" and df["type"].dtype == TRANSACTIONS_SCHEMA["type"]
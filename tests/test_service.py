@@ -0,0 +1,111 @@
+import json  # For request bodies
+
+import pandas as pd  # For building pipeline outputs
+import pytest
+
+from service import InsightsIndex, InsightsService
+
+
+# Pipeline outputs of two users: daily features and scored transactions over Jan..Mar 2024
+@pytest.fixture
+def service():
+    tx = pd.DataFrame({
+        "transaction_id": range(1, 9),
+        "user_id": [1, 1, 1, 1, 2, 2, 2, 2],
+        "timestamp": pd.to_datetime(["2024-01-05", "2024-02-05", "2024-03-05", "2024-03-06",
+                                     "2024-01-07", "2024-02-07", "2024-03-07", "2024-03-08"]),
+        "amount": [10.0, 20.0, 30.0, 40.0, 100.0, 110.0, 120.0, 130.0],
+        "category": ["groceries", "travel", "groceries", "rent", "groceries", "groceries", "rent", "rent"],
+        "type": ["spend"] * 8,
+        "merchant": ["m"] * 8,
+        "z": [0.0] * 8,
+        "is_anomaly": [False] * 8,
+    })
+    daily = tx.assign(date=tx["timestamp"].dt.normalize(), spend=tx["amount"], deposit=0.0, transfer=0.0)
+    return InsightsService(InsightsIndex(daily[["user_id", "date", "deposit", "spend", "transfer"]], tx))
+
+
+# Helper: POST a body to a user's transactions
+def post(service, user_id, body):
+    return service.dispatch("POST", f"/users/{user_id}/transactions", json.dumps(body).encode())
+
+
+@pytest.mark.parametrize("body", [
+    {"amount": float("nan")},
+    {"amount": float("inf"), "type": "spend"},
+    {"amount": "12"},
+    {"amount": True},
+    {"type": "spend"},
+    [1, 2],
+    "spend",
+    {"amount": 5.0, "timestamp": "2024-03-10T10:00:00+02:00"},
+    {"amount": 5.0, "timestamp": "2999-01-01 00:00:00"},
+    {"amount": 5.0, "timestamp": "yesterday"},
+    {"amount": 5.0, "type": "refund"},
+])
+def test_invalid_transactions_are_rejected_without_side_effects(service, body):
+    before = {view: service.dispatch("GET", f"/users/2/{view}") for view in ("summary", "budgets", "anomalies")}
+    status, payload = post(service, 2, body)
+    assert status == 400 and "error" in payload
+    after = {view: service.dispatch("GET", f"/users/2/{view}") for view in ("summary", "budgets", "anomalies")}
+    assert after == before
+    json.dumps(after, allow_nan=False)  # Still valid JSON
+
+
+def test_batch_with_one_invalid_transaction_applies_nothing(service):
+    before = service.dispatch("GET", "/users/2/budgets")
+    status, _ = post(service, 2, [{"amount": 50.0, "timestamp": "2024-03-09 10:00:00"}, {"amount": float("nan")}])
+    assert status == 400
+    assert service.dispatch("GET", "/users/2/budgets") == before
+
+
+def test_post_does_not_move_other_users_budget_window(service):
+    before = service.dispatch("GET", "/users/1/budgets")
+    status, _ = post(service, 2, {"amount": 5.0, "category": "travel", "timestamp": "2025-06-01 10:00:00"})
+    assert status == 200
+    assert service.dispatch("GET", "/users/1/budgets") == before
+
+
+def test_flagged_transactions_are_appended(service):
+    for _ in range(5):
+        post(service, 1, {"amount": 25.0, "timestamp": "2024-03-07 10:00:00"})
+    status, payload = post(service, 1, {"amount": 5000.0, "timestamp": "2024-03-07 11:00:00"})
+    assert status == 200 and payload["results"][0]["is_anomaly"]
+    anomalies = service.dispatch("GET", "/users/1/anomalies")[1]["anomalies"]
+    assert anomalies[0]["amount"] == 5000.0
+
+
+def test_unexpected_errors_answer_500(service, monkeypatch):
+    import asyncio
+
+    def broken(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(service, "dispatch", broken)
+
+    async def roundtrip():
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /health HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        server.close()
+        return response
+
+    assert asyncio.run(roundtrip()).startswith(b"HTTP/1.1 500 Internal Server Error")
+
+
+@pytest.mark.parametrize("limit", ["0", "-1", "abc", "2.5"])
+def test_invalid_anomaly_limit_is_a_bad_request(service, limit):
+    status, payload = service.dispatch("GET", f"/users/1/anomalies?limit={limit}")
+    assert status == 400 and "limit" in payload["error"]
+
+
+def test_anomaly_limit_keeps_the_newest(service):
+    for amount in (25.0, 25.0, 25.0, 25.0, 25.0, 5e3, 5e5, 5e7):  # Each outlier dwarfs the ones before it
+        post(service, 1, {"amount": amount, "timestamp": "2024-03-09 12:00:00"})
+    status, payload = service.dispatch("GET", "/users/1/anomalies?limit=2")
+    assert status == 200 and [a["amount"] for a in payload["anomalies"]] == [5e7, 5e5]
+    with pytest.raises(ValueError):
+        service.index.anomalies(1, 0)
@@ -0,0 +1,51 @@
+import numpy as np  # For synthetic transactions
+import pandas as pd  # For frames and comparisons
+import pytest
+
+from sharding import SHARD_OUTPUTS, merge_shards, run_shard, run_sharded
+
+
+# Helper: a few months of transactions of `n_users` users, typed like etl.load_transactions
+def transactions(n_users=12, n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "transaction_id": np.arange(1, n + 1, dtype="int32"),
+        "user_id": rng.integers(1, n_users + 1, n).astype("int32"),
+        "timestamp": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 120 * 86400, n), unit="s"),
+        "amount": np.round(rng.uniform(1, 500, n), 2),
+        "category": pd.Categorical(rng.choice(["groceries", "rent", "travel"], n)),
+        "type": pd.Categorical(rng.choice(["deposit", "spend", "transfer"], n, p=[0.2, 0.7, 0.1])),
+        "merchant": pd.Categorical(rng.choice(["a", "b"], n)),
+    }).sort_values("timestamp", ignore_index=True)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_sharded_outputs_match_one_shard(workers):
+    tx = transactions()
+    expected = run_shard(tx)
+    got = run_sharded(tx, workers=workers, n_shards=3)
+    for name in SHARD_OUTPUTS:
+        pd.testing.assert_frame_equal(got[name], expected[name].reset_index(drop=True), check_categorical=False)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_empty_input_gives_empty_outputs_with_columns(workers):
+    tx = transactions()
+    got = run_sharded(tx.iloc[:0], workers=workers)
+    expected = run_shard(tx)
+    for name in SHARD_OUTPUTS:
+        assert got[name].empty
+        assert list(got[name].columns) == list(expected[name].columns)
+
+
+def test_shard_without_a_transaction_type_keeps_its_column():
+    tx = transactions()
+    tx = tx.astype({"type": "str"})
+    got = run_shard(tx[tx["type"] != "transfer"])
+    assert (got["daily"]["transfer"] == 0).all()
+    assert (got["daily"]["net"] == got["daily"]["deposit"] - got["daily"]["spend"]).all()
+
+
+def test_merge_needs_a_shard():
+    with pytest.raises(ValueError):
+        merge_shards([])
@@ -0,0 +1,61 @@
+import numpy as np  # For synthetic transactions
+import pandas as pd  # For frames and comparisons
+import pytest
+
+from features import daily_user_aggregates
+from store import TransactionStore
+
+
+# Helper: transactions in arrival order, not sorted by (user_id, timestamp)
+def transactions(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "transaction_id": np.arange(1, n + 1),
+        "user_id": rng.integers(1, 9, n),
+        "timestamp": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 20 * 86400, n), unit="s"),
+        "amount": np.round(rng.uniform(0, 300, n), 2),
+        "category": rng.choice(["groceries", "rent", "travel"], n),
+        "type": rng.choice(["deposit", "spend", "transfer"], n, p=[0.2, 0.7, 0.1]),
+    })
+
+
+@pytest.fixture
+def tx():
+    return transactions()
+
+
+def test_user_range_matches_a_boolean_filter(tx):
+    store = TransactionStore(tx)
+    for user_id, start, end in [(3, "2024-01-05", "2024-01-09"), (3, None, "2024-01-02 12:00"),
+                                (7, "2024-01-15", None), (5, None, None), (99, None, None),
+                                (2, "2024-01-09", "2024-01-05")]:
+        keep = tx["user_id"] == user_id
+        if start is not None:
+            keep &= tx["timestamp"] >= start
+        if end is not None:
+            keep &= tx["timestamp"] < end
+        expected = tx[keep].sort_values(["user_id", "timestamp"])
+        pd.testing.assert_frame_equal(store.user_range(user_id, start, end), expected)
+
+
+def test_category_slices_match_a_boolean_filter(tx):
+    store = TransactionStore(tx)
+    ordered = tx.sort_values(["user_id", "timestamp"])
+    for category in ["groceries", "rent", "unknown"]:
+        pd.testing.assert_frame_equal(store.category(category), ordered[ordered["category"] == category])
+        for user_id in [1, 4, 99]:
+            expected = ordered[(ordered["category"] == category) & (ordered["user_id"] == user_id)]
+            pd.testing.assert_frame_equal(store.category(category, user_id), expected)
+
+
+def test_daily_sums_match_the_raw_frame_exactly():
+    # 39.11 + 1162.49 + 85.26 in arrival order is 1286.86; in timestamp order it is 1286.8600000000001
+    tx = pd.DataFrame({
+        "user_id": [2, 2, 2, 1],
+        "timestamp": pd.to_datetime(["2024-01-13 21:15", "2024-01-13 22:57", "2024-01-13 17:17", "2024-01-13 08:00"]),
+        "amount": [39.11, 1162.49, 85.26, 10.0],
+        "type": ["spend", "spend", "spend", "deposit"],
+    })
+    expected = daily_user_aggregates(tx)
+    assert expected["spend"].tolist() == [0.0, 39.11 + 1162.49 + 85.26]
+    pd.testing.assert_frame_equal(daily_user_aggregates(TransactionStore(tx)), expected, check_exact=True)
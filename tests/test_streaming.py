@@ -0,0 +1,68 @@
+from datetime import date  # For a fixed start date
+
+import numpy as np  # For comparisons
+import pandas as pd  # For frames and comparisons
+import pytest
+
+import data_generator
+from anomaly import transaction_zscore_anomalies
+from api import run_pipeline
+from schema import TRANSACTIONS_SCHEMA, apply_schema
+from streaming import TransactionAggregates, aggregate_chunks, score_chunks
+
+
+@pytest.fixture(scope="module")
+def tx():
+    return apply_schema(data_generator.generate_transactions(60, 50, date(2024, 1, 1), seed=3), TRANSACTIONS_SCHEMA)
+
+
+# Helper: split a frame into consecutive chunks of `size` rows
+def chunks(df, size):
+    return [df.iloc[i:i + size] for i in range(0, len(df), size)]
+
+
+def assert_same_aggregates(got, expected):
+    pd.testing.assert_series_equal(got.daily.sort_index(), expected.daily.sort_index())  # Integer cents: exact
+    pd.testing.assert_series_equal(got.category_month.sort_index(), expected.category_month.sort_index())
+    pd.testing.assert_frame_equal(got.user_stats.sort_index(), expected.user_stats.sort_index(),
+                                  check_exact=False, rtol=1e-10, check_dtype=False)
+    assert (got.rows, got.max_transaction_id, got.last_timestamp) == \
+        (expected.rows, expected.max_transaction_id, expected.last_timestamp)
+
+
+@pytest.mark.parametrize("size", [7, 37, 500])
+def test_chunked_updates_match_one_update(tx, size):
+    assert_same_aggregates(aggregate_chunks(chunks(tx, size)), TransactionAggregates().update(tx))
+
+
+def test_merge_order_does_not_matter(tx):
+    parts = [aggregate_chunks(chunks(part, 200)) for part in chunks(tx, len(tx) // 4 + 1)]
+    forward, backward = TransactionAggregates(), TransactionAggregates()
+    for part in parts:
+        forward.merge(part)
+    for part in reversed(parts):
+        backward.merge(part)
+    whole = TransactionAggregates().update(tx)
+    assert_same_aggregates(forward, whole)
+    assert_same_aggregates(backward, whole)
+
+
+def test_streaming_scores_match_the_in_memory_anomalies(tx):
+    agg = aggregate_chunks(chunks(tx, 250))
+    scored = pd.concat(score_chunks(chunks(tx, 250), agg.amount_stats()), ignore_index=True)
+    scored = scored.sort_values(["user_id", "timestamp"], kind="stable").reset_index(drop=True)
+    expected = transaction_zscore_anomalies(tx).reset_index(drop=True)
+    np.testing.assert_allclose(scored["z"], expected["z"], rtol=1e-9, atol=1e-12)
+    assert scored["is_anomaly"].tolist() == expected["is_anomaly"].tolist()
+    assert scored["is_anomaly"].any()
+
+
+def test_streaming_run_on_a_file_without_rows(tmp_path, tx):
+    data_generator.generate_dataset(str(tmp_path / "data"), 3, 10, seed=1, start_date=date(2024, 1, 1))
+    csv = tmp_path / "data" / "transactions.csv"
+    csv.write_text(csv.read_text().splitlines(keepends=True)[0])  # Header only
+    out = run_pipeline(data_dir=str(tmp_path / "data"), output_dir=str(tmp_path / "output"), streaming=True,
+                       stages=["anomalies_transactions", "daily_aggregates", "budgets_by_category"])
+    assert out["anomalies_transactions"].empty and out["daily_aggregates"].empty
+    written = pd.read_csv(tmp_path / "output" / "anomalies_transactions.csv")
+    assert written.empty and list(written.columns) == list(transaction_zscore_anomalies(tx).columns)